@@ -0,0 +1,234 @@
+"""
+API Limiter
+Shared client-side rate limiting and retry/backoff for every external API
+(Gemini, Google Sheets, Google Calendar, Garmin Connect, SMTP).
+Each API has its own token bucket; retryable failures (429, 5xx, timeouts)
+are retried with exponential backoff and full jitter, honoring Retry-After.
+Non-idempotent writes (calendar inserts, sheet appends, SMTP sends) go through
+call_write_with_retry, which only resends when the write certainly did not
+happen (429, a 4xx SMTP reply or a refused connection), so a retry can't
+create duplicates.
+"""
+
+import time
+import random
+import asyncio
+import smtplib
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+# api: (sustained requests per second, burst size)
+RATE_LIMITS = {
+    "gemini": (0.5, 2),
+    "sheets": (1.0, 5),      # Sheets: 60 requests/min per user
+    "calendar": (5.0, 10),
+    "garmin": (0.5, 3),
+    "email": (1.0, 5),       # Gmail SMTP is throttled per account
+}
+DEFAULT_RATE_LIMIT = (1.0, 1)
+
+MAX_RETRIES = 4
+BASE_DELAY_S = 1.0
+MAX_DELAY_S = 60.0
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# requests/urllib3 network errors don't derive from the builtin ConnectionError/TimeoutError,
+# so they are matched by class name (any class in the error's MRO)
+TRANSIENT_ERROR_NAMES = {"ConnectionError", "Timeout"}
+
+
+class TokenBucket:
+    """Thread-safe token bucket. acquire() blocks until a token is available; acquire_async() awaits."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _take(self):
+        """Takes a token and returns 0, or returns the seconds to wait for the next one."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(api):
+    """Returns the shared bucket for an API, creating it on first use."""
+    with _buckets_lock:
+        if api not in _buckets:
+            _buckets[api] = TokenBucket(*RATE_LIMITS.get(api, DEFAULT_RATE_LIMIT))
+        return _buckets[api]
+
+
+def set_rate_limit(api, rate, burst):
+    """Replaces an API's bucket (e.g. a higher quota, or unthrottled for offline benchmarks)."""
+    with _buckets_lock:
+        _buckets[api] = TokenBucket(rate, burst)
+
+
+def _status_code(error):
+    """Extracts an HTTP status from googleapiclient, gspread/requests and google.api_core errors."""
+    resp = getattr(error, 'resp', None)            # googleapiclient.errors.HttpError
+    if resp is not None and getattr(resp, 'status', None) is not None:
+        return int(resp.status)
+    response = getattr(error, 'response', None)    # gspread.exceptions.APIError / requests
+    if response is not None and getattr(response, 'status_code', None) is not None:
+        return int(response.status_code)
+    code = getattr(error, 'code', None)            # google.api_core.exceptions.GoogleAPICallError
+    if isinstance(code, int):
+        return code
+    return None
+
+
+def is_retryable(error):
+    """True for rate-limit, server and transient network errors."""
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    smtp_code = getattr(error, 'smtp_code', None)   # smtplib.SMTPResponseException: 4xx is transient
+    if isinstance(smtp_code, int):
+        return 400 <= smtp_code < 500
+    if isinstance(error, (ConnectionError, TimeoutError, smtplib.SMTPServerDisconnected)):
+        return True
+    if any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    # garminconnect.GarminConnectTooManyRequestsError and similar
+    return 'TooManyRequests' in type(error).__name__
+
+
+def _causes(error, limit=20):
+    """The error and the exceptions it wraps (__cause__/__context__, urllib3's .reason, args)."""
+    found, pending = [], [error]
+    while pending and len(found) < limit:
+        current = pending.pop()
+        if isinstance(current, BaseException) and not any(current is e for e in found):
+            found.append(current)
+            pending += [current.__cause__, current.__context__, getattr(current, 'reason', None), *current.args]
+    return found
+
+
+def is_retryable_write(error):
+    """
+    True only when a non-idempotent write was certainly not applied: rate limited (429),
+    refused by the mail server with a transient (4xx) reply, or the connection was refused.
+    5xx, timeouts and dropped connections may have applied it, so they aren't retried.
+    """
+    if _status_code(error) == 429 or 'TooManyRequests' in type(error).__name__:
+        return True
+    smtp_code = getattr(error, 'smtp_code', None)
+    if isinstance(smtp_code, int) and 400 <= smtp_code < 500:
+        return True
+    return any(isinstance(e, ConnectionRefusedError) for e in _causes(error))
+
+
+def retry_after_seconds(error):
+    """Reads a Retry-After header (seconds or HTTP date) from the error, if present."""
+    headers = None
+    resp = getattr(error, 'resp', None)
+    if resp is not None and hasattr(resp, 'get'):
+        headers = resp
+    response = getattr(error, 'response', None)
+    if headers is None and response is not None:
+        headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    value = headers.get('retry-after') or headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for the given attempt (0-based)."""
+    return random.uniform(0, min(MAX_DELAY_S, BASE_DELAY_S * (2 ** attempt)))
+
+
+def _retry_delay(api, error, attempt, retryable=is_retryable):
+    """Seconds to wait before retrying, or None if the error should be re-raised."""
+    if attempt == MAX_RETRIES or not retryable(error):
+        return None
+    delay = retry_after_seconds(error)
+    if delay is None:
+        delay = backoff_delay(attempt)
+    delay = min(delay, MAX_DELAY_S)
+    print(f"{api}: {type(error).__name__} ({error}); retrying in {delay:.1f}s "
+          f"(attempt {attempt + 1}/{MAX_RETRIES})")
+    return delay
+
+
+def call_with_retry(api, func, *args, **kwargs):
+    """
+    Calls func(*args, **kwargs) under the API's rate limit, retrying retryable errors.
+    Non-retryable errors and the final failure are re-raised for the caller to handle.
+    """
+    return _call(api, is_retryable, func, args, kwargs)
+
+
+def call_write_with_retry(api, func, *args, **kwargs):
+    """
+    call_with_retry for non-idempotent writes (inserts, appends): retried only on
+    is_retryable_write errors, so a write that may have been applied is never sent twice.
+    """
+    return _call(api, is_retryable_write, func, args, kwargs)
+
+
+def _call(api, retryable, func, args, kwargs):
+    bucket = get_bucket(api)
+    for attempt in range(MAX_RETRIES + 1):
+        bucket.acquire()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            delay = _retry_delay(api, e, attempt, retryable)
+            if delay is None:
+                raise
+            time.sleep(delay)
+
+
+async def call_with_retry_async(api, func, *args, **kwargs):
+    """call_with_retry for coroutine functions: awaits func(*args, **kwargs) without blocking the loop."""
+    bucket = get_bucket(api)
+    for attempt in range(MAX_RETRIES + 1):
+        await bucket.acquire_async()
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            delay = _retry_delay(api, e, attempt)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
@@ -0,0 +1,236 @@
+"""
+Async Weekly Pipeline
+asyncio orchestration of the weekly pipeline, driven by one async main().
+Gemini is called through its async generate API; the blocking clients
+(gspread, googleapiclient, garminconnect, smtplib) run in worker threads
+via asyncio.to_thread. Independent fetches (profile + Garmin login, then
+sheet logs, sheet history and Garmin recovery data) and independent side
+effects (email, calendar days, sheet log, dashboard export) overlap in a
+single event loop. Checkpoints and week handling match run_weekly_pipeline.
+
+Usage:
+    python async_pipeline.py [profile.json]
+"""
+
+import os
+import sys
+import json
+import asyncio
+
+import api_limiter
+import email_delivery
+import garmin_manager
+import instrumentation
+import sheet_manager
+import static_site
+import calendar_manager
+import dashboard_exporter
+import workout_generator
+
+
+async def _generate_json_async(model, prompt):
+    """Async counterpart of workout_generator._generate_json."""
+    instrumentation.count("gemini.prompt_chars", len(prompt))
+    with instrumentation.span("gemini.generate"):
+        response = await api_limiter.call_with_retry_async(
+            'gemini', model.generate_content_async, prompt,
+            generation_config={"response_mime_type": "application/json"}
+        )
+    instrumentation.record_gemini_usage(response)
+    return json.loads(response.text)
+
+
+async def select_exercises_async(profile, last_week_logs, targets=None):
+    """
+    Async counterpart of workout_generator.select_exercises_for_week: the same
+    workout_generator.plan_generation steps, with the model calls awaited.
+    """
+    model = workout_generator.get_gemini_model()
+    if model is None:
+        return None
+
+    with instrumentation.span("prompt.build"):
+        prompt = workout_generator.build_plan_prompt(profile, last_week_logs, targets)
+
+    generation = workout_generator.plan_generation(profile, prompt, targets)
+    request = next(generation)
+    while True:
+        try:
+            response = await _generate_json_async(model, request)
+        except Exception as e:
+            response = e
+        try:
+            request = generation.send(response)
+        except StopIteration as done:
+            return done.value
+
+
+async def _skip(value=None):
+    return value
+
+
+def _push_day(plan, day_name, calendar_id):
+    """Runs in a worker thread, which keeps its own Calendar service (httplib2 is not thread-safe)."""
+    service = calendar_manager.get_calendar_service()
+    if not service:
+        return None
+    description = workout_generator.build_calendar_description(plan, day_name)
+    return calendar_manager.create_workout_event(service, day_name, description, calendar_id)
+
+
+async def run_weekly_pipeline_async(user_profile, profile_path=workout_generator.PROFILE_FILE, recipient=None,
+                                    output_dir=None, resume=True, garmin_client=None):
+    """
+    Async version of workout_generator.run_weekly_pipeline with the same result dict.
+    garmin_client: an already logged-in Garmin client (logs in on demand if None).
+    """
+    week = user_profile['current_week']
+    checkpoint = workout_generator.open_run_checkpoint(week, output_dir, resume)
+    result = {"week": week, "stages": {}, "resumed": checkpoint.completed_stages()}
+    if result["resumed"]:
+        print(f"Resuming Week {week}; already done: {', '.join(result['resumed'])}")
+
+    sheet_name = user_profile.get('google_sheet_name', 'My Workout Plan')
+    recipient = recipient or user_profile.get('recipient_email') or os.environ.get('RECIPIENT_EMAIL', workout_generator.DEFAULT_RECIPIENT)
+    outbox_dir = os.path.join(output_dir, email_delivery.OUTBOX_DIR) if output_dir else email_delivery.OUTBOX_DIR
+    await asyncio.to_thread(workout_generator.flush_email_outbox, checkpoint, week, recipient, outbox_dir)
+
+    # Fetch everything the pending stages need at once
+    with instrumentation.span("stage.fetch"):
+        last_week_logs, historical_data, recovery_data = await asyncio.gather(
+            _skip() if checkpoint.is_done("plan") else asyncio.to_thread(sheet_manager.get_last_week_logs, sheet_name),
+            _skip() if checkpoint.is_done("plan") and checkpoint.is_done("email") and checkpoint.is_done("site")
+            else asyncio.to_thread(sheet_manager.get_historical_data, sheet_name),
+            _skip() if checkpoint.is_done("dashboard") else asyncio.to_thread(
+                garmin_manager.get_recovery_data, None, user_profile.get('recovery_metrics'),
+                user_profile.get('timezone'), garmin_client
+            )
+        )
+
+    if checkpoint.is_done("plan"):
+        weekly_workout_data = checkpoint.output("plan")
+    else:
+        targets = workout_generator.plan_progression(user_profile, historical_data, profile_path)
+        with instrumentation.span("stage.plan"):
+            weekly_workout_data, readiness = workout_generator.release_block_week(user_profile, targets, output_dir)
+            if weekly_workout_data is None:
+                template = await select_exercises_async(user_profile, last_week_logs, targets)
+                if template:
+                    weekly_workout_data = workout_generator.start_block(user_profile, template, targets,
+                                                                        readiness, output_dir)
+        if not weekly_workout_data:
+            print("Failed to generate weekly plan data.")
+            result["stages"]["plan"] = False
+            result["degraded"] = ["plan"]
+            return result
+        workout_generator.update_database_with_new_exercises(user_profile, weekly_workout_data, profile_path)
+        workout_generator.attach_recovery_content(user_profile, weekly_workout_data)
+        checkpoint.complete("plan", weekly_workout_data)
+    result["stages"]["plan"] = True
+
+    # Rendered once for both the email and the static pages
+    chart_task = None
+    if not (checkpoint.is_done("email") and checkpoint.is_done("site")):
+        chart_task = asyncio.create_task(
+            asyncio.to_thread(workout_generator.build_email_chart, user_profile, historical_data or [])
+        )
+
+    async def email_stage():
+        if checkpoint.is_done("email"):
+            return
+        with instrumentation.span("stage.email"):
+            chart_png = await chart_task
+            email_html = workout_generator.generate_html_email(
+                user_profile, weekly_workout_data,
+                f"cid:{workout_generator.EMAIL_CHART_CID}" if chart_png else None
+            )
+            fallback_path = os.path.join(output_dir, 'weekly_plan.html') if output_dir else 'weekly_plan.html'
+            images = {workout_generator.EMAIL_CHART_CID: chart_png} if chart_png else None
+            if await asyncio.to_thread(workout_generator.send_email, email_html, recipient, week,
+                                       fallback_path, images, outbox_dir):
+                checkpoint.complete("email", {"sent": True})
+            elif not workout_generator.email_configured():
+                checkpoint.complete("email", {"fallback": fallback_path})
+
+    async def calendar_stage():
+        if workout_generator.skip_unconfigured(checkpoint, "calendar", calendar_manager.is_configured()):
+            return
+        if checkpoint.is_done("calendar"):
+            return
+        with instrumentation.span("stage.calendar"):
+            plan_days = workout_generator.training_days(weekly_workout_data)
+            missing = [day for day in plan_days if day not in checkpoint.output("calendar", {})]
+            calendar_id = user_profile.get('calendar_id', recipient)
+            events = await asyncio.gather(*(
+                asyncio.to_thread(_push_day, weekly_workout_data, day, calendar_id) for day in missing
+            ))
+            for day, event in zip(missing, events):
+                if event:
+                    checkpoint.record("calendar", day, event.get('id'))
+            created = checkpoint.output("calendar", {})
+            if all(day in created for day in plan_days):
+                checkpoint.complete("calendar", created)
+
+    async def sheet_stage():
+        if workout_generator.skip_unconfigured(checkpoint, "sheet", sheet_manager.is_configured()):
+            return
+        if checkpoint.is_done("sheet"):
+            return
+        with instrumentation.span("stage.sheet"):
+            logged = await asyncio.to_thread(sheet_manager.log_week_to_sheet, sheet_name, weekly_workout_data, week, None, user_profile)
+            if logged:
+                checkpoint.complete("sheet", {"sheet": sheet_name, **logged})
+
+    async def dashboard_stage():
+        if checkpoint.is_done("dashboard"):
+            return
+        with instrumentation.span("stage.dashboard"):
+            dashboard_path = os.path.join(output_dir, 'dashboard_data.json') if output_dir else None
+            exported = await asyncio.to_thread(
+                dashboard_exporter.export_dashboard_data, weekly_workout_data, user_profile, dashboard_path, recovery_data
+            )
+            if exported:
+                checkpoint.complete("dashboard", exported)
+
+    async def site_stage():
+        if checkpoint.is_done("site"):
+            return
+        with instrumentation.span("stage.site"):
+            site_dir = os.path.join(output_dir, 'site') if output_dir else static_site.SITE_DIR
+            entry = await asyncio.to_thread(
+                static_site.export_week, user_profile, weekly_workout_data, week, await chart_task, site_dir
+            )
+            checkpoint.complete("site", entry)
+
+    # Independent side effects overlap; one failing stage doesn't cancel the others
+    outcomes = await asyncio.gather(email_stage(), calendar_stage(), sheet_stage(), dashboard_stage(), site_stage(),
+                                    return_exceptions=True)
+    for stage, outcome in zip(("email", "calendar", "sheet", "dashboard", "site"), outcomes):
+        if isinstance(outcome, Exception):
+            print(f"Error in {stage} stage: {outcome}")
+
+    result["stages"]["email"] = checkpoint.is_done("email")
+    result["stages"]["calendar"] = workout_generator.stage_outcome(checkpoint, "calendar")
+    result["stages"]["sheet"] = workout_generator.stage_outcome(checkpoint, "sheet")
+    result["stages"]["dashboard"] = checkpoint.output("dashboard", False)
+    result["stages"]["site"] = checkpoint.is_done("site")
+    return workout_generator.finish_week(result, checkpoint, user_profile, profile_path)
+
+
+async def main(profile_path=workout_generator.PROFILE_FILE):
+    """Loads the profile and logs in to Garmin concurrently, then runs the async pipeline."""
+    instrumentation.reset()
+    user_profile, garmin_client = await asyncio.gather(
+        asyncio.to_thread(workout_generator.load_profile, profile_path),
+        asyncio.to_thread(garmin_manager.get_garmin_client)
+    )
+    if not user_profile:
+        return 1
+    result = await run_weekly_pipeline_async(user_profile, profile_path, garmin_client=garmin_client)
+    await asyncio.to_thread(email_delivery.close_connection)
+    instrumentation.write_run_report("weekly_async")
+    return 1 if result["degraded"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(*sys.argv[1:2])))
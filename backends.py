@@ -0,0 +1,479 @@
+"""
+Service Backends
+Pluggable registry for the external services (Sheets, Calendar, Gemini,
+Garmin, SMTP). Modules build their clients through create(); by default
+that calls the real constructor, but any service can be switched to an
+in-process fake with configurable latency and error rate so the weekly
+and daily pipelines can be load-tested locally and deterministically.
+
+Enable fakes from the environment:
+    WORKOUT_BACKENDS=fake                  # all services (or e.g. "sheets,calendar")
+    FAKE_LATENCY_MS=150 FAKE_ERROR_RATE=0.05 FAKE_SEED=42
+or in code with configure("fake", latency_s=0.15, error_rate=0.05, seed=42).
+"""
+
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import threading
+from types import SimpleNamespace
+
+SERVICES = ("sheets", "calendar", "gemini", "garmin", "smtp")
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# Status raised by injected failures; retryable, so api_limiter backs off as it would live
+FAKE_ERROR_STATUS = 503
+
+_lock = threading.RLock()
+_config = {"fake": set(), "latency_s": {}, "error_rate": {}, "rng": random.Random(), "generation": 0}
+_state = {}
+
+
+class FakeServiceError(Exception):
+    """Injected failure. Carries an HTTP-style code so retry logic treats it like a real 503."""
+    def __init__(self, service, code=FAKE_ERROR_STATUS):
+        super().__init__(f"injected {service} failure ({code})")
+        self.code = code
+
+
+def _per_service(value):
+    """Expands a number into {service: number}, or validates a per-service dict."""
+    if isinstance(value, dict):
+        return {s: float(value.get(s, 0.0)) for s in SERVICES}
+    return {s: float(value or 0.0) for s in SERVICES}
+
+
+def configure(mode="live", services=None, latency_s=0.0, error_rate=0.0, seed=None):
+    """
+    Selects live or fake backends.
+
+    Args:
+        mode: "live" or "fake"
+        services: Services to switch (default: all of SERVICES)
+        latency_s: Added delay per fake call, a number or {service: seconds}
+        error_rate: Probability (0-1) that a fake call raises FakeServiceError, number or dict
+        seed: Seed for the fault injector so runs are repeatable
+
+    Fake state (sheets, events, sent mail) is cleared on every call.
+    """
+    if mode not in ("live", "fake"):
+        raise ValueError(f"Unknown backend mode: {mode}")
+    selected = set(services or SERVICES)
+    with _lock:
+        _config["fake"] = selected if mode == "fake" else set()
+        _config["latency_s"] = _per_service(latency_s)
+        _config["error_rate"] = _per_service(error_rate)
+        _config["rng"] = random.Random(seed)
+        _config["generation"] += 1
+        _state.clear()
+
+
+def configure_from_env():
+    """Applies WORKOUT_BACKENDS / FAKE_LATENCY_MS / FAKE_ERROR_RATE / FAKE_SEED if set."""
+    value = os.environ.get('WORKOUT_BACKENDS', '').strip().lower()
+    if not value or value == 'live':
+        return
+    services = None if value in ('fake', 'all') else [s.strip() for s in value.split(',') if s.strip()]
+    seed = os.environ.get('FAKE_SEED')
+    configure(
+        "fake",
+        services=services,
+        latency_s=float(os.environ.get('FAKE_LATENCY_MS', 0)) / 1000,
+        error_rate=float(os.environ.get('FAKE_ERROR_RATE', 0)),
+        seed=int(seed) if seed else None
+    )
+
+
+def is_fake(service):
+    return service in _config["fake"]
+
+
+def generation():
+    """Changes on every configure(); callers that cache clients compare against it."""
+    return _config["generation"]
+
+
+def env_credentials(service, *names):
+    """
+    Reads credentials from the environment. With a fake backend, missing values
+    are filled with placeholders so load tests don't need real accounts.
+    """
+    values = tuple(os.environ.get(name) for name in names)
+    if is_fake(service):
+        values = tuple(v or f"fake-{name.lower()}" for v, name in zip(values, names))
+    return values
+
+
+def create(service, live_factory, *args, **kwargs):
+    """Returns the fake for `service` when enabled, otherwise live_factory(*args, **kwargs)."""
+    if is_fake(service):
+        return FAKES[service](*args, **kwargs)
+    return live_factory(*args, **kwargs)
+
+
+def fake_state(service):
+    """Shared in-memory state for a fake service (persists across clients until configure())."""
+    with _lock:
+        return _state.setdefault(service, {})
+
+
+def _draw(service):
+    """Counts one fake call (fake_state('calls')[service]) and returns its (latency, fail)."""
+    with _lock:
+        calls = _state.setdefault("calls", {})
+        calls[service] = calls.get(service, 0) + 1
+        return (_config["latency_s"].get(service, 0.0),
+                _config["rng"].random() < _config["error_rate"].get(service, 0.0))
+
+
+def _simulate(service):
+    """Applies the configured latency and maybe raises an injected failure."""
+    latency, fail = _draw(service)
+    if latency:
+        time.sleep(latency)
+    if fail:
+        raise FakeServiceError(service)
+
+
+async def _simulate_async(service):
+    latency, fail = _draw(service)
+    if latency:
+        await asyncio.sleep(latency)
+    if fail:
+        raise FakeServiceError(service)
+
+
+def _load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), 'r') as f:
+        return json.load(f)
+
+
+# --- Sheets (gspread) ---
+
+def _cell_value(cell):
+    """Plain value of a Sheets API CellData."""
+    value = cell.get("userEnteredValue", {})
+    for key in ("stringValue", "numberValue", "boolValue", "formulaValue"):
+        if key in value:
+            return value[key]
+    return ""
+
+
+class FakeWorksheet:
+    def __init__(self, title, sheet_id=0, row_count=1000):
+        self.title = title
+        self.id = sheet_id
+        self.rows = []
+        self.row_count = row_count
+
+    def grid_rows(self):
+        """Rows in the grid; values written past the end grow it, like gspread's append_row."""
+        return max(self.row_count, len(self.rows))
+
+    def get_all_records(self):
+        _simulate("sheets")
+        if not self.rows:
+            return []
+        header = self.rows[0]
+        return [dict(zip(header, row)) for row in self.rows[1:] if any(v not in ("", None) for v in row)]
+
+    def col_values(self, col):
+        _simulate("sheets")
+        values = [row[col - 1] if len(row) >= col else "" for row in self.rows]
+        while values and values[-1] in ("", None):
+            values.pop()
+        return values
+
+    def append_row(self, values):
+        _simulate("sheets")
+        self.rows.append(list(values))
+
+    def update(self, range_name=None, values=None):
+        _simulate("sheets")
+        start = int(''.join(c for c in range_name.split(':')[0] if c.isdigit())) - 1
+        while len(self.rows) < start + len(values):
+            self.rows.append([])
+        for offset, row in enumerate(values):
+            self.rows[start + offset] = list(row)
+
+
+class FakeSpreadsheet:
+    def __init__(self, title):
+        self.title = title
+        self.worksheets = [FakeWorksheet("Sheet1")]
+        self.requests = []
+
+    def get_worksheet(self, index):
+        _simulate("sheets")
+        return self.worksheets[index]
+
+    def worksheet(self, title):
+        _simulate("sheets")
+        for ws in self.worksheets:
+            if ws.title == title:
+                return ws
+        import gspread
+        raise gspread.exceptions.WorksheetNotFound(title)
+
+    def add_worksheet(self, title, rows=100, cols=20):
+        _simulate("sheets")
+        ws = FakeWorksheet(title, max(w.id for w in self.worksheets) + 1, rows)
+        self.worksheets.append(ws)
+        return ws
+
+    def fetch_sheet_metadata(self, params=None):
+        _simulate("sheets")
+        return {"sheets": [
+            {"properties": {"sheetId": ws.id, "title": ws.title, "gridProperties": {"rowCount": ws.grid_rows()}}}
+            for ws in self.worksheets
+        ]}
+
+    def values_get(self, range_name):
+        """Values of a single-tab A1 range ("'Tab'!A5:C9"), trailing empty rows trimmed."""
+        _simulate("sheets")
+        title, cells = range_name.rsplit('!', 1)
+        ws = next(w for w in self.worksheets if w.title == title.strip("'"))
+        (first_col, first_row), (last_col, last_row) = [
+            (ord(re.match(r'[A-Z]', ref).group()) - ord('A'), int(re.search(r'\d+', ref).group()))
+            for ref in cells.split(':')
+        ]
+        values = [list(row[first_col:last_col + 1]) for row in ws.rows[first_row - 1:last_row]]
+        values = [row if any(v not in ("", None) for v in row) else [] for row in values]
+        while values and not values[-1]:
+            values.pop()
+        return {"range": range_name, "values": values} if values else {"range": range_name}
+
+    def batch_update(self, body):
+        """
+        Applies addSheet, updateCells, appendCells, row appendDimension and
+        insertDimension/deleteDimension requests (values only) in order.
+        """
+        _simulate("sheets")
+        by_id = {ws.id: ws for ws in self.worksheets}
+        replies = []
+        for request in body["requests"]:
+            self.requests.append(request)
+            if "addSheet" in request:
+                props = request["addSheet"]["properties"]
+                ws = FakeWorksheet(props["title"], props["sheetId"],
+                                   props.get("gridProperties", {}).get("rowCount", 1000))
+                self.worksheets.append(ws)
+                by_id[ws.id] = ws
+            elif "updateCells" in request:
+                update = request["updateCells"]
+                ws = by_id[update["start"]["sheetId"]]
+                start = update["start"].get("rowIndex", 0)
+                column = update["start"].get("columnIndex", 0)
+                for offset, row in enumerate(update["rows"]):
+                    while len(ws.rows) <= start + offset:
+                        ws.rows.append([])
+                    values = [_cell_value(c) for c in row.get("values", [])]
+                    current = ws.rows[start + offset] + [""] * max(column - len(ws.rows[start + offset]), 0)
+                    ws.rows[start + offset] = current[:column] + values + current[column + len(values):]
+            elif "appendCells" in request:
+                append = request["appendCells"]
+                ws = by_id[append["sheetId"]]
+                while ws.rows and not any(v not in ("", None) for v in ws.rows[-1]):
+                    ws.rows.pop()
+                ws.rows.extend([_cell_value(c) for c in row.get("values", [])] for row in append["rows"])
+            elif "appendDimension" in request:
+                append = request["appendDimension"]
+                ws = by_id[append["sheetId"]]
+                ws.row_count = ws.grid_rows() + append["length"]
+            elif "insertDimension" in request:
+                rng = request["insertDimension"]["range"]
+                ws = by_id[rng["sheetId"]]
+                ws.row_count = ws.grid_rows() + rng["endIndex"] - rng["startIndex"]
+                while len(ws.rows) < rng["startIndex"]:
+                    ws.rows.append([])
+                ws.rows[rng["startIndex"]:rng["startIndex"]] = [[] for _ in range(rng["endIndex"] - rng["startIndex"])]
+            elif "deleteDimension" in request:
+                rng = request["deleteDimension"]["range"]
+                ws = by_id[rng["sheetId"]]
+                ws.row_count = ws.grid_rows() - (rng["endIndex"] - rng["startIndex"])
+                del ws.rows[rng["startIndex"]:rng["endIndex"]]
+            replies.append({})
+        return {"replies": replies}
+
+
+class FakeSheetsClient:
+    """Stands in for an authorized gspread client. Spreadsheets are created on first open."""
+    def __init__(self, *args, **kwargs):
+        self.spreadsheets = fake_state("sheets")
+
+    def open(self, title):
+        _simulate("sheets")
+        with _lock:
+            return self.spreadsheets.setdefault(title, FakeSpreadsheet(title))
+
+
+# --- Calendar (googleapiclient) ---
+
+class _Request:
+    def __init__(self, run):
+        self.execute = run
+
+
+class FakeCalendarService:
+    """Stands in for build('calendar', 'v3'). Supports events().insert/list/patch/delete."""
+    def __init__(self, *args, **kwargs):
+        self.calendars = fake_state("calendar")
+        self.recorded = _load_fixture('calendar_insert_response.json')
+
+    def events(self):
+        return self
+
+    def _events(self, calendar_id):
+        with _lock:
+            return self.calendars.setdefault(calendar_id, {})
+
+    def insert(self, calendarId, body):
+        def run():
+            _simulate("calendar")
+            events = self._events(calendarId)
+            with _lock:
+                # A counter rather than len(events), so ids stay unique after deletes
+                counters = fake_state("calendar_ids")
+                counters[calendarId] = counters.get(calendarId, 0) + 1
+                event_id = f"fake{counters[calendarId]:06d}"
+                event = dict(self.recorded, **body, id=event_id,
+                             htmlLink=f"https://calendar.example/event?eid={event_id}")
+                events[event_id] = event
+            return event
+        return _Request(run)
+
+    def list(self, calendarId, q=None, pageToken=None, **kwargs):
+        def run():
+            _simulate("calendar")
+            items = [e for e in self._events(calendarId).values() if not q or q in e.get("summary", "")]
+            return {"items": items}
+        return _Request(run)
+
+    def patch(self, calendarId, eventId, body):
+        def run():
+            _simulate("calendar")
+            with _lock:
+                event = self._events(calendarId).get(eventId)
+                if event is None:
+                    raise FakeServiceError("calendar", code=404)
+                event.update(body)
+                return dict(event)
+        return _Request(run)
+
+    def delete(self, calendarId, eventId):
+        def run():
+            _simulate("calendar")
+            with _lock:
+                self._events(calendarId).pop(eventId, None)
+            return ""
+        return _Request(run)
+
+
+# --- Gemini (google.generativeai) ---
+
+class FakeGeminiModel:
+    """Stands in for genai.GenerativeModel. Answers every prompt with the recorded plan response."""
+    def __init__(self, model_name=None, *args, **kwargs):
+        self.model_name = model_name
+        self.recorded = _load_fixture('gemini_plan_response.json')
+        self.prompts = fake_state("gemini").setdefault("prompts", [])
+
+    def _response(self, prompt):
+        with _lock:
+            self.prompts.append(prompt)
+        return SimpleNamespace(
+            text=self.recorded["text"],
+            usage_metadata=SimpleNamespace(**self.recorded.get("usage_metadata", {}))
+        )
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        _simulate("gemini")
+        return self._response(prompt)
+
+    async def generate_content_async(self, prompt, generation_config=None, **kwargs):
+        await _simulate_async("gemini")
+        return self._response(prompt)
+
+
+# --- Garmin (garminconnect) ---
+
+class FakeGarminClient:
+    """Stands in for garminconnect.Garmin, replaying the recorded payloads for any date."""
+    def __init__(self, email=None, password=None, payloads=None, **kwargs):
+        self.payloads = payloads or _load_fixture('garmin_payloads.json')
+        self.display_name = "fake-athlete"
+
+    def login(self):
+        _simulate("garmin")
+
+    def get_sleep_data(self, date_str):
+        _simulate("garmin")
+        return self.payloads["sleep"]
+
+    def get_stress_data(self, date_str):
+        _simulate("garmin")
+        return self.payloads["stress"]
+
+    def get_body_battery(self, date_str):
+        _simulate("garmin")
+        return self.payloads["body_battery"]
+
+    def get_hrv_data(self, date_str):
+        _simulate("garmin")
+        return self.payloads["hrv"]
+
+
+# --- SMTP (smtplib) ---
+
+class FakeSMTP:
+    """
+    Stands in for smtplib.SMTP_SSL. Sent messages are kept in fake_state('smtp')['sent']
+    and every new connection is counted in fake_state('smtp')['connections'].
+    """
+    def __init__(self, host=None, port=None, **kwargs):
+        _simulate("smtp")
+        state = fake_state("smtp")
+        with _lock:
+            state["connections"] = state.get("connections", 0) + 1
+        self.sent = state.setdefault("sent", [])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.quit()
+        return False
+
+    def login(self, user, password):
+        _simulate("smtp")
+
+    def noop(self):
+        return (250, b"OK")
+
+    def quit(self):
+        return (221, b"Bye")
+
+    def close(self):
+        pass
+
+    def send_message(self, msg):
+        _simulate("smtp")
+        with _lock:
+            self.sent.append(msg)
+        return {}
+
+
+FAKES = {
+    "sheets": FakeSheetsClient,
+    "calendar": FakeCalendarService,
+    "gemini": FakeGeminiModel,
+    "garmin": FakeGarminClient,
+    "smtp": FakeSMTP,
+}
+
+
+configure_from_env()
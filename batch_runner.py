@@ -0,0 +1,181 @@
+"""
+Batch Runner
+Runs the weekly pipeline for many athletes from one deployment.
+Athletes run in parallel threads; each external API gets its own
+concurrency cap so Gemini, Sheets, Calendar and email calls overlap
+without flooding any single service. Each athlete logs in to Garmin with
+its own account (GARMIN_EMAIL_<NAME> / GARMIN_PASSWORD_<NAME>) and keeps
+its recovery cache under its output directory.
+
+Usage:
+    python batch_runner.py athletes/                 # directory of profile JSON files
+    python batch_runner.py athletes.json --workers 8 # manifest file
+    python batch_runner.py athletes/ --fake-backends --latency-ms 200 --error-rate 0.05
+                                                     # local load test, no live services
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import backends
+import email_delivery
+import garmin_manager
+import instrumentation
+import workout_generator
+
+# Max concurrent in-flight calls per API across all athletes
+API_CONCURRENCY = {
+    "gemini": 2,
+    "sheets": 4,
+    "calendar": 4,
+    "email": 2
+}
+
+DEFAULT_WORKERS = 4
+DEFAULT_OUTPUT_DIR = 'batch_output'
+
+
+def garmin_env(name):
+    """Env var names of an athlete's own Garmin account: GARMIN_EMAIL_<NAME>, GARMIN_PASSWORD_<NAME>."""
+    suffix = re.sub(r'[^A-Z0-9]', '_', name.upper())
+    return (f"GARMIN_EMAIL_{suffix}", f"GARMIN_PASSWORD_{suffix}")
+
+
+def load_manifest(source):
+    """
+    Reads the athlete list from a directory of profile files or a manifest.
+
+    A manifest is a JSON list of {"profile": path, "recipient": email (optional),
+    "name": label (optional), "garmin_env": [email_var, password_var] (optional)};
+    relative profile paths are resolved against the manifest.
+    Returns a list of {"name", "profile", "recipient", "garmin_env"} entries.
+    """
+    if os.path.isdir(source):
+        athletes = []
+        for f in sorted(os.listdir(source)):
+            if f.endswith('.json'):
+                name = os.path.splitext(f)[0]
+                athletes.append({"name": name, "profile": os.path.join(source, f), "recipient": None,
+                                 "garmin_env": garmin_env(name)})
+        return athletes
+
+    with open(source, 'r') as f:
+        entries = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(source))
+    athletes = []
+    for entry in entries:
+        profile_path = os.path.join(base_dir, entry["profile"])
+        name = entry.get("name") or os.path.splitext(os.path.basename(profile_path))[0]
+        athletes.append({
+            "name": name,
+            "profile": profile_path,
+            "recipient": entry.get("recipient"),
+            "garmin_env": tuple(entry.get("garmin_env") or garmin_env(name))
+        })
+    return athletes
+
+
+def _run_athlete(athlete, output_dir, api_slots):
+    """
+    Runs the pipeline for one athlete and returns its report entry. Garmin calls and the
+    recovery cache are the athlete's own (see garmin_manager.athlete_account).
+    """
+    started = time.perf_counter()
+    report = {"athlete": athlete["name"], "profile": athlete["profile"], "status": "failed"}
+
+    athlete_dir = os.path.join(output_dir, athlete["name"])
+    os.makedirs(athlete_dir, exist_ok=True)
+
+    cache_file = os.path.join(athlete_dir, garmin_manager.RECOVERY_CACHE_NAME)
+    credential_env = athlete.get("garmin_env") or garmin_env(athlete["name"])
+    try:
+        with garmin_manager.athlete_account(cache_file, credential_env):
+            profile = workout_generator.load_profile(athlete["profile"])
+            if profile is None:
+                report["error"] = "profile not found"
+            else:
+                result = workout_generator.run_weekly_pipeline(
+                    profile,
+                    profile_path=athlete["profile"],
+                    recipient=athlete["recipient"],
+                    output_dir=athlete_dir,
+                    api_slots=api_slots
+                )
+                report.update(result)
+                if not result["stages"].get("plan"):
+                    report["status"] = "failed"
+                else:
+                    report["status"] = "degraded" if result.get("degraded") else "ok"
+    except Exception as e:
+        report["error"] = str(e)
+        report["traceback"] = traceback.format_exc()
+
+    report["duration_s"] = round(time.perf_counter() - started, 2)
+    return report
+
+
+def run_batch(athletes, output_dir=DEFAULT_OUTPUT_DIR, workers=DEFAULT_WORKERS):
+    """
+    Runs every athlete through the weekly pipeline with bounded concurrency.
+    Writes <output_dir>/batch_report.json and returns the report.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    api_slots = {api: threading.BoundedSemaphore(limit) for api, limit in API_CONCURRENCY.items()}
+
+    started = time.perf_counter()
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_athlete, athlete, output_dir, api_slots) for athlete in athletes]
+        for future in as_completed(futures):
+            result = future.result()
+            print(f"[{result['athlete']}] {result['status']} in {result['duration_s']}s")
+            results.append(result)
+    # All athletes shared one SMTP connection
+    email_delivery.close_connection()
+
+    results.sort(key=lambda r: r["athlete"])
+    report = {
+        "athletes": len(athletes),
+        "succeeded": sum(1 for r in results if r["status"] == "ok"),
+        "duration_s": round(time.perf_counter() - started, 2),
+        "results": results
+    }
+    report_path = os.path.join(output_dir, 'batch_report.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Batch complete: {report['succeeded']}/{report['athletes']} succeeded. Report: {report_path}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the weekly workout pipeline for many athletes.")
+    parser.add_argument('source', help="Directory of profile JSON files or a manifest JSON file")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Athletes processed in parallel")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_DIR, help="Directory for per-athlete artifacts and the report")
+    parser.add_argument('--fake-backends', action='store_true', help="Use the in-process fake services (see backends.py)")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Latency added to each fake service call")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Probability that a fake service call fails")
+    parser.add_argument('--seed', type=int, help="Seed for fake latency/error injection")
+    args = parser.parse_args(argv)
+
+    if args.fake_backends:
+        backends.configure("fake", latency_s=args.latency_ms / 1000, error_rate=args.error_rate, seed=args.seed)
+
+    athletes = load_manifest(args.source)
+    if not athletes:
+        print(f"No athlete profiles found in {args.source}")
+        return 1
+    report = run_batch(athletes, args.output, args.workers)
+    instrumentation.write_run_report("batch")
+    return 0 if report["succeeded"] == report["athletes"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
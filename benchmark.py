@@ -0,0 +1,306 @@
+"""
+Offline Benchmark
+Times the CPU-bound stages of the weekly and daily pipelines against the
+recorded fixtures in fixtures/ (Gemini response, gspread records, Garmin
+payloads, Calendar insert response) at 1x, 10x and 100x history sizes.
+Nothing touches the network: external clients are replaced by fixture
+replays (the fakes in backends.py) and outbound sockets are blocked
+for the whole run.
+
+Usage:
+    python benchmark.py                                   # all cases, 1x/10x/100x
+    python benchmark.py --cases email.render chart.render --scales 1 10
+    python benchmark.py --compare benchmark_results/bench_20260105_101500.json
+"""
+
+import os
+import io
+import sys
+import copy
+import json
+import time
+import socket
+import argparse
+import platform
+import statistics
+import contextlib
+from datetime import date, datetime, timedelta
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import api_limiter
+import backends
+import instrumentation
+import plan_schema
+import progression_engine
+import sheet_manager
+import visualizer
+import calendar_manager
+import garmin_manager
+import dashboard_exporter
+import recovery_content
+import workout_generator
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'benchmark_results')
+PROFILE_PATH = os.path.join(os.path.dirname(__file__), 'user_profile.json')
+
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_REPEAT = 5
+
+# Days of recovery history at 1x (one readiness baseline window)
+BASE_HISTORY_DAYS = 28
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), 'r') as f:
+        return json.load(f)
+
+
+@contextlib.contextmanager
+def network_blocked():
+    """Makes any outbound connection fail loudly instead of silently hitting a live API."""
+    def refuse(self, address):
+        raise RuntimeError(f"benchmark attempted a network connection to {address}")
+    original = socket.socket.connect, socket.socket.connect_ex
+    socket.socket.connect = socket.socket.connect_ex = refuse
+    try:
+        yield
+    finally:
+        socket.socket.connect, socket.socket.connect_ex = original
+
+
+# --- Scaled inputs ---
+
+def scale_records(records, scale):
+    """Repeats the recorded sheet rows `scale` times, one week further back per copy."""
+    scaled = []
+    for week in range(scale - 1, -1, -1):
+        for record in records:
+            shifted = dict(record)
+            shifted["Date"] = (datetime.strptime(record["Date"], '%Y-%m-%d') - timedelta(weeks=week)).strftime('%Y-%m-%d')
+            shifted["Week"] = record["Week"] - week
+            scaled.append(shifted)
+    return scaled
+
+
+def scale_body_battery(payloads, scale):
+    """Resamples the recorded body battery day to `scale` times its sample rate."""
+    payloads = copy.deepcopy(payloads)
+    readings = payloads["body_battery"][0]["bodyBatteryValuesArray"]
+    step = (readings[1][0] - readings[0][0]) // scale if len(readings) > 1 else 0
+    payloads["body_battery"][0]["bodyBatteryValuesArray"] = [
+        [ts + i * step, value] for ts, value in readings for i in range(scale)
+    ]
+    return payloads
+
+
+def build_recovery_history(recovery_data, days):
+    """Synthesizes `days` of cached recovery history ending at recovery_data['date']."""
+    end = date.fromisoformat(recovery_data["date"])
+    history = {}
+    for i in range(days, 0, -1):
+        wobble = (i * 7919) % 11 - 5  # deterministic day-to-day variation
+        history[(end - timedelta(days=i)).isoformat()] = {
+            "sleep_duration_hours": 7.2 + wobble / 10,
+            "sleep_score": 78 + wobble,
+            "stress_level": 32 - wobble,
+            "body_battery_morning": 70 + wobble * 2,
+            "hrv_avg": 46 + wobble
+        }
+    history[recovery_data["date"]] = {m: recovery_data.get(m) for m in garmin_manager.CACHED_METRICS}
+    return history
+
+
+# --- Cases: setup(scale) returns the zero-argument callable that gets timed ---
+
+def setup_context():
+    """Loads the fixtures once and builds the shared plan used by the downstream cases."""
+    with open(PROFILE_PATH, 'r') as f:
+        profile = json.load(f)
+    plan, _ = plan_schema.repair_plan(json.loads(load_fixture('gemini_plan_response.json')["text"]))
+    plan['recovery_content'] = recovery_content.select_recovery_content(profile)
+    return {
+        "profile": profile,
+        "plan": plan,
+        "records": load_fixture('sheet_records.json'),
+        "garmin": load_fixture('garmin_payloads.json')
+    }
+
+
+def case_prompt_build(ctx, scale):
+    logs = scale_records(ctx["records"], scale)
+    return lambda: workout_generator.build_plan_prompt(ctx["profile"], logs)
+
+
+def case_progression_estimate(ctx, scale):
+    records = scale_records(ctx["records"], scale)
+    profile = copy.deepcopy(ctx["profile"])
+    return lambda: progression_engine.update_progression(profile, records)
+
+
+def case_plan_repair(ctx, scale):
+    model = backends.FakeGeminiModel()
+    expected_days = [d['day_name'] for d in ctx["profile"]['schedule_slots']]
+
+    def run():
+        for _ in range(scale):
+            response = model.generate_content("benchmark")
+            instrumentation.record_gemini_usage(response)
+            plan_schema.repair_plan(json.loads(response.text), expected_days)
+    return run
+
+
+def case_email_render(ctx, scale):
+    records = scale_records(ctx["records"], scale)
+
+    def run():
+        chart = workout_generator.build_email_chart(ctx["profile"], historical_data=records)
+        workout_generator.generate_html_email(ctx["profile"], ctx["plan"], f"cid:{workout_generator.EMAIL_CHART_CID}" if chart else None)
+    return run
+
+
+def case_chart_render(ctx, scale):
+    records = scale_records(ctx["records"], scale)
+    return lambda: visualizer.render_progress_chart_png(records)
+
+
+def case_sheet_rows(ctx, scale):
+    def run():
+        for week in range(1, scale + 1):
+            sheet_manager.build_week_rows(ctx["plan"], week, None, ctx["profile"])
+    return run
+
+
+def case_calendar_push(ctx, scale):
+    service = backends.FakeCalendarService()
+    days = [d['day_name'] for d in ctx["profile"]['schedule_slots'] if d['day_name'] in ctx["plan"]]
+
+    def run():
+        for _ in range(scale):
+            for day_name in days:
+                description = workout_generator.build_calendar_description(ctx["plan"], day_name)
+                calendar_manager.create_workout_event(service, day_name, description, 'fixture@example.com')
+    return run
+
+
+def case_garmin_recovery(ctx, scale):
+    client = backends.FakeGarminClient(payloads=scale_body_battery(ctx["garmin"], scale))
+    target = date.fromisoformat(ctx["garmin"]["sleep"]["dailySleepDTO"]["calendarDate"])
+    profile = ctx["profile"]
+    return lambda: garmin_manager.get_recovery_data(
+        target, profile.get('recovery_metrics'), profile.get('timezone'), client=client
+    )
+
+
+def case_dashboard_export(ctx, scale):
+    client = backends.FakeGarminClient(payloads=ctx["garmin"])
+    target = date.fromisoformat(ctx["garmin"]["sleep"]["dailySleepDTO"]["calendarDate"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        recovery_data = garmin_manager.get_recovery_data(target, client=client)
+    history = build_recovery_history(recovery_data, BASE_HISTORY_DAYS * scale)
+
+    def run():
+        data = dashboard_exporter.build_dashboard_data(ctx["plan"], ctx["profile"], recovery_data, history)
+        json.dumps(data, indent=2)
+    return run
+
+
+CASES = {
+    "prompt.build": case_prompt_build,
+    "progression.estimate": case_progression_estimate,
+    "plan.repair": case_plan_repair,
+    "email.render": case_email_render,
+    "chart.render": case_chart_render,
+    "sheet.rows": case_sheet_rows,
+    "calendar.push": case_calendar_push,
+    "garmin.recovery": case_garmin_recovery,
+    "dashboard.export": case_dashboard_export,
+}
+
+
+def time_case(func, repeat):
+    """Runs func once to warm up, then `repeat` timed runs. Returns min/median/mean in ms."""
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.mean(timings), 3)
+    }
+
+
+def run_benchmarks(cases=None, scales=DEFAULT_SCALES, repeat=DEFAULT_REPEAT):
+    """Runs the selected cases at each scale and returns the results document."""
+    for api in api_limiter.RATE_LIMITS:
+        api_limiter.set_rate_limit(api, rate=1e9, burst=1e9)
+
+    results = {}
+    with network_blocked():
+        ctx = setup_context()
+        for name in cases or CASES:
+            results[name] = {}
+            for scale in scales:
+                func = CASES[name](ctx, scale)
+                results[name][f"{scale}x"] = time_case(func, repeat)
+                instrumentation.reset()
+                print(f"{name:<20}{scale:>5}x {results[name][f'{scale}x']['median_ms']:>12.2f} ms")
+
+    return {
+        "created": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results
+    }
+
+
+def save_results(report, results_dir=RESULTS_DIR):
+    """Writes the report to <results_dir>/bench_<timestamp>.json and returns the path."""
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def compare_results(report, baseline):
+    """Median time ratio (current / baseline) for every case and scale present in both."""
+    ratios = {}
+    for name, scales in report["results"].items():
+        for scale, timing in scales.items():
+            before = baseline.get("results", {}).get(name, {}).get(scale)
+            if before and before["median_ms"]:
+                ratios.setdefault(name, {})[scale] = round(timing["median_ms"] / before["median_ms"], 2)
+    return ratios
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the workout pipeline.")
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), help="Cases to run (default: all)")
+    parser.add_argument('--scales', nargs='+', type=int, default=DEFAULT_SCALES, help="History size multipliers")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Timed runs per case and scale")
+    parser.add_argument('--compare', help="Earlier results file to compare medians against")
+    parser.add_argument('--output', default=RESULTS_DIR, help="Directory for the results file")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.cases, args.scales, args.repeat)
+    path = save_results(report, args.output)
+    print(f"Results saved to {path}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            ratios = compare_results(report, json.load(f))
+        print(f"\nMedian vs {args.compare} (<1.0 is faster):")
+        for name, scales in ratios.items():
+            print(f"{name:<20}" + "  ".join(f"{scale}: {ratio:.2f}" for scale, ratio in scales.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,11 @@
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 import datetime
 import json
+import os
+import threading
+
+import api_limiter
+import backends
+import instrumentation
 
 # Path to the credentials file
 CREDENTIALS_FILE = 'credentials.json' # This will be created by the GitHub Action
@@ -10,31 +14,55 @@ CREDENTIALS_FILE = 'credentials.json' # This will be created by the GitHub Actio
 # Locally, the user has 'gen-lang-client...json'.
 # I'll make it robust to check for both or use an env var.
 
+LOCAL_CREDENTIALS_FILE = 'gen-lang-client-0542545748-1653ac1bd093.json'
+
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
+# httplib2 connections are not thread-safe, so each worker thread keeps its own service
+_thread_local = threading.local()
+
 def get_calendar_service():
-    """Authenticates and returns the Calendar service."""
-    creds = None
-    # Try local specific file first, then generic 'credentials.json'
-    local_creds = 'gen-lang-client-0542545748-1653ac1bd093.json'
-    
-    try:
-        if os.path.exists(local_creds):
-            creds = service_account.Credentials.from_service_account_file(
-                local_creds, scopes=SCOPES)
-        elif os.path.exists('credentials.json'):
-             creds = service_account.Credentials.from_service_account_file(
-                'credentials.json', scopes=SCOPES)
-        else:
-            print("Error: No credentials file found.")
-            return None
+    """
+    Returns the Calendar service, reusing one authenticated service per thread.
+    """
+    service = getattr(_thread_local, 'service', None)
+    if service is None or getattr(_thread_local, 'generation', None) != backends.generation():
+        service = backends.create('calendar', _build_calendar_service)
+        _thread_local.service = service
+        _thread_local.generation = backends.generation()
+    return service
+
+def credentials_file():
+    """The service account file to use (the local one first), or None if neither exists."""
+    for path in (LOCAL_CREDENTIALS_FILE, CREDENTIALS_FILE):
+        if os.path.exists(path):
+            return path
+    return None
+
+def is_configured():
+    """False when there are no credentials at all, so the calendar stage is skipped rather than failed."""
+    return backends.is_fake('calendar') or credentials_file() is not None
+
+@instrumentation.timed("calendar.authorize")
+def _build_calendar_service():
+    """Authenticates and builds a new Calendar service."""
+    # Imported on first use so importing this module stays cheap
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+    path = credentials_file()
+    if path is None:
+        print("Error: No credentials file found.")
+        return None
 
+    try:
+        creds = service_account.Credentials.from_service_account_file(path, scopes=SCOPES)
         service = build('calendar', 'v3', credentials=creds)
         return service
     except Exception as e:
         print(f"Auth Error: {e}")
         return None
 
+@instrumentation.timed("calendar.create_event")
 def create_workout_event(service, day_name, exercise_summary, calendar_id='primary'):
     """
     Creates a workout event on the user's calendar.
@@ -59,7 +87,7 @@ def create_workout_event(service, day_name, exercise_summary, calendar_id='prima
     
     target_day_idx = day_map.get(day_name)
     if target_day_idx is None:
-        return
+        return None
         
     current_day_idx = today.weekday()
     
@@ -89,9 +117,35 @@ def create_workout_event(service, day_name, exercise_summary, calendar_id='prima
     }
 
     try:
-        event = service.events().insert(calendarId=calendar_id, body=event).execute()
+        event = api_limiter.call_write_with_retry('calendar', service.events().insert(calendarId=calendar_id, body=event).execute)
         print(f"Event created: {event.get('htmlLink')}")
+        return event
     except Exception as e:
         print(f"Error creating event: {e}")
+        return None
 
 import os
+
+@instrumentation.timed("calendar.update_event")
+def update_workout_event(service, event_id, exercise_summary, calendar_id='primary'):
+    """
+    Rewrites the description of an existing workout event (date and title are kept).
+    Returns the updated event, or None on error.
+    """
+    try:
+        return api_limiter.call_with_retry('calendar', service.events().patch(
+            calendarId=calendar_id, eventId=event_id, body={'description': exercise_summary}
+        ).execute)
+    except Exception as e:
+        print(f"Error updating event: {e}")
+        return None
+
+@instrumentation.timed("calendar.delete_event")
+def delete_workout_event(service, event_id, calendar_id='primary'):
+    """Deletes a workout event. Returns True on success."""
+    try:
+        api_limiter.call_with_retry('calendar', service.events().delete(calendarId=calendar_id, eventId=event_id).execute)
+        return True
+    except Exception as e:
+        print(f"Error deleting event: {e}")
+        return False
@@ -0,0 +1,120 @@
+"""
+Run Checkpoints
+Durable per-run record of which weekly pipeline stages have finished and
+what they produced (plan JSON, email sent, calendar event ids, sheet
+rows, dashboard export). A rerun after a failure reads the checkpoint and
+only repeats the stages that did not complete, so nothing is re-sent or
+duplicated. Each update is written atomically (temp file + rename).
+A finished run is kept as the published week (published.json) so a
+mid-week re-plan can update what was sent instead of starting over.
+"""
+
+import os
+import json
+from datetime import datetime
+
+CHECKPOINT_DIR = 'checkpoints'
+PUBLISHED_FILE = 'published.json'
+
+
+def checkpoint_path(week, checkpoint_dir=CHECKPOINT_DIR):
+    """Checkpoint file for one athlete's week."""
+    return os.path.join(checkpoint_dir, f"week_{week}.json")
+
+
+def published_path(checkpoint_dir=CHECKPOINT_DIR):
+    """Record of the most recently published week."""
+    return os.path.join(checkpoint_dir, PUBLISHED_FILE)
+
+
+def load_published(checkpoint_dir=CHECKPOINT_DIR):
+    """The checkpoint of the most recently published week, or None if there is none."""
+    path = published_path(checkpoint_dir)
+    try:
+        with open(path, 'r') as f:
+            week = json.load(f).get("week")
+    except (ValueError, OSError):
+        return None
+    return RunCheckpoint(path, week) if week is not None else None
+
+
+class RunCheckpoint:
+    """Stage results for one run, persisted after every change."""
+
+    def __init__(self, path, week):
+        self.path = path
+        self.data = {"week": week, "created": datetime.now().isoformat(), "stages": {}}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    saved = json.load(f)
+                if saved.get("week") == week:
+                    self.data = saved
+            except (ValueError, OSError) as e:
+                print(f"Ignoring unreadable checkpoint {path}: {e}")
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _stage(self, stage):
+        return self.data["stages"].setdefault(stage, {"done": False, "output": None})
+
+    def is_done(self, stage):
+        return self.data["stages"].get(stage, {}).get("done", False)
+
+    def output(self, stage, default=None):
+        output = self.data["stages"].get(stage, {}).get("output")
+        return default if output is None else output
+
+    def complete(self, stage, output=True):
+        """Marks a stage done with its output."""
+        entry = self._stage(stage)
+        entry.update(done=True, output=output, completed_at=datetime.now().isoformat())
+        self._save()
+
+    def skip(self, stage, reason):
+        """Marks a stage done without running it (e.g. its service isn't configured)."""
+        self.complete(stage, None)
+        self._stage(stage)["skipped"] = reason
+        self._save()
+
+    def skipped(self, stage):
+        """The reason a stage was skipped, or None."""
+        return self.data["stages"].get(stage, {}).get("skipped")
+
+    def record(self, stage, key, value):
+        """Saves partial progress inside a stage (e.g. one calendar event) without completing it."""
+        entry = self._stage(stage)
+        if not isinstance(entry["output"], dict):
+            entry["output"] = {}
+        entry["output"][key] = value
+        self._save()
+
+    def forget(self, stage, key):
+        """Drops one piece of partial progress (e.g. a deleted calendar event)."""
+        output = self._stage(stage)["output"]
+        if isinstance(output, dict) and key in output:
+            del output[key]
+            self._save()
+
+    def completed_stages(self):
+        return [stage for stage, entry in self.data["stages"].items() if entry.get("done")]
+
+    def publish(self):
+        """
+        Keeps a finished run (plan, event ids, exports) as the published week, replacing
+        the previous one, and removes the in-progress checkpoint.
+        """
+        week_path, self.path = self.path, published_path(os.path.dirname(self.path))
+        self._save()
+        if os.path.exists(week_path):
+            os.remove(week_path)
+
+    def clear(self):
+        """Removes the checkpoint once the run is fully done."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,4 +1,5 @@
 import calendar_manager
+import api_limiter
 import datetime
 
 def clear_workout_events():
@@ -31,13 +32,13 @@ def clear_workout_events():
     deleted_count = 0
     
     while True:
-        events_result = service.events().list(
+        events_result = api_limiter.call_with_retry('calendar', service.events().list(
             calendarId=calendar_id, 
             q="Workout:", # Search query
             singleEvents=True,
             orderBy='startTime',
             pageToken=page_token
-        ).execute()
+        ).execute)
         
         events = events_result.get('items', [])
 
@@ -46,7 +47,7 @@ def clear_workout_events():
             if "💪 Workout:" in summary:
                 print(f"Deleting event: {summary} ({event['start'].get('dateTime', event['start'].get('date'))})")
                 try:
-                    service.events().delete(calendarId=calendar_id, eventId=event['id']).execute()
+                    api_limiter.call_with_retry('calendar', service.events().delete(calendarId=calendar_id, eventId=event['id']).execute)
                     deleted_count += 1
                 except Exception as e:
                     print(f"Failed to delete event: {e}")
@@ -0,0 +1,438 @@
+"""
+Workout CLI
+Runs the weekly pipeline, or any of its stages on their own, from the command
+line. Every command takes --dry-run (all local writes go to a scratch copy
+that is thrown away; calendar events and sheet rows are only described, not
+sent) and --json (one JSON document on stdout with each stage's result and
+timings), so one hot stage can be profiled and CI can run only the cheap
+stage it needs.
+
+Usage:
+    python cli.py run                          # full weekly pipeline (same as workout_generator.py)
+    python cli.py run --stages plan render     # selected stages only, week not incremented
+    python cli.py plan --dry-run --json        # plan this week without saving anything
+    python cli.py plan --replan                # re-plan the published week, republish only the changes
+    python cli.py render | push-calendar | log-sheet | export-dashboard
+    python cli.py daily-recovery               # Garmin-only dashboard update
+    python cli.py backfill --days 28           # fill gaps in the recovery cache
+    python cli.py plan --fake-backends --json  # offline, against the fakes in backends.py
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from datetime import date, timedelta
+
+import backends
+import checkpoints
+import garmin_manager
+import instrumentation
+import mesocycle_planner
+import plan_analyzer
+import plan_diff
+import readiness_engine
+import sheet_manager
+import calendar_manager
+import dashboard_exporter
+import email_delivery
+import static_site
+import workout_generator
+
+# Stages of the weekly run, in pipeline order
+WEEKLY_STAGES = ["plan", "render", "push-calendar", "log-sheet", "export-dashboard"]
+
+DEFAULT_BACKFILL_DAYS = readiness_engine.BASELINE_WINDOW_DAYS
+
+
+class StageError(Exception):
+    """A stage could not run (e.g. no plan for the week yet)."""
+
+
+class StageContext:
+    """What the stages share: the athlete's profile, where artifacts go and the week's checkpoint."""
+
+    def __init__(self, profile_path, output_dir=None, dry_run=False, recipient=None, plan_file=None):
+        self.profile_path = profile_path
+        self.output_dir = output_dir
+        self.dry_run = dry_run
+        self.profile = workout_generator.load_profile(profile_path)
+        if not self.profile:
+            raise StageError(f"Could not load profile {profile_path}")
+        self.week = self.profile['current_week']
+        self.recipient = (recipient or self.profile.get('recipient_email')
+                          or os.environ.get('RECIPIENT_EMAIL', workout_generator.DEFAULT_RECIPIENT))
+        self.plan_file = plan_file
+        self.checkpoint = workout_generator.open_run_checkpoint(self.week, output_dir)
+        self._historical_data = None
+
+    @property
+    def sheet_name(self):
+        return self.profile.get('google_sheet_name', 'My Workout Plan')
+
+    def historical_data(self):
+        if self._historical_data is None:
+            self._historical_data = sheet_manager.get_historical_data(self.sheet_name)
+        return self._historical_data
+
+    def plan(self):
+        """This week's plan: from --plan-file, else from the checkpoint written by the plan stage."""
+        if self.plan_file:
+            with open(self.plan_file, 'r') as f:
+                return json.load(f)
+        if not self.checkpoint.is_done("plan"):
+            raise StageError(f"No plan for week {self.week} yet; run the plan stage first")
+        return self.checkpoint.output("plan")
+
+    def dashboard_path(self):
+        return dashboard_path(self.output_dir)
+
+    def use_published_week(self):
+        """
+        Points the context at the most recently published week (the weekly run has
+        finished and moved current_week on). Returns False if nothing was published.
+        """
+        published = workout_generator.open_published_checkpoint(self.output_dir)
+        if published is None or not published.is_done("plan"):
+            return False
+        self.week, self.checkpoint = published.data["week"], published
+        return True
+
+    @contextlib.contextmanager
+    def planning_week(self):
+        """Plans as of self.week, restoring current_week (and saving the profile) afterwards."""
+        current = self.profile['current_week']
+        if self.week == current:
+            yield
+            return
+        self.profile['current_week'] = self.week
+        try:
+            yield
+        finally:
+            self.profile['current_week'] = current
+            workout_generator.save_profile(self.profile, self.profile_path)
+
+
+def dashboard_path(output_dir=None):
+    """dashboard_data.json under output_dir, or the repo's copy the dashboard reads."""
+    if output_dir:
+        return os.path.join(output_dir, 'dashboard_data.json')
+    return os.path.join(os.path.dirname(os.path.abspath(dashboard_exporter.__file__)), 'dashboard_data.json')
+
+
+@contextlib.contextmanager
+def scratch_copy(profile_path, output_dir=None):
+    """
+    Copies the files a run may write (profile, mesocycle block, checkpoints,
+    dashboard JSON, recovery cache) into a temporary directory and yields
+    (profile_path, output_dir) inside it. Nothing outside is modified.
+    """
+    source_dir = output_dir or '.'
+    saved_cache = garmin_manager.recovery_cache_file()
+    with tempfile.TemporaryDirectory(prefix="workout-dry-run-") as scratch:
+        scratch_profile = os.path.join(scratch, os.path.basename(profile_path))
+        shutil.copy(profile_path, scratch_profile)
+        for name in (mesocycle_planner.MESOCYCLE_FILE, checkpoints.CHECKPOINT_DIR):
+            source = os.path.join(source_dir, name)
+            if os.path.isdir(source):
+                shutil.copytree(source, os.path.join(scratch, name))
+            elif os.path.exists(source):
+                shutil.copy(source, os.path.join(scratch, name))
+        dashboard_source = dashboard_path(output_dir)
+        if os.path.exists(dashboard_source):
+            shutil.copy(dashboard_source, os.path.join(scratch, 'dashboard_data.json'))
+        scratch_cache = os.path.join(scratch, garmin_manager.RECOVERY_CACHE_NAME)
+        if os.path.exists(saved_cache):
+            shutil.copy(saved_cache, scratch_cache)
+        with garmin_manager.athlete_account(scratch_cache):
+            yield scratch_profile, scratch
+
+
+def _plan_summary(profile, plan):
+    analysis = plan_analyzer.analyze_plan(plan, profile)
+    return {
+        "days": {day: len(exercises) for day, exercises in plan.items()
+                 if day in workout_generator.training_days(plan)},
+        "violations": analysis["violations"],
+        "warnings": analysis["warnings"],
+        "weekly_sets": analysis["weekly_sets"]
+    }
+
+
+def stage_plan(ctx, replan=False):
+    """
+    Plans the week (mesocycle block or Gemini), attaches recovery content and checkpoints it.
+    A re-plan over an existing plan republishes only the changes (see republish_changes);
+    once the week's run has finished, it targets the most recently published week.
+    """
+    if replan and not ctx.checkpoint.is_done("plan") and ctx.use_published_week():
+        print(f"Re-planning published Week {ctx.week}")
+    previous = ctx.checkpoint.output("plan") if ctx.checkpoint.is_done("plan") else None
+    changes = None
+    if previous and not replan:
+        plan, source = previous, "checkpoint"
+    else:
+        with ctx.planning_week():
+            targets = workout_generator.plan_progression(ctx.profile, ctx.historical_data(), ctx.profile_path)
+            with instrumentation.span("stage.plan"):
+                plan, readiness = workout_generator.release_block_week(ctx.profile, targets, ctx.output_dir)
+                source = "block"
+                if plan is None:
+                    template = workout_generator.select_exercises_for_week(ctx.profile, targets=targets)
+                    if not template:
+                        raise StageError("Failed to generate weekly plan data")
+                    plan = workout_generator.start_block(ctx.profile, template, targets, readiness, ctx.output_dir)
+                    source = "gemini"
+            workout_generator.update_database_with_new_exercises(ctx.profile, plan, ctx.profile_path)
+            workout_generator.attach_recovery_content(ctx.profile, plan)
+        if previous and ctx.dry_run:
+            diff = plan_diff.diff_plans(previous, plan)
+            changes = {"summary": plan_diff.summarize(diff), "would_update": plan_diff.changed_days(diff)}
+            ctx.checkpoint.complete("plan", plan)
+        elif previous:
+            republished = workout_generator.republish_changes(ctx.profile, ctx.checkpoint, previous, plan, ctx.output_dir, ctx.recipient)
+            changes = {"summary": republished["summary"], "republished": republished["stages"]}
+        else:
+            ctx.checkpoint.complete("plan", plan)
+    result = {"week": ctx.week, "source": source, **_plan_summary(ctx.profile, plan), "plan": plan}
+    if changes is not None:
+        result["changes"] = changes
+    return result
+
+
+def stage_render(ctx):
+    """Renders the plan email (saved as standalone HTML) and the static week/day pages."""
+    plan = ctx.plan()
+    with instrumentation.span("stage.render"):
+        chart_png = workout_generator.build_email_chart(ctx.profile, ctx.historical_data())
+        html = workout_generator.generate_html_email(
+            ctx.profile, plan, f"cid:{workout_generator.EMAIL_CHART_CID}" if chart_png else None
+        )
+    html_path = os.path.join(ctx.output_dir, 'weekly_plan.html') if ctx.output_dir else 'weekly_plan.html'
+    with open(html_path, 'w') as f:
+        f.write(email_delivery.inline_as_data_uris(html, {workout_generator.EMAIL_CHART_CID: chart_png} if chart_png else None))
+    site_dir = os.path.join(ctx.output_dir, 'site') if ctx.output_dir else static_site.SITE_DIR
+    with instrumentation.span("stage.site"):
+        site = static_site.export_week(ctx.profile, plan, ctx.week, chart_png, site_dir)
+    ctx.checkpoint.complete("site", site)
+    return {"html": html_path, "html_bytes": len(html), "chart": bool(chart_png), "pages": site["pages"]}
+
+
+def stage_push_calendar(ctx):
+    """Creates one calendar event per training day (days already in the checkpoint are skipped)."""
+    plan = ctx.plan()
+    calendar_id = ctx.profile.get('calendar_id', ctx.recipient)
+    created = dict(ctx.checkpoint.output("calendar", {}) or {})
+    pending = [day for day in workout_generator.training_days(plan) if day not in created]
+    if ctx.dry_run:
+        return {"calendar_id": calendar_id, "already_created": sorted(created),
+                "would_create": {day: workout_generator.build_calendar_description(plan, day) for day in pending}}
+    if workout_generator.skip_unconfigured(ctx.checkpoint, "calendar", calendar_manager.is_configured()):
+        return {"skipped": "not configured", "ok": True}
+
+    with instrumentation.span("stage.calendar"):
+        service = calendar_manager.get_calendar_service()
+        if not service:
+            raise StageError("Calendar service unavailable")
+        for day in pending:
+            event = calendar_manager.create_workout_event(
+                service, day, workout_generator.build_calendar_description(plan, day), calendar_id
+            )
+            if event:
+                ctx.checkpoint.record("calendar", day, event.get('id'))
+    created = ctx.checkpoint.output("calendar", {})
+    missing = [day for day in pending if day not in created]
+    if not missing:
+        ctx.checkpoint.complete("calendar", created)
+    return {"calendar_id": calendar_id, "events": created, "failed": missing, "ok": not missing}
+
+
+def stage_log_sheet(ctx):
+    """Logs the week to the WorkoutLog sheet in one batch."""
+    plan = ctx.plan()
+    rows = sheet_manager.build_week_rows(plan, ctx.week, None, ctx.profile)
+    if ctx.dry_run:
+        return {"sheet": ctx.sheet_name, "would_write_rows": len(rows)}
+    if workout_generator.skip_unconfigured(ctx.checkpoint, "sheet", sheet_manager.is_configured()):
+        return {"sheet": ctx.sheet_name, "skipped": "not configured", "ok": True}
+    if ctx.checkpoint.is_done("sheet"):
+        return {"sheet": ctx.sheet_name, "already_logged": True}
+    with instrumentation.span("stage.sheet"):
+        logged = sheet_manager.log_week_to_sheet(ctx.sheet_name, plan, ctx.week, None, ctx.profile)
+    if logged:
+        ctx.checkpoint.complete("sheet", {"sheet": ctx.sheet_name, **logged})
+    return {"sheet": ctx.sheet_name, "rows": len(rows), "ok": bool(logged)}
+
+
+def stage_export_dashboard(ctx):
+    """Writes dashboard_data.json and coach_context.json from the plan and today's recovery data."""
+    plan = ctx.plan()
+    with instrumentation.span("stage.dashboard"):
+        path = dashboard_exporter.export_dashboard_data(plan, ctx.profile, ctx.dashboard_path())
+    ctx.checkpoint.complete("dashboard", path)
+    return _dashboard_summary(path)
+
+
+def stage_daily_recovery(ctx):
+    """Garmin-only update: recovery, readiness, cycle phase and today's adjusted session."""
+    return _dashboard_summary(dashboard_exporter.export_garmin_only(ctx.dashboard_path(), ctx.profile))
+
+
+def _dashboard_summary(path):
+    with open(path, 'r') as f:
+        data = json.load(f)
+    today = data.get("adjusted_today") or {}
+    return {
+        "path": path,
+        "readiness_score": (data.get("recovery") or {}).get("readiness_score"),
+        "today": today.get("day"),
+        "today_multiplier": today.get("multiplier"),
+        "cycle_phase": (data.get("cycle_phase") or {}).get("phase")
+    }
+
+
+def stage_backfill(ctx, days=DEFAULT_BACKFILL_DAYS):
+    """Fetches recovery data for the last `days` days missing from the recovery cache."""
+    cached = garmin_manager.load_recovery_cache()
+    yesterday = date.today() - timedelta(days=1)
+    missing = [yesterday - timedelta(days=n) for n in range(days)]
+    missing = [day for day in reversed(missing) if day.isoformat() not in cached]
+    if not missing:
+        return {"fetched": 0, "already_cached": days}
+
+    client = garmin_manager.get_garmin_client()
+    if not client:
+        raise StageError("Could not log in to Garmin")
+    fetched = []
+    with instrumentation.span("stage.backfill"):
+        for day in missing:
+            recovery_data = garmin_manager.get_recovery_data(
+                day, ctx.profile.get('recovery_metrics'), ctx.profile.get('timezone'), client
+            )
+            history = garmin_manager.update_recovery_cache(recovery_data)
+            if day.isoformat() in history:
+                fetched.append(day.isoformat())
+    return {"fetched": len(fetched), "already_cached": days - len(missing),
+            "no_data": [d.isoformat() for d in missing if d.isoformat() not in fetched]}
+
+
+STAGES = {
+    "plan": stage_plan,
+    "render": stage_render,
+    "push-calendar": stage_push_calendar,
+    "log-sheet": stage_log_sheet,
+    "export-dashboard": stage_export_dashboard,
+    "daily-recovery": stage_daily_recovery,
+    "backfill": stage_backfill
+}
+
+
+def run_stages(ctx, names, options=None):
+    """
+    Runs the named stages in order and returns {name: result}. Each result has
+    'ok' and 'elapsed_ms'; a failing stage doesn't stop the ones after it.
+    """
+    options = options or {}
+    results = {}
+    for name in names:
+        started = time.perf_counter()
+        try:
+            result = STAGES[name](ctx, **options.get(name, {}))
+            result.setdefault("ok", True)
+        except (StageError, OSError) as e:
+            result = {"ok": False, "error": str(e)}
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        results[name] = result
+    return results
+
+
+def _print_results(results):
+    for name, result in results.items():
+        print(f"\n[{name}] {'ok' if result['ok'] else 'FAILED'} ({result['elapsed_ms']:.0f} ms)")
+        for key, value in result.items():
+            if key in ("ok", "elapsed_ms", "plan"):
+                continue
+            if isinstance(value, dict):
+                value = ", ".join(f"{k}={v}" for k, v in value.items()) or "-"
+            elif isinstance(value, list):
+                value = ", ".join(map(str, value)) or "-"
+            print(f"  {key}: {value}")
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--profile', default=workout_generator.PROFILE_FILE, help="Athlete profile JSON")
+    common.add_argument('--output-dir', help="Directory for artifacts and checkpoints (default: repo layout)")
+    common.add_argument('--recipient', help="Email / calendar id (default: profile or RECIPIENT_EMAIL)")
+    common.add_argument('--plan-file', help="Use this plan JSON instead of the week's checkpoint")
+    common.add_argument('--dry-run', action='store_true', help="Write only to a scratch copy; send nothing")
+    common.add_argument('--json', action='store_true', help="Print one JSON document with results and timings")
+    common.add_argument('--fake-backends', action='store_true', help="Use the in-process fake services (see backends.py)")
+
+    parser = argparse.ArgumentParser(description="Weekly workout pipeline and its stages.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', parents=[common], help="Full weekly pipeline, or --stages in order")
+    run.add_argument('--stages', nargs='+', choices=WEEKLY_STAGES, help="Run only these stages (week not incremented)")
+    plan = commands.add_parser('plan', parents=[common], help=stage_plan.__doc__)
+    plan.add_argument('--replan', action='store_true', help="Plan again over the week's checkpointed (or the last published) plan and republish only what changed")
+    for name in ("render", "push-calendar", "log-sheet", "export-dashboard", "daily-recovery"):
+        commands.add_parser(name, parents=[common], help=STAGES[name].__doc__)
+    backfill = commands.add_parser('backfill', parents=[common], help=stage_backfill.__doc__)
+    backfill.add_argument('--days', type=int, default=DEFAULT_BACKFILL_DAYS, help="How many days back to fill")
+    return parser
+
+
+def _execute(args, profile_path, output_dir):
+    if args.command == 'run' and not args.stages and not args.dry_run:
+        profile = workout_generator.load_profile(profile_path)
+        if not profile:
+            raise StageError(f"Could not load profile {profile_path}")
+        result = workout_generator.run_weekly_pipeline(profile, profile_path, args.recipient, output_dir)
+        return result["week"], {"pipeline": {**result, "ok": not result["degraded"]}}
+
+    ctx = StageContext(profile_path, output_dir, args.dry_run, args.recipient, args.plan_file)
+    names = (args.stages or WEEKLY_STAGES) if args.command == 'run' else [args.command]
+    options = {"plan": {"replan": getattr(args, 'replan', False)}, "backfill": {"days": getattr(args, 'days', DEFAULT_BACKFILL_DAYS)}}
+    return ctx.week, run_stages(ctx, names, options)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.fake_backends:
+        backends.configure("fake")
+    instrumentation.reset()
+
+    with contextlib.ExitStack() as stack:
+        profile_path, output_dir = args.profile, args.output_dir
+        # Artifacts under --output-dir include the recovery cache, so the repo's copy is left alone
+        if output_dir:
+            stack.enter_context(garmin_manager.athlete_account(os.path.join(output_dir, garmin_manager.RECOVERY_CACHE_NAME)))
+        if args.dry_run:
+            profile_path, output_dir = stack.enter_context(scratch_copy(args.profile, args.output_dir))
+        # Progress prints go to stderr so --json output stays parseable
+        if args.json:
+            stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+        try:
+            week, results = _execute(args, profile_path, output_dir)
+        except StageError as e:
+            week, results = None, {args.command: {"ok": False, "error": str(e), "elapsed_ms": 0.0}}
+        if not args.dry_run:
+            instrumentation.write_run_report(f"cli_{args.command.replace('-', '_')}")
+
+    ok = all(result["ok"] for result in results.values())
+    if args.json:
+        print(json.dumps({
+            "command": args.command, "dry_run": args.dry_run, "week": week, "ok": ok,
+            "stages": results, "spans": instrumentation.summarize()
+        }, indent=2, default=str))
+    else:
+        _print_results(results)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
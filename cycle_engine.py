@@ -0,0 +1,142 @@
+"""
+Cycle Engine
+Single source of truth for menstrual cycle phase calculations.
+Precomputes phase, cycle day and intensity modifier for a whole date range
+in one pass so history rows and future weeks can be annotated by lookup.
+Intensity modifiers learned from logged performance (performance_analytics)
+override the PHASES defaults.
+"""
+
+from datetime import date, datetime
+import numpy as np
+
+# Phases in cycle order. A phase runs from its first_day until the next phase starts.
+PHASES = [
+    {
+        "phase": "Menstrual",
+        "first_day": 1,
+        "energy": "Variable - may be lower",
+        "training_tip": "Listen to your body. Okay to reduce intensity if needed. Focus on form over load.",
+        "intensity_modifier": 0.85  # Slightly reduce if needed
+    },
+    {
+        "phase": "Follicular",
+        "first_day": 6,
+        "energy": "HIGH - rising estrogen = strength gains!",
+        "training_tip": "BEST time for heavy lifts & PRs! Push hard, increase weights, train intensely.",
+        "intensity_modifier": 1.1  # Can push harder
+    },
+    {
+        "phase": "Ovulation",
+        "first_day": 15,
+        "energy": "PEAK energy but ligament laxity increases",
+        "training_tip": "High energy but be mindful of form. Good for power & HIIT. Warm up well.",
+        "intensity_modifier": 1.05
+    },
+    {
+        "phase": "Luteal",
+        "first_day": 18,
+        "energy": "Moderate to low - progesterone rising",
+        "training_tip": "Maintain volume but may need longer rest. Great for hypertrophy work. Stay hydrated.",
+        "intensity_modifier": 0.95
+    }
+]
+
+PHASE_NAMES = [p["phase"] for p in PHASES]
+_PHASE_FIRST_DAYS = np.array([p["first_day"] for p in PHASES])
+
+
+def get_cycle_settings(profile):
+    """
+    Reads the cycle settings from the profile.
+    Returns (last_period_start, cycle_length) or None if tracking is off or the date is invalid.
+    """
+    cycle_data = profile.get('menstrual_cycle', {})
+    if not cycle_data.get('track_cycle', False):
+        return None
+
+    last_period = cycle_data.get('last_period_start')
+    if not last_period:
+        return None
+
+    try:
+        last_period_date = datetime.strptime(last_period, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+    return last_period_date, cycle_data.get('average_cycle_length', 28)
+
+
+def phase_modifiers(profile):
+    """
+    Intensity modifier per phase (PHASES order): profile['menstrual_cycle']['intensity_modifiers']
+    where learned, the PHASES default otherwise.
+    """
+    learned = profile.get('menstrual_cycle', {}).get('intensity_modifiers') or {}
+    return np.array([float(learned.get(p["phase"], p["intensity_modifier"])) for p in PHASES])
+
+
+def build_cycle_calendar(profile, start_date, end_date):
+    """
+    Precomputes cycle day, phase and intensity modifier for every date in
+    [start_date, end_date] (inclusive).
+
+    Returns None if cycle tracking is disabled, otherwise a dict of arrays:
+    - start: first date covered
+    - day: day in cycle (1-based) per date
+    - phase_index: index into PHASES per date
+    - intensity_modifier: modifier per date
+    """
+    settings = get_cycle_settings(profile)
+    if settings is None:
+        return None
+    last_period_date, cycle_length = settings
+
+    n_days = max((end_date - start_date).days + 1, 0)
+    days_since = (start_date - last_period_date).days + np.arange(n_days)
+    day_in_cycle = days_since % cycle_length + 1
+    phase_index = np.searchsorted(_PHASE_FIRST_DAYS, day_in_cycle, side='right') - 1
+
+    return {
+        "start": start_date,
+        "day": day_in_cycle,
+        "phase_index": phase_index,
+        "intensity_modifier": phase_modifiers(profile)[phase_index]
+    }
+
+
+def lookup_cycle_days(calendar, dates):
+    """
+    Vectorized lookup of many dates in a precomputed calendar.
+    Returns an array of row offsets into the calendar arrays (-1 for dates outside the range).
+    """
+    start = np.datetime64(calendar["start"], 'D')
+    offsets = (np.asarray(dates, dtype='datetime64[D]') - start).astype(int)
+    in_range = (offsets >= 0) & (offsets < len(calendar["day"]))
+    return np.where(in_range, offsets, -1)
+
+
+def phase_at(calendar, offset):
+    """Returns the full phase info dict for one row of a precomputed calendar."""
+    phase = PHASES[int(calendar["phase_index"][offset])]
+    return {
+        "phase": phase["phase"],
+        "day": int(calendar["day"][offset]),
+        "energy": phase["energy"],
+        "training_tip": phase["training_tip"],
+        "intensity_modifier": float(calendar["intensity_modifier"][offset])
+    }
+
+
+def get_cycle_phase(profile, target_date=None):
+    """
+    Calculates the menstrual cycle phase for a single date (today by default).
+    Returns phase info with training recommendations, or None if not tracked.
+    """
+    if target_date is None:
+        target_date = date.today()
+
+    calendar = build_cycle_calendar(profile, target_date, target_date)
+    if calendar is None:
+        return None
+    return phase_at(calendar, 0)
@@ -1,5 +1,34 @@
 // Vercel Serverless Function for Gemini Chat
 // Uses gemini-3-flash-preview for fast responses
+// Context comes from coach_context.json (pre-digested by dashboard_exporter.py),
+// cached per warm instance; the client-built context is only a fallback.
+
+const COACH_CONTEXT_URL = 'https://raw.githubusercontent.com/mvulin11/workout_plan/main/coach_context.json';
+const COACH_CONTEXT_TTL_MS = 10 * 60 * 1000;
+
+const COACH_INSTRUCTIONS = `You are Lianna's personal AI fitness coach. Be friendly, concise, and helpful.
+Respond in 2-3 sentences max. Be supportive and knowledgeable.`;
+
+let cachedContext = null;
+let cachedAt = 0;
+
+async function getCoachContext() {
+    if (cachedContext && Date.now() - cachedAt < COACH_CONTEXT_TTL_MS) {
+        return cachedContext;
+    }
+    try {
+        const response = await fetch(COACH_CONTEXT_URL, { cache: 'no-store' });
+        if (!response.ok) {
+            throw new Error(`GitHub returned ${response.status}`);
+        }
+        const data = await response.json();
+        cachedContext = data.text;
+        cachedAt = Date.now();
+    } catch (error) {
+        console.error('Error fetching coach context:', error);
+    }
+    return cachedContext;
+}
 
 export default async function handler(req, res) {
     // CORS headers
@@ -15,7 +44,7 @@ export default async function handler(req, res) {
         return res.status(405).json({ error: 'Method not allowed' });
     }
 
-    const { message, context } = req.body;
+    const { message, context, today } = req.body;
 
     if (!message) {
         return res.status(400).json({ error: 'Message is required' });
@@ -28,6 +57,12 @@ export default async function handler(req, res) {
         return res.status(500).json({ error: 'API key not configured' });
     }
 
+    const coachContext = await getCoachContext();
+    // Stable instructions + context first so repeated turns share a cacheable prefix
+    const systemText = coachContext
+        ? `${COACH_INSTRUCTIONS}\nToday is ${today || 'unknown'}.\nCurrent context:\n${coachContext}`
+        : (context || COACH_INSTRUCTIONS);
+
     try {
         const response = await fetch(
             `https://generativelanguage.googleapis.com/v1beta/models/gemini-3-flash-preview:generateContent?key=${apiKey}`,
@@ -35,10 +70,12 @@ export default async function handler(req, res) {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
+                    systemInstruction: {
+                        parts: [{ text: systemText }]
+                    },
                     contents: [{
-                        parts: [{
-                            text: `${context}\n\nUser question: ${message}`
-                        }]
+                        role: 'user',
+                        parts: [{ text: message }]
                     }],
                     generationConfig: {
                         maxOutputTokens: 8192,
@@ -465,6 +465,7 @@ let state = {
     selectedDay: 'Monday',
     workoutData: SAMPLE_WORKOUT_DATA,
     completedExercises: new Set(),
+    performance: null,
     nutritionLog: {
         calories: 0,
         protein: 0,
@@ -515,10 +516,20 @@ async function fetchLiveData() {
                 });
             }
 
+            // Today's session rescaled from this morning's readiness
+            const adjusted = liveData.adjusted_today;
+            if (adjusted && !adjusted.rest_day && adjusted.exercises.length) {
+                state.workoutData[adjusted.day] = adjusted.exercises;
+            }
+
             if (liveData.coaching_notes) {
                 state.workoutData.coaching_notes = liveData.coaching_notes;
             }
 
+            if (liveData.performance) {
+                state.performance = liveData.performance;
+            }
+
             console.log('Live data loaded:', liveData.last_updated);
 
             // Re-render with live data
@@ -913,6 +924,11 @@ function renderProgressTab() {
         recoveryStatus.textContent = '⚠️ Recovery metrics suggest taking it easier today';
     }
 
+    // Correlations and per-phase deltas computed from the logged sets
+    const insights = (state.performance && state.performance.lines) || [];
+    $('#performanceSection').hidden = insights.length === 0;
+    $('#performanceInsights').innerHTML = insights.map(line => `<li>${line}</li>`).join('');
+
     const completedToday = [...state.completedExercises].filter(key => key.startsWith(state.selectedDay)).length;
     const totalToday = (state.workoutData[state.selectedDay] || []).length;
 
@@ -1056,12 +1072,14 @@ Current context:
 Respond in 2-3 sentences max. Be supportive and knowledgeable.
 `;
 
-    // Call the serverless API
+    // Call the serverless API (it prefers the exported coach_context.json;
+    // this context is the fallback when that can't be fetched)
     const response = await fetch('/api/chat', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
             message: message,
+            today: today,
             context: context
         })
     });
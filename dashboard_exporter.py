@@ -2,102 +2,363 @@
 Dashboard Data Exporter
 Generates a JSON file for the dashboard to consume.
 Combines workout data and Garmin recovery metrics.
+Also rescales today's planned session (loads, sets, rest) from readiness
+and the cycle intensity modifier, locally and without re-planning, and writes
+coach_context.json: a compact, pre-digested summary (athlete, today, readiness
+trend, cycle, week plan, key lifts) within a token budget for the dashboard chat.
+After a mid-week re-plan only the changed day sections are rewritten.
 """
 
 import os
+import re
+import math
+import copy
 import json
 from datetime import date, datetime
-from garmin_manager import get_recovery_data
+from zoneinfo import ZoneInfo
+from garmin_manager import get_recovery_data, update_recovery_cache, load_recovery_cache, DEFAULT_TIMEZONE
+import cycle_engine
+import instrumentation
+import progression_engine
+import readiness_engine
 
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
-def get_cycle_phase(last_period_str, cycle_length=28):
-    """Calculate current cycle phase."""
-    last_period = datetime.strptime(last_period_str, "%Y-%m-%d").date()
-    today = date.today()
-    days_since = (today - last_period).days
-    day_in_cycle = (days_since % cycle_length) + 1
-    
-    if day_in_cycle <= 5:
-        phase = "Menstrual"
-        energy = "Variable - listen to your body"
-        tip = "Lighter weights OK. Focus on form. Rest if needed."
-    elif day_in_cycle <= 14:
-        phase = "Follicular"
-        energy = "HIGH - rising estrogen = strength gains!"
-        tip = "BEST time for heavy lifts & PRs! Push hard."
-    elif day_in_cycle <= 17:
-        phase = "Ovulation"
-        energy = "PEAK energy but injury risk higher"
-        tip = "Strong lifts possible. Extra warm-up recommended."
+# Combined readiness x cycle multiplier bounds for today's loads
+MIN_TODAY_MULTIPLIER = 0.7
+MAX_TODAY_MULTIPLIER = 1.1
+# Below this multiplier each exercise loses a set
+SET_CUT_MULTIPLIER = 0.9
+
+# Coach context artifact read by dashboard/api/chat.js
+COACH_CONTEXT_FILE = 'coach_context.json'
+COACH_CONTEXT_TOKEN_BUDGET = 350
+CHARS_PER_TOKEN = 4
+TREND_DAYS = 7
+MAX_KEY_LIFTS = 5
+MAX_DAY_EXERCISES = 3
+
+
+def load_user_profile():
+    """Loads user_profile.json from the repo root (empty dict if missing)."""
+    profile_path = os.path.join(os.path.dirname(__file__), 'user_profile.json')
+    if not os.path.exists(profile_path):
+        return {}
+    with open(profile_path, 'r') as f:
+        return json.load(f)
+
+
+def local_today(user_profile):
+    """Today's date in the athlete's timezone (profile['timezone'])."""
+    return datetime.now(ZoneInfo(user_profile.get('timezone') or DEFAULT_TIMEZONE)).date()
+
+
+def build_recovery_section(recovery_data, user_profile, history=None):
+    """
+    Caches today's recovery data and builds the dashboard recovery section,
+    including the readiness score computed against the rolling baseline.
+    history: recovery history to score against; when given the cache is not touched.
+    """
+    if history is None:
+        history = update_recovery_cache(recovery_data)
+    readiness = readiness_engine.get_readiness(
+        history,
+        user_profile.get('recovery_metrics'),
+        target_date=recovery_data["date"]
+    )
+
+    return {
+        "sleep_score": recovery_data.get("sleep_score"),
+        "sleep_hours": recovery_data.get("sleep_duration_hours"),
+        "sleep_quality": recovery_data.get("sleep_quality"),
+        "body_battery": recovery_data.get("body_battery_current"),
+        "hrv_status": recovery_data.get("hrv_status"),
+        "recovery_ready": recovery_data.get("recovery_ready", True),
+        "readiness_score": readiness["score"] if readiness else None,
+        "intensity_multiplier": readiness["intensity_multiplier"] if readiness else 1.0,
+        "notes": recovery_data.get("recovery_notes", [])
+    }
+
+
+def _scale_weight(target_weight, multiplier):
+    """'135 lbs' scaled and rounded to 5 lbs; anything else ('RPE 7-8', 'BW') is kept."""
+    weight = progression_engine.parse_weight(target_weight)
+    if math.isnan(weight):
+        return target_weight
+    return f"{max(progression_engine.calculate_weight(weight, multiplier), 5)} lbs"
+
+
+def _scale_rest(rest, multiplier):
+    """Longer rest on low-readiness days ('90s' -> '106s'); never shortened."""
+    if multiplier >= 1 or not isinstance(rest, str):
+        return rest
+    return re.sub(r'\d+', lambda m: str(round(int(m.group()) / multiplier)), rest)
+
+
+@instrumentation.timed("dashboard.adjust_today")
+def build_adjusted_today(workouts, recovery_section, cycle_phase, today=None):
+    """
+    Rescales today's planned exercises: target_weight by readiness x cycle modifier,
+    one set fewer below SET_CUT_MULTIPLIER and longer rest on low days.
+    today: the day to rescale (date.today() if None). Not the recovery data's date,
+    which is last night's (yesterday by default in get_recovery_data).
+    """
+    today = date.fromisoformat(today) if isinstance(today, str) else (today or date.today())
+    day_name = DAYS[today.weekday()]
+    readiness_multiplier = (recovery_section or {}).get("intensity_multiplier") or 1.0
+    cycle_modifier = (cycle_phase or {}).get("intensity_modifier", 1.0)
+    multiplier = round(min(max(readiness_multiplier * cycle_modifier, MIN_TODAY_MULTIPLIER), MAX_TODAY_MULTIPLIER), 3)
+
+    adjusted = {
+        "date": today.isoformat(),
+        "day": day_name,
+        "readiness_score": (recovery_section or {}).get("readiness_score"),
+        "readiness_multiplier": readiness_multiplier,
+        "cycle_modifier": cycle_modifier,
+        "multiplier": multiplier,
+        "sets_reduced": multiplier < SET_CUT_MULTIPLIER,
+        "exercises": []
+    }
+    planned = (workouts or {}).get(day_name)
+    if not isinstance(planned, list):
+        adjusted["rest_day"] = True
+        return adjusted
+
+    for ex in planned:
+        ex = copy.deepcopy(ex)
+        ex["planned_weight"] = ex.get("target_weight")
+        ex["target_weight"] = _scale_weight(ex.get("target_weight"), multiplier)
+        if adjusted["sets_reduced"] and isinstance(ex.get("sets"), int):
+            ex["planned_sets"] = ex["sets"]
+            ex["sets"] = max(ex["sets"] - 1, 1)
+        ex["rest"] = _scale_rest(ex.get("rest"), multiplier)
+        adjusted["exercises"].append(ex)
+    return adjusted
+
+
+def _trend(values):
+    """Mean of the last TREND_DAYS values and its change vs the TREND_DAYS before (None without data)."""
+    recent, previous = values[-TREND_DAYS:], values[-2 * TREND_DAYS:-TREND_DAYS]
+    recent, previous = [v for v in recent if v is not None], [v for v in previous if v is not None]
+    if not recent:
+        return None, None
+    mean = sum(recent) / len(recent)
+    return mean, (mean - sum(previous) / len(previous)) if previous else None
+
+
+def _trend_line(label, values, unit=''):
+    mean, change = _trend(values)
+    if mean is None:
+        return None
+    line = f"{label} {TREND_DAYS}-day avg {mean:.1f}{unit}"
+    return line + (f" ({change:+.1f} vs prior week)" if change is not None else "")
+
+
+def _coach_lines(dashboard_data, user_profile, history):
+    """Context lines, most important first (the budget cuts from the end)."""
+    context = user_profile.get('user_context', {})
+    lines = [
+        f"Athlete: {user_profile.get('user_name', 'the user')}, {context.get('stats', '')}; {context.get('experience', '')}".rstrip('; '),
+        f"Gym: {context.get('gym_profile', '')}",
+        f"Goals: {context.get('specific_goals', '') or user_profile.get('primary_goal', '')}",
+        f"Training week {dashboard_data.get('current_week', user_profile.get('current_week', 1))}"
+        + (f", {dashboard_data['mesocycle']['phase']} phase" if dashboard_data.get('mesocycle') else "")
+    ]
+
+    today = dashboard_data.get("adjusted_today") or {}
+    if today.get("rest_day") or not today.get("exercises"):
+        lines.append(f"Today ({today.get('day', 'today')}): rest day")
     else:
-        phase = "Luteal"
-        energy = "Moderate - may feel more fatigued"
-        tip = "Maintain volume but listen to body."
-    
+        session = ", ".join(
+            f"{ex.get('exercise')} {ex.get('sets')}x{ex.get('reps')} @ {ex.get('target_weight')}" for ex in today["exercises"]
+        )
+        lines.append(f"Today ({today['day']}, load x{today.get('multiplier', 1.0):g}"
+                     f"{', one set fewer' if today.get('sets_reduced') else ''}): {session}")
+
+    recovery = dashboard_data.get("recovery") or {}
+    if recovery.get("readiness_score") is not None:
+        lines.append(f"Readiness {recovery['readiness_score']:g}/100 (load multiplier {recovery.get('intensity_multiplier', 1.0):g})")
+    if history:
+        scores = readiness_engine.score_history(history, user_profile.get('recovery_metrics'))["score"]
+        days = [history[d] for d in sorted(history)]
+        for line in (_trend_line("Readiness", [float(s) for s in scores]),
+                     _trend_line("Sleep", [d.get("sleep_duration_hours") for d in days], "h"),
+                     _trend_line("Stress", [d.get("stress_level") for d in days])):
+            if line:
+                lines.append(line)
+
+    cycle = dashboard_data.get("cycle_phase") or {}
+    if cycle.get("phase"):
+        lines.append(f"Cycle: {cycle['phase']} (day {cycle.get('day')}), energy {cycle.get('energy')}. {cycle.get('training_tip', '')}".strip())
+
+    week = []
+    for day, exercises in (dashboard_data.get("workouts") or {}).items():
+        names = [ex.get('exercise') for ex in exercises[:MAX_DAY_EXERCISES]]
+        more = f" +{len(exercises) - MAX_DAY_EXERCISES}" if len(exercises) > MAX_DAY_EXERCISES else ""
+        week.append(f"{day[:3]}: {', '.join(names)}{more}")
+    if week:
+        lines.append("This week: " + "; ".join(week))
+
+    maxes = sorted((user_profile.get('maxes') or {}).items(), key=lambda item: -item[1])[:MAX_KEY_LIFTS]
+    if maxes:
+        lines.append("Key lifts (est. 1RM): " + ", ".join(f"{name} {weight:g} lbs" for name, weight in maxes))
+
+    insights = (dashboard_data.get("performance") or {}).get("lines")
+    if insights:
+        lines.append("Performance drivers (logged): " + "; ".join(insights))
+
+    notes = dashboard_data.get("coaching_notes")
+    if notes:
+        lines.append(f"Coach notes: {notes if isinstance(notes, str) else ' '.join(map(str, notes))}")
+    return lines
+
+
+@instrumentation.timed("dashboard.coach_context")
+def build_coach_context(dashboard_data, user_profile, history=None, token_budget=COACH_CONTEXT_TOKEN_BUDGET):
+    """
+    Pre-digested context for the dashboard chat: whole lines in priority order, skipping
+    any that would exceed token_budget (~CHARS_PER_TOKEN chars per token). The text carries no
+    timestamps, so it only changes when the data does and the prompt stays cacheable.
+    """
+    max_chars = token_budget * CHARS_PER_TOKEN
+    text, dropped = "", 0
+    for line in _coach_lines(dashboard_data, user_profile, history or {}):
+        line = f"- {line}\n"
+        if len(text) + len(line) > max_chars:
+            dropped += 1
+            continue
+        text += line
     return {
-        "phase": phase,
-        "day": day_in_cycle,
-        "energy": energy,
-        "training_tip": tip
+        "last_updated": dashboard_data.get("last_updated", datetime.now().isoformat()),
+        "approx_tokens": math.ceil(len(text) / CHARS_PER_TOKEN),
+        "dropped_lines": dropped,
+        "text": text
     }
 
 
-def export_dashboard_data(workout_plan, user_profile):
+def write_coach_context(dashboard_data, user_profile, data_path, history=None):
+    """Writes coach_context.json next to the dashboard JSON (history from the recovery cache if None)."""
+    coach_context = build_coach_context(dashboard_data, user_profile, load_recovery_cache() if history is None else history)
+    path = os.path.join(os.path.dirname(data_path), COACH_CONTEXT_FILE)
+    with open(path, 'w') as f:
+        json.dump(coach_context, f, indent=2)
+    return path
+
+
+@instrumentation.timed("dashboard.export")
+def export_dashboard_data(workout_plan, user_profile, output_path=None, recovery_data=None):
     """
     Export combined dashboard data to JSON file.
     
     Args:
         workout_plan: The AI-generated workout plan dict
         user_profile: The user's profile with cycle info
+        output_path: Where to write the JSON (defaults to dashboard_data.json in the repo)
+        recovery_data: Already-fetched get_recovery_data() result (fetched from Garmin if None)
     """
     # Get Garmin recovery data
-    print("Fetching Garmin recovery data...")
-    recovery_data = get_recovery_data()
+    if recovery_data is None:
+        print("Fetching Garmin recovery data...")
+        recovery_data = get_recovery_data(
+            recovery_metrics=user_profile.get('recovery_metrics'),
+            tz_name=user_profile.get('timezone')
+        )
+    
+    dashboard_data = build_dashboard_data(workout_plan, user_profile, recovery_data)
     
+    # Write to file
+    output_path = output_path or os.path.join(os.path.dirname(__file__), 'dashboard_data.json')
+    with open(output_path, 'w') as f:
+        json.dump(dashboard_data, f, indent=2)
+    write_coach_context(dashboard_data, user_profile, output_path)
+    
+    print(f"Dashboard data exported to {output_path}")
+    return output_path
+
+
+def build_dashboard_data(workout_plan, user_profile, recovery_data, history=None, today=None):
+    """
+    Builds the dashboard JSON document from the plan, profile and recovery data.
+    history: passed through to build_recovery_section (None updates the recovery cache).
+    today: day whose session is rescaled (local_today(user_profile) if None).
+    """
     # Calculate cycle phase
-    cycle_info = user_profile.get('menstrual_cycle', {})
-    cycle_phase = get_cycle_phase(
-        cycle_info.get('last_period_start', '2025-11-27'),
-        cycle_info.get('average_cycle_length', 28)
-    )
+    cycle_phase = cycle_engine.get_cycle_phase(user_profile)
     
-    # Build dashboard data
     dashboard_data = {
         "last_updated": datetime.now().isoformat(),
         "current_week": user_profile.get('current_week', 1),
         "cycle_phase": cycle_phase,
-        "recovery": {
-            "sleep_score": recovery_data.get("sleep_score"),
-            "sleep_hours": recovery_data.get("sleep_duration_hours"),
-            "sleep_quality": recovery_data.get("sleep_quality"),
-            "body_battery": recovery_data.get("body_battery_current"),
-            "hrv_status": recovery_data.get("hrv_status"),
-            "recovery_ready": recovery_data.get("recovery_ready", True),
-            "notes": recovery_data.get("recovery_notes", [])
-        },
+        "recovery": build_recovery_section(recovery_data, user_profile, history),
         "coaching_notes": workout_plan.get("coaching_notes", ""),
+        "recovery_content": workout_plan.get("recovery_content", {}),
         "workouts": {}
     }
     
+    if workout_plan.get("mesocycle"):
+        dashboard_data["mesocycle"] = workout_plan["mesocycle"]
+    if user_profile.get("performance_report"):
+        dashboard_data["performance"] = user_profile["performance_report"]
+
     # Add workout days
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    for day in days:
+    for day in DAYS:
         if day in workout_plan:
             dashboard_data["workouts"][day] = workout_plan[day]
-    
-    # Write to file
-    output_path = os.path.join(os.path.dirname(__file__), 'dashboard_data.json')
-    with open(output_path, 'w') as f:
+
+    dashboard_data["adjusted_today"] = build_adjusted_today(
+        dashboard_data["workouts"], dashboard_data["recovery"], cycle_phase, today or local_today(user_profile)
+    )
+    return dashboard_data
+
+
+@instrumentation.timed("dashboard.update_sections")
+def update_dashboard_sections(workout_plan, user_profile, data_path, days, notes_changed=True):
+    """
+    Updates an exported dashboard JSON after a re-plan: only the workouts of `days`
+    (added, changed or removed), the coaching notes and, if today is one of them,
+    the adjusted session. Recovery is left as exported (no Garmin fetch).
+    Returns data_path, or None when there is no export to update.
+    """
+    if not os.path.exists(data_path):
+        return None
+    with open(data_path, 'r') as f:
+        dashboard_data = json.load(f)
+
+    workouts = dashboard_data.get("workouts") or {}
+    for day in days:
+        if isinstance(workout_plan.get(day), list):
+            workouts[day] = workout_plan[day]
+        else:
+            workouts.pop(day, None)
+    dashboard_data["workouts"] = {day: workouts[day] for day in DAYS if day in workouts}
+    if notes_changed:
+        dashboard_data["coaching_notes"] = workout_plan.get("coaching_notes", "")
+    dashboard_data["recovery_content"] = workout_plan.get("recovery_content", dashboard_data.get("recovery_content", {}))
+
+    today = local_today(user_profile)
+    adjusted = dashboard_data.get("adjusted_today") or {}
+    if DAYS[today.weekday()] in days or adjusted.get("date") != today.isoformat():
+        dashboard_data["adjusted_today"] = build_adjusted_today(
+            dashboard_data["workouts"], dashboard_data.get("recovery"), dashboard_data.get("cycle_phase"), today
+        )
+    dashboard_data["last_updated"] = datetime.now().isoformat()
+
+    with open(data_path, 'w') as f:
         json.dump(dashboard_data, f, indent=2)
-    
-    print(f"Dashboard data exported to {output_path}")
-    return output_path
+    write_coach_context(dashboard_data, user_profile, data_path)
+    print(f"Dashboard updated for {', '.join(days) or 'notes only'} in {data_path}")
+    return data_path
 
 
-def export_garmin_only():
-    """Export just Garmin data (for daily updates)."""
+@instrumentation.timed("dashboard.export_garmin_only")
+def export_garmin_only(data_path=None, user_profile=None):
+    """
+    Export just Garmin data (for daily updates).
+    data_path: dashboard JSON to update (dashboard_data.json in the repo if None).
+    user_profile: the athlete's profile (the repo's user_profile.json if None).
+    """
     # Load existing dashboard data
-    data_path = os.path.join(os.path.dirname(__file__), 'dashboard_data.json')
+    data_path = data_path or os.path.join(os.path.dirname(__file__), 'dashboard_data.json')
     
     if os.path.exists(data_path):
         with open(data_path, 'r') as f:
@@ -105,28 +366,32 @@ def export_garmin_only():
     else:
         dashboard_data = {}
     
+    if user_profile is None:
+        user_profile = load_user_profile()
+    
     # Fetch fresh Garmin data
     print("Fetching Garmin recovery data...")
-    recovery_data = get_recovery_data()
+    recovery_data = get_recovery_data(
+        recovery_metrics=user_profile.get('recovery_metrics'),
+        tz_name=user_profile.get('timezone')
+    )
     
     # Update just the recovery section
-    dashboard_data["recovery"] = {
-        "sleep_score": recovery_data.get("sleep_score"),
-        "sleep_hours": recovery_data.get("sleep_duration_hours"),
-        "sleep_quality": recovery_data.get("sleep_quality"),
-        "body_battery": recovery_data.get("body_battery_current"),
-        "hrv_status": recovery_data.get("hrv_status"),
-        "recovery_ready": recovery_data.get("recovery_ready", True),
-        "notes": recovery_data.get("recovery_notes", [])
-    }
+    dashboard_data["recovery"] = build_recovery_section(recovery_data, user_profile)
     dashboard_data["last_updated"] = datetime.now().isoformat()
     
     # Also update cycle phase
-    dashboard_data["cycle_phase"] = get_cycle_phase("2025-11-27", 28)
+    dashboard_data["cycle_phase"] = cycle_engine.get_cycle_phase(user_profile)
+
+    # Rescale today's session from the fresh readiness (no re-planning)
+    dashboard_data["adjusted_today"] = build_adjusted_today(
+        dashboard_data.get("workouts"), dashboard_data["recovery"], dashboard_data["cycle_phase"], local_today(user_profile)
+    )
     
     # Write back
     with open(data_path, 'w') as f:
         json.dump(dashboard_data, f, indent=2)
+    write_coach_context(dashboard_data, user_profile, data_path)
     
     print(f"Garmin data updated in {data_path}")
     return data_path
@@ -135,3 +400,4 @@ def export_garmin_only():
 if __name__ == "__main__":
     # Test: Export Garmin data only
     export_garmin_only()
+    instrumentation.write_run_report("daily")
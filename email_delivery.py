@@ -0,0 +1,169 @@
+"""
+Email Delivery
+Outbox-backed SMTP delivery for the weekly plan emails.
+Messages are built as multipart/related with inline CID images (instead
+of base64 data-URI charts), written to a persistent outbox directory and
+then sent over one shared, authenticated SMTP connection that is reused
+across messages and athletes. Sends the server certainly refused (4xx
+replies) are retried with backoff; anything else undelivered, including a
+send that may have gone through, stays in the outbox for the next flush.
+"""
+
+import os
+import re
+import atexit
+import base64
+import smtplib
+import threading
+from email import policy
+from email.parser import BytesParser
+from email.mime.text import MIMEText
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+
+import api_limiter
+import backends
+import instrumentation
+
+SMTP_HOST = 'smtp.gmail.com'
+SMTP_PORT = 465
+OUTBOX_DIR = 'outbox'
+
+_lock = threading.RLock()
+_connection = {"server": None, "user": None, "generation": None}
+
+
+def build_message(html, subject, sender, recipient, images=None):
+    """
+    Builds a multipart/related message: the HTML body plus inline images.
+    images: {content_id: png_bytes}, referenced from the HTML as src="cid:<content_id>".
+    """
+    msg = MIMEMultipart('related')
+    msg['Subject'] = subject
+    msg['From'] = sender
+    msg['To'] = recipient
+    msg.attach(MIMEText(html, 'html'))
+    for cid, data in (images or {}).items():
+        image = MIMEImage(data, 'png')
+        image.add_header('Content-ID', f"<{cid}>")
+        image.add_header('Content-Disposition', 'inline', filename=f"{cid}.png")
+        msg.attach(image)
+    return msg
+
+
+def inline_as_data_uris(html, images):
+    """Replaces cid: references with data URIs, for saving the email as a standalone HTML file."""
+    for cid, data in (images or {}).items():
+        html = html.replace(f"cid:{cid}", f"data:image/png;base64,{base64.b64encode(data).decode('ascii')}")
+    return html
+
+
+def _outbox_name(message_id):
+    return re.sub(r'[^A-Za-z0-9_.@-]+', '_', message_id) + '.eml'
+
+
+def outbox_path(message_id, outbox_dir=OUTBOX_DIR):
+    """Where the message with this id is (or would be) queued."""
+    return os.path.join(outbox_dir, _outbox_name(message_id))
+
+
+def enqueue(msg, message_id, outbox_dir=OUTBOX_DIR):
+    """
+    Writes the message to the outbox. message_id is stable per logical email
+    (e.g. week + recipient), so re-queuing the same email replaces it instead of duplicating.
+    """
+    os.makedirs(outbox_dir, exist_ok=True)
+    path = outbox_path(message_id, outbox_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(msg.as_bytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+def pending(outbox_dir=OUTBOX_DIR):
+    """Paths of queued messages, oldest first."""
+    if not os.path.isdir(outbox_dir):
+        return []
+    paths = [os.path.join(outbox_dir, f) for f in os.listdir(outbox_dir) if f.endswith('.eml')]
+    return sorted(paths, key=os.path.getmtime)
+
+
+def _get_connection(user, password):
+    """Returns the shared authenticated connection, reconnecting if it dropped."""
+    server = _connection["server"]
+    if server is not None and _connection["user"] == user and _connection["generation"] == backends.generation():
+        try:
+            if server.noop()[0] == 250:
+                return server
+        except (smtplib.SMTPException, OSError):
+            pass
+        _drop_connection()
+
+    with instrumentation.span("smtp.connect"):
+        server = backends.create('smtp', smtplib.SMTP_SSL, SMTP_HOST, SMTP_PORT)
+        server.login(user, password)
+    _connection.update(server=server, user=user, generation=backends.generation())
+    return server
+
+
+def _drop_connection():
+    server = _connection["server"]
+    _connection.update(server=None, user=None, generation=None)
+    if server is not None:
+        try:
+            server.close()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+
+def _send(msg, user, password):
+    with _lock:
+        try:
+            _get_connection(user, password).send_message(msg)
+        except smtplib.SMTPResponseException:
+            raise  # The server answered, so the connection is still usable
+        except OSError:
+            _drop_connection()
+            raise
+
+
+def deliver(path, user, password):
+    """
+    Sends one queued message and removes it from the outbox. Only failures where the server
+    certainly didn't accept it (4xx reply, refused connection) are retried; a dropped connection
+    or timeout mid-send leaves it queued rather than risk sending it twice.
+    """
+    with open(path, 'rb') as f:
+        msg = BytesParser(policy=policy.SMTP).parse(f)
+    with instrumentation.span("smtp.send"):
+        api_limiter.call_write_with_retry('email', _send, msg, user, password)
+    os.remove(path)
+
+
+def flush_outbox(user, password, outbox_dir=OUTBOX_DIR):
+    """Delivers every queued message. Returns (sent, failed) counts; failures stay queued."""
+    sent = failed = 0
+    for path in pending(outbox_dir):
+        try:
+            deliver(path, user, password)
+            sent += 1
+        except Exception as e:
+            print(f"Email still queued ({os.path.basename(path)}): {e}")
+            failed += 1
+    return sent, failed
+
+
+def close_connection():
+    """Closes the shared SMTP connection (called at exit; batch runs call it when done)."""
+    with _lock:
+        server = _connection["server"]
+        if server is not None:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        _drop_connection()
+
+
+atexit.register(close_connection)
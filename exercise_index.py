@@ -0,0 +1,230 @@
+"""
+Exercise Index
+Local similarity index over the profile's exercise_database. Exercise names
+are embedded as TF-IDF weighted character n-grams (plus category and
+description words) in a NumPy matrix, so lookups are one matrix-vector
+product and nothing is downloaded. Used to catch near-duplicate exercises
+before they are added to the database, to file new exercises under an
+existing category, and to swap exercises that need equipment the gym
+doesn't have (gym_profile "NO Barbell") for their closest allowed variant.
+"""
+
+import re
+import numpy as np
+
+NGRAM_SIZE = 3
+
+# Feature weights: the name dominates, category and description break ties
+NAME_WEIGHT = 1.0
+CATEGORY_WEIGHT = 0.5
+DESC_WEIGHT = 0.25
+
+# Name similarity at or above which two exercises are considered the same
+DUPLICATE_THRESHOLD = 0.8
+# Category name similarity needed to file a new category under an existing one
+CATEGORY_THRESHOLD = 0.5
+# Minimum similarity for a substitute to be used
+SUBSTITUTE_THRESHOLD = 0.3
+# Substitute ranking bonuses: same category, and the usual stand-in equipment
+SAME_CATEGORY_BONUS = 0.2
+PREFERRED_EQUIPMENT_BONUS = 0.1
+PREFERRED_EQUIPMENT = {"barbell": ["smith machine", "dumbbell"]}
+
+# Names that differ in these are different exercises however similar the rest is
+EQUIPMENT_WORDS = {"barbell", "dumbbell", "db", "cable", "smith", "machine", "band", "kettlebell", "landmine", "plate"}
+
+_WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def _words(text):
+    return _WORD_PATTERN.findall(str(text or '').lower().replace('_', ' '))
+
+
+def _ngrams(text):
+    """Character n-grams of each word, padded so word starts and ends count."""
+    grams = []
+    for word in _words(text):
+        padded = f" {word} "
+        grams += [padded[i:i + NGRAM_SIZE] for i in range(max(len(padded) - NGRAM_SIZE + 1, 1))]
+    return grams
+
+
+def _equipment(name):
+    words = set(_words(name))
+    return {"dumbbell" if w == "db" else w for w in words & EQUIPMENT_WORDS}
+
+
+def _features(name, category='', desc=''):
+    """{feature: weight} for one exercise."""
+    features = {}
+    for gram in _ngrams(name):
+        features["n:" + gram] = features.get("n:" + gram, 0) + NAME_WEIGHT
+    for word in _words(category):
+        features["c:" + word] = features.get("c:" + word, 0) + CATEGORY_WEIGHT
+    for word in _words(desc):
+        features["d:" + word] = features.get("d:" + word, 0) + DESC_WEIGHT
+    return features
+
+
+class _Vectorizer:
+    """TF-IDF over feature dicts, producing L2-normalized dense rows."""
+
+    def __init__(self, documents):
+        self.vocabulary = {}
+        for doc in documents:
+            for feature in doc:
+                self.vocabulary.setdefault(feature, len(self.vocabulary))
+        counts = self._counts(documents)
+        df = (counts > 0).sum(axis=0)
+        self.idf = np.log((1 + len(documents)) / (1 + df)) + 1
+        self.matrix = self._normalize(counts * self.idf)
+
+    def _counts(self, documents):
+        counts = np.zeros((len(documents), len(self.vocabulary)))
+        for row, doc in enumerate(documents):
+            for feature, weight in doc.items():
+                col = self.vocabulary.get(feature)
+                if col is not None:
+                    counts[row, col] = weight
+        return counts
+
+    @staticmethod
+    def _normalize(matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    def transform(self, doc):
+        return self._normalize(self._counts([doc]) * self.idf)[0]
+
+
+class ExerciseIndex:
+    """Similarity index over {category: [{"name", "desc", ...}]}."""
+
+    def __init__(self, exercise_database):
+        self.database = exercise_database
+        self._fit()
+
+    def _fit(self):
+        self.entries = [(category, entry) for category, entries in self.database.items() for entry in entries]
+        self.names = [entry.get('name', '') for _, entry in self.entries]
+        self.categories = list(self.database)
+        self._full = _Vectorizer([_features(e.get('name'), c, e.get('desc')) for c, e in self.entries] or [{}])
+        self._name = _Vectorizer([_features(name) for name in self.names] or [{}])
+        self._category = _Vectorizer([_features(c) for c in self.categories] or [{}])
+
+    def similar(self, name, category='', desc='', k=5, allowed=None):
+        """[(score, category, entry)] best first; allowed(entry) filters candidates."""
+        if not self.entries:
+            return []
+        scores = self._full.matrix @ self._full.transform(_features(name, category, desc))
+        results = []
+        for i in np.argsort(-scores):
+            category_name, entry = self.entries[i]
+            if allowed is None or allowed(entry):
+                results.append((float(scores[i]), category_name, entry))
+                if len(results) == k:
+                    break
+        return results
+
+    def find_duplicate(self, name, threshold=DUPLICATE_THRESHOLD):
+        """(category, entry) of an existing exercise whose name matches `name`, or None."""
+        if not self.entries:
+            return None
+        scores = self._name.matrix @ self._name.transform(_features(name))
+        equipment = _equipment(name)
+        for i in np.argsort(-scores):
+            if scores[i] < threshold:
+                break
+            if _equipment(self.names[i]) == equipment:
+                return self.entries[i]
+        return None
+
+    def match_category(self, category, threshold=CATEGORY_THRESHOLD):
+        """The existing category name closest to `category` (itself if it exists or nothing is close)."""
+        if category in self.database or not self.categories:
+            return category
+        scores = self._category.matrix @ self._category.transform(_features(category))
+        best = int(np.argmax(scores))
+        return self.categories[best] if scores[best] >= threshold else category
+
+    def add(self, category, entry):
+        """Adds an exercise unless a near-duplicate exists. Returns the duplicate's name, or None if added."""
+        duplicate = self.find_duplicate(entry['name'])
+        if duplicate:
+            return duplicate[1]['name']
+        self.database.setdefault(category, []).append(entry)
+        self._fit()
+        return None
+
+    def substitute(self, name, category='', banned=()):
+        """
+        Closest allowed exercise for one that needs banned equipment, or None.
+        The database entry's own 'alt' wins when it is allowed; otherwise candidates
+        are ranked by similarity, preferring the same category and stand-in equipment.
+        """
+        def allowed(entry):
+            return not uses_equipment(entry['name'], banned)
+
+        known = self.find_duplicate(name)
+        if known and known[1].get('alt') and allowed({"name": known[1]['alt']}):
+            alt = self.find_duplicate(known[1]['alt'])
+            if alt and allowed(alt[1]):
+                return alt[1]
+
+        query = name
+        for word in banned:
+            query = re.sub(rf'\b{re.escape(word)}\b', ' ', query, flags=re.IGNORECASE)
+        category = self.match_category(category)
+        preferred = [p for word in banned for p in PREFERRED_EQUIPMENT.get(word, [])]
+
+        best, best_score = None, SUBSTITUTE_THRESHOLD
+        for score, entry_category, entry in self.similar(query, category, k=10, allowed=allowed):
+            if entry_category == category:
+                score += SAME_CATEGORY_BONUS
+            if any(p in entry['name'].lower() for p in preferred):
+                score += PREFERRED_EQUIPMENT_BONUS
+            if score > best_score:
+                best, best_score = entry, score
+        return best
+
+
+def banned_equipment(profile):
+    """Equipment the gym lacks, from user_context.gym_profile ('... - NO Barbell' -> ['barbell'])."""
+    gym = profile.get('user_context', {}).get('gym_profile', '')
+    banned = []
+    for match in re.finditer(r'\bNO\s+([A-Za-z ,/&]+)', gym):
+        banned += [item.strip().lower() for item in re.split(r',|/|&|\band\b|\bor\b', match.group(1)) if item.strip()]
+    return banned
+
+
+def uses_equipment(name, banned):
+    """True if the exercise name mentions any banned equipment."""
+    lowered = str(name).lower()
+    return any(re.search(rf'\b{re.escape(word)}s?\b', lowered) for word in banned)
+
+
+def enforce_equipment(weekly_plan_data, profile, index=None):
+    """
+    Swaps planned exercises that need banned equipment for their nearest allowed
+    variant from the exercise database. Returns [(old_name, new_name)].
+    """
+    banned = banned_equipment(profile)
+    if not banned:
+        return []
+    index = index or ExerciseIndex(profile.get('exercise_database', {}))
+    swaps = []
+    for day, exercises in weekly_plan_data.items():
+        if day == 'coaching_notes' or not isinstance(exercises, list):
+            continue
+        for ex in exercises:
+            if not isinstance(ex, dict) or not uses_equipment(ex.get('exercise', ''), banned):
+                continue
+            replacement = index.substitute(ex['exercise'], ex.get('category', ''), banned)
+            if replacement is None:
+                print(f"Warning: no substitute without {', '.join(banned)} for {ex['exercise']}")
+                continue
+            swaps.append((ex['exercise'], replacement['name']))
+            ex.update(exercise=replacement['name'], is_new=False)
+            if replacement.get('url'):
+                ex['url'] = replacement['url']
+    return swaps
@@ -5,26 +5,92 @@ Fetches sleep, stress, body battery, and HRV data for recovery-informed training
 
 import os
 import json
-from datetime import date, timedelta
-from garminconnect import Garmin, GarminConnectAuthenticationError
+import threading
+import contextlib
+import contextvars
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import numpy as np
 
+import api_limiter
+import backends
+import instrumentation
 
+# Used when the profile has no 'timezone' (matches the calendar event timezone)
+DEFAULT_TIMEZONE = 'America/New_York'
+
+# Rolling cache of daily recovery metrics (used for readiness baselines)
+RECOVERY_CACHE_NAME = 'recovery_cache.json'
+RECOVERY_CACHE_FILE = os.path.join(os.path.dirname(__file__), RECOVERY_CACHE_NAME)
+RECOVERY_CACHE_DAYS = 120
+
+# Default Garmin account (the single-athlete deployment)
+CREDENTIAL_ENV = ('GARMIN_EMAIL', 'GARMIN_PASSWORD')
+
+# The athlete being run in this thread/task: {"cache_file", "credential_env"} (see athlete_account)
+_athlete = contextvars.ContextVar('garmin_athlete', default=None)
+# Serializes the recovery cache read-modify-write across threads
+_cache_lock = threading.Lock()
+
+# Keys persisted per day in the recovery cache
+CACHED_METRICS = [
+    "sleep_score",
+    "sleep_duration_hours",
+    "stress_level",
+    "body_battery_morning",
+    "body_battery_current",
+    "hrv_status",
+    "hrv_avg",
+    "body_battery_summary"
+]
+
+
+@contextlib.contextmanager
+def athlete_account(cache_file=None, credential_env=None):
+    """
+    Within this context (thread or asyncio task), uses the given recovery cache file and
+    Garmin account (a (email_var, password_var) pair of env var names) instead of the
+    defaults. Anything not given is inherited from an enclosing athlete_account.
+    """
+    parent = _athlete.get() or {}
+    token = _athlete.set({
+        "cache_file": cache_file or parent.get("cache_file"),
+        "credential_env": credential_env or parent.get("credential_env")
+    })
+    try:
+        yield
+    finally:
+        _athlete.reset(token)
+
+
+def recovery_cache_file():
+    """The recovery cache of the current athlete, or RECOVERY_CACHE_FILE."""
+    return (_athlete.get() or {}).get("cache_file") or RECOVERY_CACHE_FILE
+
+
+def _credential_env():
+    return (_athlete.get() or {}).get("credential_env") or CREDENTIAL_ENV
+
+
+@instrumentation.timed("garmin.login")
 def get_garmin_client():
     """
     Authenticate with Garmin Connect and return a client.
     Tokens are automatically stored in ~/.garminconnect by the library.
     """
-    email = os.environ.get('GARMIN_EMAIL')
-    password = os.environ.get('GARMIN_PASSWORD')
+    # Imported on first use so importing this module stays cheap
+    from garminconnect import Garmin, GarminConnectAuthenticationError
+    email_var, password_var = _credential_env()
+    email, password = backends.env_credentials('garmin', email_var, password_var)
     
     if not email or not password:
-        print("Warning: GARMIN_EMAIL or GARMIN_PASSWORD not set")
+        print(f"Warning: {email_var} or {password_var} not set")
         return None
     
     try:
         # Create client with credentials - library handles token storage automatically
-        garmin = Garmin(email=email, password=password)
-        garmin.login()
+        garmin = backends.create('garmin', Garmin, email=email, password=password)
+        api_limiter.call_with_retry('garmin', garmin.login)
         print(f"Garmin: Logged in as {garmin.display_name}")
         return garmin
         
@@ -36,16 +102,81 @@ def get_garmin_client():
         return None
 
 
-def get_recovery_data(target_date=None):
+def summarize_body_battery(readings, tz_name=DEFAULT_TIMEZONE):
+    """
+    Summarizes a raw bodyBatteryValuesArray ([[timestamp_ms, value], ...]) in one pass.
+    Hours are bucketed in the user's local timezone, not UTC.
+
+    Returns None if there are no valid readings, otherwise a dict with:
+    - hourly: mean level per local hour (24 entries, None for hours without samples)
+    - min / max: lowest and highest level of the day
+    - morning: first reading between 6 and 9 AM local time
+    - current: latest reading
+    - drain_per_hour / charge_per_hour: average rate while falling / rising
+    """
+    samples = np.array(
+        [(r[0], r[1]) for r in readings if r and r[0] is not None and r[1] is not None],
+        dtype=float
+    ).reshape(-1, 2)
+    if len(samples) == 0:
+        return None
+    samples = samples[np.argsort(samples[:, 0])]
+    timestamps, values = samples[:, 0], samples[:, 1]
+
+    # Local hour of each sample. The offset only differs within a day on DST changes.
+    tz = ZoneInfo(tz_name)
+    first_offset, last_offset = (
+        datetime.fromtimestamp(t / 1000, tz=timezone.utc).astimezone(tz).utcoffset().total_seconds()
+        for t in (timestamps[0], timestamps[-1])
+    )
+    if first_offset == last_offset:
+        offsets = first_offset
+    else:
+        offsets = np.array([
+            datetime.fromtimestamp(t / 1000, tz=timezone.utc).astimezone(tz).utcoffset().total_seconds()
+            for t in timestamps
+        ])
+    local_hours = ((timestamps / 1000 + offsets) // 3600 % 24).astype(int)
+
+    counts = np.bincount(local_hours, minlength=24)
+    sums = np.bincount(local_hours, weights=values, minlength=24)
+    hourly = [int(round(s / c)) if c else None for s, c in zip(sums, counts)]
+
+    morning = values[(local_hours >= 6) & (local_hours <= 9)]
+
+    deltas = np.diff(values)
+    hours = np.diff(timestamps) / 3600000
+    falling, rising = deltas < 0, deltas > 0
+    drain = -deltas[falling].sum() / hours[falling].sum() if falling.any() else 0.0
+    charge = deltas[rising].sum() / hours[rising].sum() if rising.any() else 0.0
+
+    return {
+        "hourly": hourly,
+        "min": int(values.min()),
+        "max": int(values.max()),
+        "morning": int(morning[0]) if len(morning) else None,
+        "current": int(values[-1]),
+        "drain_per_hour": round(float(drain), 1),
+        "charge_per_hour": round(float(charge), 1)
+    }
+
+
+@instrumentation.timed("garmin.get_recovery_data")
+def get_recovery_data(target_date=None, recovery_metrics=None, tz_name=None, client=None):
     """
     Fetch comprehensive recovery data from Garmin Connect.
+    recovery_metrics: profile['recovery_metrics'] thresholds used for readiness.
+    tz_name: the user's timezone (profile['timezone']) for body battery hours.
+    client: an already logged-in Garmin client (logs in with env credentials if None).
     
     Returns dict with:
     - sleep_score: Overall sleep quality score (0-100)
     - sleep_duration_hours: Hours slept
     - stress_level: Average daily stress (0-100)
     - body_battery: Morning body battery level (0-100)
+    - body_battery_summary: Hourly/min/max/drain/charge summary of the day
     - hrv_status: HRV status from Garmin
+    - hrv_avg: Last night's average HRV (ms)
     - recovery_ready: Boolean indicating if ready for intense training
     """
     # Use yesterday by default - sleep data is more complete
@@ -63,12 +194,14 @@ def get_recovery_data(target_date=None):
         "stress_level": None,
         "body_battery_morning": None,
         "body_battery_current": None,
+        "body_battery_summary": None,
         "hrv_status": None,
+        "hrv_avg": None,
         "recovery_ready": True,
         "recovery_notes": []
     }
     
-    client = get_garmin_client()
+    client = client or get_garmin_client()
     if not client:
         recovery_data["recovery_notes"].append("Could not connect to Garmin")
         return recovery_data
@@ -76,7 +209,7 @@ def get_recovery_data(target_date=None):
     try:
         # Fetch Sleep Data
         try:
-            sleep_data = client.get_sleep_data(date_str)
+            sleep_data = api_limiter.call_with_retry('garmin', client.get_sleep_data, date_str)
             if sleep_data:
                 daily_sleep = sleep_data.get('dailySleepDTO', {})
                 recovery_data["sleep_score"] = daily_sleep.get('sleepScores', {}).get('overall', {}).get('value')
@@ -103,7 +236,7 @@ def get_recovery_data(target_date=None):
         
         # Fetch Stress Data
         try:
-            stress_data = client.get_stress_data(date_str)
+            stress_data = api_limiter.call_with_retry('garmin', client.get_stress_data, date_str)
             if stress_data:
                 avg_stress = stress_data.get('overallStressLevel')
                 if avg_stress:
@@ -115,29 +248,25 @@ def get_recovery_data(target_date=None):
         
         # Fetch Body Battery
         try:
-            body_battery = client.get_body_battery(date_str)
+            body_battery = api_limiter.call_with_retry('garmin', client.get_body_battery, date_str)
             if body_battery and len(body_battery) > 0:
-                # Get morning (first reading) and current (last reading)
-                readings = body_battery[0].get('bodyBatteryValuesArray', [])
-                if readings:
-                    # Morning reading (around 6-8 AM)
-                    morning_readings = [r for r in readings if r[0] and 6 <= (r[0] // 3600000) % 24 <= 9]
-                    if morning_readings:
-                        recovery_data["body_battery_morning"] = morning_readings[0][1]
-                    
-                    # Current/latest reading
-                    valid_readings = [r[1] for r in readings if r[1] is not None]
-                    if valid_readings:
-                        recovery_data["body_battery_current"] = valid_readings[-1]
+                # Get morning (first local 6-9 AM reading) and current (last reading)
+                readings = body_battery[0].get('bodyBatteryValuesArray') or []
+                summary = summarize_body_battery(readings, tz_name or DEFAULT_TIMEZONE)
+                if summary:
+                    recovery_data["body_battery_summary"] = summary
+                    recovery_data["body_battery_morning"] = summary["morning"]
+                    recovery_data["body_battery_current"] = summary["current"]
         except Exception as e:
             print(f"Error fetching body battery: {e}")
         
         # Fetch HRV Status
         try:
-            hrv_data = client.get_hrv_data(date_str)
+            hrv_data = api_limiter.call_with_retry('garmin', client.get_hrv_data, date_str)
             if hrv_data:
                 hrv_summary = hrv_data.get('hrvSummary', {})
                 status = hrv_summary.get('status')
+                recovery_data["hrv_avg"] = hrv_summary.get('lastNightAvg')
                 if status:
                     recovery_data["hrv_status"] = status
                     if status in ['LOW', 'POOR']:
@@ -146,7 +275,7 @@ def get_recovery_data(target_date=None):
             print(f"Error fetching HRV data: {e}")
         
         # Determine overall recovery readiness
-        recovery_data["recovery_ready"] = _calculate_recovery_readiness(recovery_data)
+        recovery_data["recovery_ready"] = _calculate_recovery_readiness(recovery_data, recovery_metrics)
         
     except Exception as e:
         print(f"Error fetching Garmin data: {e}")
@@ -155,21 +284,25 @@ def get_recovery_data(target_date=None):
     return recovery_data
 
 
-def _calculate_recovery_readiness(data):
+def _calculate_recovery_readiness(data, recovery_metrics=None):
     """
     Determine if ready for intense training based on recovery metrics.
+    Sleep and stress thresholds come from profile['recovery_metrics'] when given.
     Returns True if ready, False if should take it easy.
     """
+    recovery_metrics = recovery_metrics or {}
+    min_sleep_hours = recovery_metrics.get("min_sleep_hours", 6)
+    max_stress = recovery_metrics.get("max_stress_threshold", 60)
     red_flags = 0
     
     # Check sleep
     if data.get("sleep_score") and data["sleep_score"] < 50:
         red_flags += 1
-    if data.get("sleep_duration_hours") and data["sleep_duration_hours"] < 6:
+    if data.get("sleep_duration_hours") and data["sleep_duration_hours"] < min_sleep_hours:
         red_flags += 1
     
     # Check stress
-    if data.get("stress_level") and data["stress_level"] > 60:
+    if data.get("stress_level") and data["stress_level"] > max_stress:
         red_flags += 1
     
     # Check body battery
@@ -184,6 +317,38 @@ def _calculate_recovery_readiness(data):
     return red_flags < 2
 
 
+def load_recovery_cache():
+    """Loads the cached daily recovery history as {date_str: metrics}."""
+    path = recovery_cache_file()
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (ValueError, OSError) as e:
+        print(f"Error reading recovery cache: {e}")
+        return {}
+
+
+def update_recovery_cache(recovery_data):
+    """
+    Stores one day of recovery data in the cache, keeping the last RECOVERY_CACHE_DAYS days.
+    Days without any metrics (e.g. Garmin unavailable) are not cached.
+    Returns the updated history.
+    """
+    day = {k: recovery_data.get(k) for k in CACHED_METRICS if recovery_data.get(k) is not None}
+    with _cache_lock:
+        history = load_recovery_cache()
+        if not day:
+            return history
+
+        history[recovery_data["date"]] = day
+        history = {k: history[k] for k in sorted(history)[-RECOVERY_CACHE_DAYS:]}
+        with open(recovery_cache_file(), 'w') as f:
+            json.dump(history, f, indent=1)
+    return history
+
+
 def get_recovery_context_for_ai():
     """
     Get a formatted string of recovery data for the AI coach.
@@ -0,0 +1,156 @@
+"""
+Instrumentation
+Lightweight spans and counters for the weekly and daily pipelines.
+Spans time each stage and external call (Gemini, Sheets, Calendar,
+Garmin, SMTP, chart rendering); counters track things like prompt and
+response token counts. A run ends by writing a JSON run report.
+
+Set PRINT_TIMINGS=1 to also print a summary table to stdout.
+"""
+
+import os
+import json
+import time
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+
+RUN_REPORT_DIR = os.path.join(os.path.dirname(__file__), 'run_reports')
+
+_lock = threading.Lock()
+# Current span path. A ContextVar (not thread-local) so concurrent asyncio tasks
+# and asyncio.to_thread calls each nest under the span that started them.
+_current_path = contextvars.ContextVar('span_path', default=None)
+_run = {"started": datetime.now().isoformat(), "spans": [], "counters": {}}
+
+
+def reset():
+    """Clears all recorded spans and counters (start of a new run)."""
+    with _lock:
+        _run["started"] = datetime.now().isoformat()
+        _run["spans"] = []
+        _run["counters"] = {}
+
+
+@contextmanager
+def span(name):
+    """
+    Times the enclosed block. Nested spans are recorded with their parent path
+    (e.g. 'stage.plan/gemini.generate').
+    """
+    parent = _current_path.get()
+    path = f"{parent}/{name}" if parent else name
+    token = _current_path.set(path)
+
+    status = "ok"
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        _current_path.reset(token)
+        with _lock:
+            _run["spans"].append({
+                "name": name,
+                "path": path,
+                "duration_ms": round(duration_ms, 2),
+                "status": status,
+                "thread": threading.current_thread().name
+            })
+
+
+def timed(name):
+    """Decorator form of span()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    """Adds value to a named counter."""
+    with _lock:
+        _run["counters"][name] = _run["counters"].get(name, 0) + value
+
+
+def record_gemini_usage(response, prefix="gemini"):
+    """Records token counts from a Gemini response's usage_metadata (if present)."""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return
+    for field, counter in (("prompt_token_count", "prompt_tokens"),
+                           ("candidates_token_count", "response_tokens"),
+                           ("total_token_count", "total_tokens")):
+        value = getattr(usage, field, None)
+        if isinstance(value, int):
+            count(f"{prefix}.{counter}", value)
+    count(f"{prefix}.calls")
+
+
+def summarize():
+    """Aggregates spans by name: calls, total/max/mean ms and errors."""
+    summary = {}
+    with _lock:
+        spans = list(_run["spans"])
+    for s in spans:
+        entry = summary.setdefault(s["name"], {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0})
+        entry["calls"] += 1
+        entry["total_ms"] += s["duration_ms"]
+        entry["max_ms"] = max(entry["max_ms"], s["duration_ms"])
+        entry["errors"] += s["status"] == "error"
+    for entry in summary.values():
+        entry["total_ms"] = round(entry["total_ms"], 2)
+        entry["mean_ms"] = round(entry["total_ms"] / entry["calls"], 2)
+    return summary
+
+
+def get_report(run_name="run"):
+    """Returns the current run report as a dict."""
+    with _lock:
+        report = {
+            "run": run_name,
+            "started": _run["started"],
+            "finished": datetime.now().isoformat(),
+            "counters": dict(_run["counters"]),
+            "spans": list(_run["spans"])
+        }
+    report["summary"] = summarize()
+    return report
+
+
+def print_summary():
+    """Prints the span summary, slowest first, plus counters."""
+    summary = summarize()
+    print(f"\n{'Span':<40}{'Calls':>7}{'Total ms':>12}{'Max ms':>10}{'Errors':>8}")
+    for name, s in sorted(summary.items(), key=lambda kv: kv[1]["total_ms"], reverse=True):
+        print(f"{name:<40}{s['calls']:>7}{s['total_ms']:>12.1f}{s['max_ms']:>10.1f}{s['errors']:>8}")
+    with _lock:
+        counters = dict(_run["counters"])
+    for name, value in sorted(counters.items()):
+        print(f"{name:<40}{value:>7}")
+
+
+def write_run_report(run_name="run", report_dir=RUN_REPORT_DIR):
+    """
+    Writes the run report to <report_dir>/<run_name>_<timestamp>.json and
+    prints the summary when PRINT_TIMINGS is set. Returns the report path.
+    """
+    report = get_report(run_name)
+    os.makedirs(report_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(report_dir, f"{run_name}_{stamp}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if os.environ.get('PRINT_TIMINGS'):
+        print_summary()
+    print(f"Run report written to {path}")
+    return path
@@ -0,0 +1,156 @@
+"""
+Mesocycle Planner
+Plans training in 4-week blocks (Accumulation -> Intensification ->
+Realization -> Deload) from a single exercise template, so only the first
+week of a block needs a Gemini round trip. The template's tracked lifts get
+each phase's sets, reps and rest from PERIODIZATION_REFERENCE; accessories
+keep the template prescription (with reduced volume in the deload week).
+The block is persisted and each week is released from it with loads from
+the latest progression targets. A new block is planned when the current
+one runs out or when actuals or readiness drift too far from the values
+the block was planned with.
+"""
+
+import os
+import re
+import copy
+import json
+from datetime import datetime
+
+import progression_engine
+
+PERIODIZATION_REFERENCE = {
+    "Accumulation": {"sets": "3-4", "reps": "10-12", "intensity": "moderate", "rest": "60-90s"},
+    "Intensification": {"sets": "3-4", "reps": "6-8", "intensity": "high", "rest": "2-3 mins"},
+    "Realization": {"sets": "3-5", "reps": "3-5", "intensity": "very high", "rest": "3-5 mins"},
+    "Deload": {"sets": "2-3", "reps": "8-10", "intensity": "low", "rest": "60s"}
+}
+
+BLOCK_PHASES = ["Accumulation", "Intensification", "Realization", "Deload"]
+BLOCK_WEEKS = len(BLOCK_PHASES)
+
+# Target RPE for the tracked lifts in each intensity band
+PHASE_RPE = {"moderate": 7, "high": 8, "very high": 9, "low": 6}
+
+MESOCYCLE_FILE = 'mesocycle_block.json'
+
+# Re-plan when a tracked lift's e1RM moved more than this fraction since planning...
+MAX_E1RM_DRIFT = 0.10
+# ...or readiness moved more than this many score points
+MAX_READINESS_DRIFT = 25
+
+
+def block_path(output_dir=None):
+    return os.path.join(output_dir, MESOCYCLE_FILE) if output_dir else MESOCYCLE_FILE
+
+
+def load_block(path=MESOCYCLE_FILE):
+    """Returns the saved block, or None if there is none (or it can't be read)."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (ValueError, OSError) as e:
+        print(f"Ignoring unreadable mesocycle block {path}: {e}")
+        return None
+
+
+def save_block(block, path=MESOCYCLE_FILE):
+    """Writes the block atomically (temp file + rename)."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(block, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def block_context():
+    """Prompt note explaining that the plan is a block template."""
+    phases = " -> ".join(f"{p} ({PERIODIZATION_REFERENCE[p]['reps']} reps)" for p in BLOCK_PHASES)
+    return (f"This plan is the exercise template for a {BLOCK_WEEKS}-week block: {phases}. "
+            "Sets, reps and loads of the main lifts are periodized locally week by week.")
+
+
+def _range_mid(value):
+    """'3-4' -> 3, '3-5' -> 4, '2-3' -> 2."""
+    numbers = [int(n) for n in re.findall(r'\d+', value)]
+    return (min(numbers) + max(numbers)) // 2
+
+
+def _range_low(value):
+    return min(int(n) for n in re.findall(r'\d+', value))
+
+
+def phase_week(template, phase, tracked):
+    """One week of the block: the template with `phase` applied to the tracked lifts."""
+    reference = PERIODIZATION_REFERENCE[phase]
+    week = copy.deepcopy(template)
+    for day, exercises in week.items():
+        if day in ('coaching_notes', 'mesocycle') or not isinstance(exercises, list):
+            continue
+        for ex in exercises:
+            if ex.get('exercise') in tracked:
+                ex.update(sets=_range_mid(reference["sets"]), reps=reference["reps"], rest=reference["rest"])
+            elif phase == "Deload":
+                ex['sets'] = min(ex.get('sets', 3), _range_low(reference["sets"]))
+    return week
+
+
+def build_block(template, start_week, targets=None, readiness=None):
+    """
+    Expands one validated week plan into a BLOCK_WEEKS block starting at start_week.
+    targets/readiness are stored as the baseline the drift checks compare against.
+    """
+    targets = targets or {}
+    tracked = {ex.get('exercise') for day, exercises in template.items()
+               if isinstance(exercises, list) for ex in exercises if ex.get('exercise') in targets}
+    weeks = {}
+    for offset, phase in enumerate(BLOCK_PHASES):
+        week = phase_week(template, phase, tracked)
+        # Gemini's notes were written for week 1's cycle phase; later weeks get theirs on release
+        notes = template.get('coaching_notes', '') if offset == 0 else ''
+        week['coaching_notes'] = f"{phase} week ({offset + 1}/{BLOCK_WEEKS}). {notes}".strip()
+        week['mesocycle'] = {"phase": phase, "week_in_block": offset + 1, "start_week": start_week}
+        weeks[str(start_week + offset)] = week
+    return {
+        "start_week": start_week,
+        "created": datetime.now().isoformat(),
+        "baseline": {
+            "e1rm": {exercise: targets[exercise]["e1rm"] for exercise in sorted(tracked)},
+            "readiness": readiness.get("score") if readiness else None
+        },
+        "weeks": weeks
+    }
+
+
+def replan_reason(block, week, targets=None, readiness=None):
+    """Why a new block is needed for `week`, or None if the saved block can be released."""
+    if not block or str(week) not in block.get("weeks", {}):
+        return "no planned block covers this week"
+
+    baseline = block.get("baseline", {})
+    for exercise, planned in baseline.get("e1rm", {}).items():
+        current = (targets or {}).get(exercise, {}).get("e1rm")
+        if current and planned and abs(current - planned) / planned > MAX_E1RM_DRIFT:
+            return f"{exercise} e1RM moved from {planned:g} to {current:g} lbs"
+
+    planned_score = baseline.get("readiness")
+    if readiness and planned_score is not None and abs(readiness["score"] - planned_score) > MAX_READINESS_DRIFT:
+        return f"readiness moved from {planned_score:g} to {readiness['score']:g}"
+    return None
+
+
+def release_week(block, week, targets=None, cycle_phase=None):
+    """
+    The planned week with loads for its tracked lifts from the current targets.
+    cycle_phase (cycle_engine.get_cycle_phase() for the week's start) adds that phase's
+    guidance to weeks after the first, whose template notes were for an earlier phase.
+    """
+    plan = copy.deepcopy(block["weeks"][str(week)])
+    rpe = PHASE_RPE[PERIODIZATION_REFERENCE[plan['mesocycle']['phase']]["intensity"]]
+    progression_engine.apply_targets(plan, targets, rpe)
+    if cycle_phase and plan['mesocycle']['week_in_block'] > 1:
+        plan['coaching_notes'] = (f"{plan['coaching_notes']} {cycle_phase['phase']} phase this week: "
+                                  f"{cycle_phase['training_tip']}")
+    return plan
@@ -0,0 +1,227 @@
+"""
+Performance Analytics
+Checks whether sleep, HRV, stress and cycle phase actually move logged
+performance. Every logged set in WorkoutLog is dated, scored by how far its
+e1RM sits above or below the exercise's own trend line (so plain progression
+over the weeks doesn't count), and joined by date with the Garmin recovery
+cache and the precomputed cycle calendar. Correlations per recovery metric
+and the mean performance delta per cycle phase come out of one vectorized
+pass. The phase deltas become learned intensity modifiers that replace the
+hard-coded PHASES defaults in cycle_engine as data accumulates.
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+
+import cycle_engine
+import progression_engine
+import readiness_engine
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# (label, unit) per recovery metric, in readiness_engine.METRICS order
+METRIC_LABELS = {
+    "sleep_duration_hours": ("Sleep", "h"),
+    "sleep_score": ("Sleep score", " pt"),
+    "stress_level": ("Stress", " pt"),
+    "body_battery_morning": ("Body battery", "%"),
+    "hrv_avg": ("HRV", " ms")
+}
+
+# An exercise needs this many dated sets before its trend line means anything
+MIN_EXERCISE_SETS = 3
+MIN_CORRELATION_SAMPLES = 8
+MIN_PHASE_SAMPLES = 6
+
+# Sets of evidence that weigh as much as a phase's default modifier (shrinkage prior)
+PRIOR_SAMPLES = 20
+MIN_MODIFIER = 0.8
+MAX_MODIFIER = 1.15
+
+MAX_REPORT_LINES = 6
+
+
+def record_dates(records, current_week, today=None):
+    """
+    Date of each record: its Date column when present, otherwise from Week and Day.
+    Plans are generated on Sunday and current_week is already incremented, so week
+    current_week - 1 is the week in progress and week W started on this week's
+    Monday minus (current_week - 1 - W) weeks. Returns a datetime64[D] array (NaT if undatable).
+    """
+    today = today or date.today()
+    this_monday = today - timedelta(days=today.weekday())
+    dates = []
+    for record in records:
+        value = record.get('Date')
+        if value:
+            dates.append(str(value)[:10])
+            continue
+        day = str(record.get('Day', '')).strip().title()
+        try:
+            week = int(float(record.get('Week')))
+        except (TypeError, ValueError):
+            week = None
+        if week is None or day not in DAYS:
+            dates.append('NaT')
+            continue
+        monday = this_monday - timedelta(weeks=current_week - 1 - week)
+        dates.append((monday + timedelta(days=DAYS.index(day))).isoformat())
+    return np.array(dates, dtype='datetime64[D]')
+
+
+def relative_performance(exercise, dates, e1rm):
+    """
+    Per set: e1RM relative to its exercise's linear trend over time (0.03 = 3% above trend),
+    NaN for exercises with fewer than MIN_EXERCISE_SETS sets. Fitted for all exercises at once.
+    """
+    _, group = np.unique(exercise, return_inverse=True)
+    t = (dates - dates.min()).astype(float)
+    y = np.log(e1rm)
+    counts = np.bincount(group).astype(float)
+    dt = t - (np.bincount(group, t) / counts)[group]
+    dy = y - (np.bincount(group, y) / counts)[group]
+    var = np.bincount(group, dt * dt)
+    slope = np.divide(np.bincount(group, dt * dy), var, out=np.zeros_like(var), where=var > 0)
+    residual = np.expm1(dy - slope[group] * dt)
+    return np.where(counts[group] >= MIN_EXERCISE_SETS, residual, np.nan)
+
+
+def join_sets(records, history, profile, today=None):
+    """
+    One row per logged set: {"dates", "performance", "metrics" (sets x METRICS), "phase_index"}.
+    Recovery values are NaN and phase_index -1 where there is no data for the set's date.
+    """
+    records = [r for r in records or [] if isinstance(r, dict) and r.get('Exercise')]
+    actuals = progression_engine.parse_actuals(records)
+    e1rm = progression_engine.epley_e1rm(actuals["weight"], actuals["reps"], actuals["rpe"])
+    dates = record_dates(records, profile.get('current_week', 1), today)
+    valid = ~np.isnan(e1rm) & (actuals["reps"] > 0) & ~np.isnat(dates)
+
+    dates = dates[valid]
+    performance = relative_performance(actuals["exercise"][valid], dates, e1rm[valid]) if valid.any() else np.array([])
+    keep = ~np.isnan(performance)
+    dates, performance = dates[keep], performance[keep]
+
+    metrics = np.full((len(dates), len(readiness_engine.METRICS)), np.nan)
+    if history and len(dates):
+        history_dates, values = readiness_engine.history_to_arrays(history)
+        idx = np.minimum(np.searchsorted(history_dates, dates), len(history_dates) - 1)
+        matched = history_dates[idx] == dates
+        metrics[matched] = values[idx[matched]]
+
+    phase_index = np.full(len(dates), -1)
+    if len(dates):
+        calendar = cycle_engine.build_cycle_calendar(profile, dates.min().item(), dates.max().item())
+        if calendar is not None:
+            offsets = cycle_engine.lookup_cycle_days(calendar, dates)
+            phase_index = np.where(offsets >= 0, calendar["phase_index"][offsets], -1)
+    return {"dates": dates, "performance": performance, "metrics": metrics, "phase_index": phase_index}
+
+
+def metric_correlations(metrics, performance):
+    """
+    Pearson r and slope (performance change per metric unit) for every metric column at
+    once, over the sets that have that metric. Returns {metric: {"r", "slope_pct", "sets"}}.
+    """
+    present = ~np.isnan(metrics)
+    counts = present.sum(axis=0)
+    y = np.where(present, performance[:, None], 0.0)
+    x = np.where(present, metrics, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dx = np.where(present, x - x.sum(axis=0) / counts, 0.0)
+        dy = np.where(present, y - y.sum(axis=0) / counts, 0.0)
+        cov, var_x, var_y = (dx * dy).sum(axis=0), (dx * dx).sum(axis=0), (dy * dy).sum(axis=0)
+        r = cov / np.sqrt(var_x * var_y)
+        slope = cov / var_x
+
+    correlations = {}
+    for col, (key, _) in enumerate(readiness_engine.METRICS):
+        if counts[col] >= MIN_CORRELATION_SAMPLES and np.isfinite(r[col]):
+            correlations[key] = {"r": round(float(r[col]), 2), "slope_pct": round(float(slope[col]) * 100, 2),
+                                 "sets": int(counts[col])}
+    return correlations
+
+
+def phase_deltas(phase_index, performance):
+    """
+    Mean performance per cycle phase vs the overall mean, and the learned modifier:
+    (1 + delta) blended with the phase's default by sample count, clipped.
+    Returns {phase: {"sets", "delta_pct", "default_modifier", "modifier"}}.
+    """
+    tracked = phase_index >= 0
+    if not tracked.any():
+        return {}
+    counts = np.bincount(phase_index[tracked], minlength=len(cycle_engine.PHASES))
+    sums = np.bincount(phase_index[tracked], performance[tracked], minlength=len(cycle_engine.PHASES))
+    overall = performance[tracked].mean()
+
+    phases = {}
+    for i, phase in enumerate(cycle_engine.PHASES):
+        if not counts[i]:
+            continue
+        delta = sums[i] / counts[i] - overall
+        default = phase["intensity_modifier"]
+        weight = counts[i] / (counts[i] + PRIOR_SAMPLES)
+        learned = np.clip(weight * (1 + delta) + (1 - weight) * default, MIN_MODIFIER, MAX_MODIFIER)
+        phases[phase["phase"]] = {
+            "sets": int(counts[i]),
+            "delta_pct": round(float(delta) * 100, 1),
+            "default_modifier": default,
+            "modifier": round(float(learned), 3) if counts[i] >= MIN_PHASE_SAMPLES else default
+        }
+    return phases
+
+
+def build_report(records, history, profile, today=None):
+    """
+    The compact report for the email, dashboard and coach chat:
+    {"sets", "through", "correlations", "phases", "intensity_modifiers", "lines"}.
+    """
+    joined = join_sets(records, history, profile, today)
+    correlations = metric_correlations(joined["metrics"], joined["performance"])
+    phases = phase_deltas(joined["phase_index"], joined["performance"])
+    report = {
+        "sets": int(len(joined["performance"])),
+        "through": str(joined["dates"].max()) if len(joined["dates"]) else None,
+        "correlations": correlations,
+        "phases": phases,
+        "intensity_modifiers": {name: p["modifier"] for name, p in phases.items() if p["sets"] >= MIN_PHASE_SAMPLES}
+    }
+    report["lines"] = format_report_lines(report)
+    return report
+
+
+def format_report_lines(report):
+    """Strongest correlations first, then the phases with a learned modifier."""
+    lines = []
+    for key, c in sorted(report["correlations"].items(), key=lambda item: -abs(item[1]["r"])):
+        label, unit = METRIC_LABELS[key]
+        lines.append(f"{label}: {c['slope_pct']:+.1f}% strength per +1{unit} (r={c['r']:+.2f}, {c['sets']} sets)")
+    lines = lines[:MAX_REPORT_LINES - len(report["intensity_modifiers"])]
+    for name, modifier in report["intensity_modifiers"].items():
+        phase = report["phases"][name]
+        lines.append(f"{name}: {phase['delta_pct']:+.1f}% vs average over {phase['sets']} sets, "
+                     f"load x{modifier:g} (default x{phase['default_modifier']:g})")
+    return lines
+
+
+def update_performance(profile, records, history, today=None):
+    """
+    Builds the report and stores it (profile['performance_report']) with the learned
+    modifiers (profile['menstrual_cycle']['intensity_modifiers'], read by cycle_engine).
+    Returns (report, changes) where changes is {phase: (old, new)} for changed modifiers.
+    """
+    report = build_report(records, history, profile, today)
+    changes = {}
+    cycle = profile.get('menstrual_cycle')
+    if cycle is not None and report["intensity_modifiers"]:
+        current = cycle.setdefault('intensity_modifiers', {})
+        defaults = {p["phase"]: p["intensity_modifier"] for p in cycle_engine.PHASES}
+        for name, modifier in report["intensity_modifiers"].items():
+            old = current.get(name, defaults[name])
+            if old != modifier:
+                changes[name] = (old, modifier)
+            current[name] = modifier
+    profile['performance_report'] = report
+    return report, changes
@@ -0,0 +1,213 @@
+"""
+Plan Analyzer
+Checks a repaired weekly plan against the rules the planning prompt asks
+for, in a single pass over the exercises. Each exercise is mapped to muscle
+groups through its category (keyword taxonomy, falling back to the name),
+then sets per muscle, the heavy/moderate/high rep distribution and per-day
+violations (too few or too many exercises, no compound lift, day focus
+missed) are accumulated. Day violations feed the same per-day retry as
+schema errors, so only the offending days are re-requested. Week-level
+checks (goal muscle volume, rep mix) can't be fixed by re-requesting one
+day, so they are reported as warnings only.
+"""
+
+import re
+from functools import lru_cache
+
+# Prompt rules: 5-6 exercises per day, 1-2 compounds per session
+MIN_EXERCISES_PER_DAY = 5
+MAX_EXERCISES_PER_DAY = 6
+MIN_COMPOUNDS_PER_DAY = 1
+# Share of the day's focus muscles that must be trained that day
+MIN_FOCUS_COVERAGE = 0.5
+# Weekly hard sets below which a goal muscle is flagged
+MIN_GOAL_MUSCLE_SETS = 6
+# Largest share of the week's sets one rep range may take before the mix is flagged
+MAX_INTENSITY_SHARE = 0.7
+
+# (keyword in the normalized category or name, {muscle: share of each set})
+MUSCLE_TAXONOMY = [
+    ("glute", {"glutes": 1.0}),
+    ("thrust", {"glutes": 1.0}),
+    ("bridge", {"glutes": 1.0}),
+    ("kickback", {"glutes": 1.0}),
+    ("abduct", {"glutes": 1.0}),
+    ("hinge", {"hamstrings": 1.0, "glutes": 0.5}),
+    ("rdl", {"hamstrings": 1.0, "glutes": 0.5}),
+    ("deadlift", {"hamstrings": 1.0, "glutes": 0.5}),
+    ("hamstring", {"hamstrings": 1.0}),
+    ("leg_curl", {"hamstrings": 1.0}),
+    ("squat", {"quads": 1.0, "glutes": 0.5}),
+    ("lunge", {"quads": 1.0, "glutes": 0.5}),
+    ("quad", {"quads": 1.0}),
+    ("leg_extension", {"quads": 1.0}),
+    ("unilateral", {"quads": 0.5, "glutes": 0.5}),
+    ("pull", {"back": 1.0, "biceps": 0.5}),
+    ("row", {"back": 1.0, "biceps": 0.5}),
+    ("overhead_press", {"shoulders": 1.0, "triceps": 0.5}),
+    ("shoulder_press", {"shoulders": 1.0, "triceps": 0.5}),
+    ("delt", {"shoulders": 1.0}),
+    ("raise", {"shoulders": 1.0}),
+    ("rear_delt", {"back": 0.5}),
+    ("face_pull", {"shoulders": 1.0}),
+    ("push", {"chest": 1.0, "triceps": 0.5, "shoulders": 0.5}),
+    ("bench", {"chest": 1.0, "triceps": 1.0}),
+    ("tricep", {"triceps": 1.0}),
+    ("bicep", {"biceps": 1.0}),
+    ("curl", {"biceps": 1.0}),
+    ("calf", {"calves": 1.0}),
+    ("calves", {"calves": 1.0}),
+    ("core", {"core": 1.0}),
+    ("plank", {"core": 1.0}),
+    ("oblique", {"obliques": 1.0}),
+    ("rotation", {"obliques": 1.0}),
+    ("twist", {"obliques": 1.0}),
+    ("woodchop", {"obliques": 1.0}),
+]
+
+COMPOUND_KEYWORDS = ("compound", "heavy", "pattern", "squat", "hinge", "press", "row", "pull", "lunge")
+
+# Rep buckets from the prompt: Heavy (5-8), Moderate (8-12), High (12-20)
+INTENSITY_BUCKETS = [("heavy", 7.5), ("moderate", 12), ("high", float("inf"))]
+
+_TIMED_PATTERN = re.compile(r'\d+\s*(s|sec|secs|seconds|min|mins|minutes)\b', re.IGNORECASE)
+_NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+
+
+def _normalize(text):
+    return re.sub(r'[^a-z0-9]+', '_', str(text or '').lower())
+
+
+@lru_cache(maxsize=1024)
+def _keyword_muscles(text):
+    muscles = {}
+    for keyword, shares in MUSCLE_TAXONOMY:
+        if keyword in text:
+            for muscle, share in shares.items():
+                muscles[muscle] = max(muscles.get(muscle, 0), share)
+    return muscles
+
+
+@lru_cache(maxsize=4096)
+def muscles_for(category, name=''):
+    """{muscle: share} for an exercise: from its category, or its name when the category says nothing."""
+    return _keyword_muscles(_normalize(category)) or _keyword_muscles(_normalize(name))
+
+
+@lru_cache(maxsize=1024)
+def is_compound(category):
+    normalized = _normalize(category)
+    return "iso" not in normalized.split('_') and any(k in normalized for k in COMPOUND_KEYWORDS)
+
+
+@lru_cache(maxsize=1024)
+def intensity_bucket(reps):
+    """'6-8' -> heavy, '10-12' -> moderate, '15' -> high; timed holds and unparseable reps -> 'other'."""
+    text = str(reps or '')
+    numbers = [float(n) for n in _NUMBER_PATTERN.findall(text)]
+    if not numbers or _TIMED_PATTERN.search(text):
+        return "other"
+    mid = (min(numbers) + max(numbers)) / 2
+    return next(name for name, upper in INTENSITY_BUCKETS if mid <= upper)
+
+
+_ALL_MUSCLES = sorted({m for _, shares in MUSCLE_TAXONOMY for m in shares})
+
+
+def goal_muscles(profile):
+    """Muscles named in user_context.specific_goals (e.g. 'Focus: Back, Core, Triceps')."""
+    return _goal_muscles((profile or {}).get('user_context', {}).get('specific_goals', ''))
+
+
+@lru_cache(maxsize=64)
+def _goal_muscles(goals):
+    return frozenset(_keyword_muscles(_normalize(goals))) | {m for m in _ALL_MUSCLES if m in goals.lower()}
+
+
+@lru_cache(maxsize=256)
+def _focus_muscles(categories):
+    """Primary muscles of a schedule slot's categories."""
+    return frozenset(m for category in categories for m, share in muscles_for(category).items() if share >= 1)
+
+
+def _flatten(categories):
+    """Slot categories with supersets (nested lists) flattened."""
+    for category in categories:
+        if isinstance(category, list):
+            yield from _flatten(category)
+        else:
+            yield category
+
+
+def _slot_focus(profile):
+    """{day_name: set of focus muscles} from the schedule slot categories."""
+    return {slot['day_name']: _focus_muscles(tuple(_flatten(slot.get('categories', []))))
+            for slot in (profile or {}).get('schedule_slots', [])}
+
+
+def analyze_plan(plan, profile=None):
+    """
+    One pass over the plan. Returns:
+    - days: {day: {"exercises", "sets", "compounds", "muscles": {muscle: sets}}}
+    - weekly_sets: {muscle: sets} (secondary muscles count as half sets)
+    - intensity: {bucket: sets} for heavy / moderate / high / other
+    - violations: {day: [messages]} - the rules that gate a day
+    - warnings: [messages] - week-level issues (goal muscle volume, rep mix)
+    """
+    focus = _slot_focus(profile)
+    days, weekly_sets, violations = {}, {}, {}
+    intensity = {name: 0 for name, _ in INTENSITY_BUCKETS}
+    intensity["other"] = 0
+
+    for day, exercises in plan.items():
+        if day == 'coaching_notes' or not isinstance(exercises, list):
+            continue
+        summary = {"exercises": len(exercises), "sets": 0, "compounds": 0, "muscles": {}}
+        for ex in exercises:
+            sets = ex.get('sets') if isinstance(ex.get('sets'), int) else 3
+            summary["sets"] += sets
+            category = str(ex.get('category') or '')
+            summary["compounds"] += is_compound(category)
+            intensity[intensity_bucket(str(ex.get('reps') or ''))] += sets
+            for muscle, share in muscles_for(category, str(ex.get('exercise') or '')).items():
+                summary["muscles"][muscle] = summary["muscles"].get(muscle, 0) + sets * share
+                weekly_sets[muscle] = weekly_sets.get(muscle, 0) + sets * share
+        days[day] = summary
+
+        problems = []
+        if summary["exercises"] < MIN_EXERCISES_PER_DAY:
+            problems.append(f"only {summary['exercises']} exercises (minimum {MIN_EXERCISES_PER_DAY})")
+        elif summary["exercises"] > MAX_EXERCISES_PER_DAY:
+            problems.append(f"{summary['exercises']} exercises (maximum {MAX_EXERCISES_PER_DAY})")
+        if summary["compounds"] < MIN_COMPOUNDS_PER_DAY:
+            problems.append("no compound movement")
+        day_focus = focus.get(day)
+        if day_focus:
+            trained = {m for m, sets in summary["muscles"].items() if sets > 0} & day_focus
+            if len(trained) < MIN_FOCUS_COVERAGE * len(day_focus):
+                missing = ", ".join(sorted(day_focus - trained))
+                problems.append(f"misses the day's focus ({missing})")
+        if problems:
+            violations[day] = problems
+
+    warnings = []
+    for muscle in sorted(goal_muscles(profile)):
+        if weekly_sets.get(muscle, 0) < MIN_GOAL_MUSCLE_SETS:
+            warnings.append(f"{muscle}: {weekly_sets.get(muscle, 0):g} weekly sets (goal muscle, minimum {MIN_GOAL_MUSCLE_SETS})")
+    total_sets = sum(intensity.values())
+    for bucket, sets in intensity.items():
+        if bucket != "other" and total_sets and sets / total_sets > MAX_INTENSITY_SHARE:
+            warnings.append(f"{bucket} rep range is {sets / total_sets:.0%} of weekly sets - mix rep ranges")
+
+    return {
+        "days": days,
+        "weekly_sets": {m: round(s, 1) for m, s in sorted(weekly_sets.items())},
+        "intensity": intensity,
+        "violations": violations,
+        "warnings": warnings
+    }
+
+
+def day_violations(plan, profile=None):
+    """{day: [messages]} for days that break the per-day rules."""
+    return analyze_plan(plan, profile)["violations"]
@@ -0,0 +1,102 @@
+"""
+Plan Diff
+Structural diff between two versions of a week's plan, at the day and
+exercise level. Exercises are aligned by name within each day (so an
+inserted exercise doesn't make every later one look changed), and kept
+exercises are compared field by field. The publishers use the diff to
+update only what changed when a plan is regenerated mid-week: calendar
+events of changed days, the sheet rows of changed exercises and the
+dashboard's changed day sections.
+"""
+
+from difflib import SequenceMatcher
+
+# Fields that are published (calendar, sheet, dashboard); others are ignored
+EXERCISE_FIELDS = ["exercise", "category", "sets", "reps", "rest", "target_weight", "cues", "url"]
+
+
+def _days(plan):
+    return {day: exercises for day, exercises in (plan or {}).items()
+            if day != 'coaching_notes' and isinstance(exercises, list)}
+
+
+def _name(ex):
+    return str(ex.get('exercise', '')).strip().lower()
+
+
+def align(old_keys, new_keys):
+    """SequenceMatcher opcodes [(tag, i1, i2, j1, j2)] turning old_keys into new_keys."""
+    return SequenceMatcher(None, old_keys, new_keys, autojunk=False).get_opcodes()
+
+
+def field_changes(old_ex, new_ex):
+    """{field: [old, new]} for the published fields that differ."""
+    return {f: [old_ex.get(f), new_ex.get(f)] for f in EXERCISE_FIELDS if old_ex.get(f) != new_ex.get(f)}
+
+
+def diff_day(old_exercises, new_exercises):
+    """
+    [{"op": "added" | "removed" | "changed", "exercise", "index", "fields"?}] for one day.
+    index is the position in the new list (the old list for removals).
+    """
+    changes = []
+    for tag, i1, i2, j1, j2 in align([_name(e) for e in old_exercises], [_name(e) for e in new_exercises]):
+        if tag == 'equal':
+            for offset in range(i2 - i1):
+                fields = field_changes(old_exercises[i1 + offset], new_exercises[j1 + offset])
+                if fields:
+                    changes.append({"op": "changed", "exercise": new_exercises[j1 + offset].get('exercise'),
+                                    "index": j1 + offset, "fields": fields})
+            continue
+        for i in range(i1, i2):
+            changes.append({"op": "removed", "exercise": old_exercises[i].get('exercise'), "index": i})
+        for j in range(j1, j2):
+            changes.append({"op": "added", "exercise": new_exercises[j].get('exercise'), "index": j})
+    return changes
+
+
+def diff_plans(old_plan, new_plan):
+    """
+    Returns {"days": {day: {"status", "changes"}}, "notes_changed": bool} where
+    status is added / removed / changed / unchanged and changes is diff_day's list.
+    """
+    old_days, new_days = _days(old_plan), _days(new_plan)
+    days = {}
+    for day in list(old_days) + [d for d in new_days if d not in old_days]:
+        if day not in new_days:
+            days[day] = {"status": "removed", "changes": []}
+        elif day not in old_days:
+            days[day] = {"status": "added", "changes": []}
+        else:
+            changes = diff_day(old_days[day], new_days[day])
+            days[day] = {"status": "changed" if changes else "unchanged", "changes": changes}
+    return {
+        "days": days,
+        "notes_changed": (old_plan or {}).get('coaching_notes') != (new_plan or {}).get('coaching_notes')
+    }
+
+
+def changed_days(diff, statuses=("added", "removed", "changed")):
+    return [day for day, entry in diff["days"].items() if entry["status"] in statuses]
+
+
+def is_empty(diff):
+    return not changed_days(diff) and not diff["notes_changed"]
+
+
+def summarize(diff):
+    """One line per changed day, e.g. 'Monday: +Cable Row, -Lat Pulldown, ~Squat (sets, reps)'."""
+    lines = []
+    for day, entry in diff["days"].items():
+        if entry["status"] in ("added", "removed"):
+            lines.append(f"{day}: day {entry['status']}")
+        elif entry["status"] == "changed":
+            parts = []
+            for change in entry["changes"]:
+                symbol = {"added": "+", "removed": "-", "changed": "~"}[change["op"]]
+                detail = f" ({', '.join(change['fields'])})" if change["op"] == "changed" else ""
+                parts.append(f"{symbol}{change['exercise']}{detail}")
+            lines.append(f"{day}: {', '.join(parts)}")
+    if diff["notes_changed"]:
+        lines.append("Coaching notes updated")
+    return lines
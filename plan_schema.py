@@ -0,0 +1,194 @@
+"""
+Plan Schema
+Validates and repairs the AI weekly plan JSON in a single pass.
+Coerces exercise fields to consistent types, keeps coaching_notes as text
+and reports which days are unusable so only those get re-requested.
+"""
+
+import re
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+_DAY_LOOKUP = {d.lower(): d for d in DAY_NAMES}
+
+MIN_EXERCISES_PER_DAY = 1
+
+
+def _to_text(value):
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(v) for v in value)
+    text = str(value).strip()
+    return text or None
+
+
+def _to_sets(value):
+    """3 -> 3, '3-4' -> 4, '4 sets' -> 4."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if value > 0 else None
+    numbers = [int(n) for n in re.findall(r'\d+', str(value or ''))]
+    return max(numbers) if numbers else None
+
+
+def _to_reps(value):
+    """12 -> '12', '8 - 10' -> '8-10'. Reps stay text so ranges and 'each leg' survive."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = _to_text(value)
+    return re.sub(r'\s*-\s*', '-', text) if text else None
+
+
+def _to_rest(value):
+    """90 -> '90s', '2 min' stays as-is."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return f"{int(value)}s" if value > 0 else None
+    text = _to_text(value)
+    if text and text.isdigit():
+        return f"{text}s"
+    return text
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "1")
+    return bool(value)
+
+
+def _search_url(name):
+    return f"https://www.youtube.com/results?search_query={name.replace(' ', '+')}"
+
+
+# Compiled field table: (field, coercer, default). A default of None means derived later.
+EXERCISE_SCHEMA = (
+    ("category", _to_text, "Unspecified"),
+    ("sets", _to_sets, 3),
+    ("reps", _to_reps, "10"),
+    ("rest", _to_rest, "60s"),
+    ("target_weight", _to_text, "RPE 7-8"),
+    ("url", _to_text, None),
+    ("cues", _to_text, "Focus on form."),
+    ("is_new", _to_bool, False),
+)
+
+# Alternate key names the model sometimes uses
+FIELD_ALIASES = {
+    "exercise": ("exercise", "name", "exercise_name"),
+    "target_weight": ("target_weight", "weight", "load"),
+    "cues": ("cues", "cue", "notes"),
+}
+_ALIAS_KEYS = {key for keys in FIELD_ALIASES.values() for key in keys}
+
+
+def _lookup(raw, field):
+    for key in FIELD_ALIASES.get(field, (field,)):
+        if raw.get(key) not in (None, ""):
+            return raw[key]
+    return None
+
+
+def repair_exercise(raw):
+    """
+    Coerces one exercise (dict or bare name string) into the canonical shape.
+    Returns (exercise, error) - exercise is None when it cannot be repaired.
+    """
+    if isinstance(raw, str):
+        raw = {"exercise": raw}
+    if not isinstance(raw, dict):
+        return None, f"not an exercise object: {type(raw).__name__}"
+
+    name = _to_text(_lookup(raw, "exercise"))
+    if not name:
+        return None, "exercise has no name"
+
+    exercise = {"exercise": name}
+    for field, coerce, default in EXERCISE_SCHEMA:
+        value = coerce(_lookup(raw, field))
+        exercise[field] = value if value is not None else default
+    if not exercise["url"]:
+        exercise["url"] = _search_url(name)
+
+    # Keep any extra keys the model added (e.g. superset labels)
+    for key, value in raw.items():
+        if key not in _ALIAS_KEYS:
+            exercise.setdefault(key, value)
+    return exercise, None
+
+
+def _merge_list_response(data):
+    """Merges a list-shaped response ([{"Monday": [...]}, {"day": ..., "exercises": [...]}]) into a dict."""
+    merged = {}
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        day = item.get("day") or item.get("day_name")
+        if day and "exercises" in item:
+            merged[day] = item["exercises"]
+        else:
+            merged.update(item)
+    return merged
+
+
+def _notes_to_text(notes):
+    """coaching_notes must be text - flatten lists/objects the model sometimes returns."""
+    if isinstance(notes, list):
+        parts = [(n.get("exercise") or n.get("text") or "") if isinstance(n, dict) else str(n) for n in notes]
+        return " ".join(p for p in parts if p).strip()
+    if isinstance(notes, dict):
+        return " ".join(str(v) for v in notes.values())
+    return _to_text(notes) or ""
+
+
+def repair_plan(data, expected_days=None):
+    """
+    Validates and repairs a weekly plan in one pass.
+
+    Args:
+        data: Parsed JSON from the model (dict or list)
+        expected_days: Day names that must be present (e.g. from schedule_slots)
+
+    Returns (plan, errors):
+    - plan: {"coaching_notes": str, day_name: [exercise, ...]} with only valid days
+    - errors: {day_name: [messages]} for days that are missing or unusable
+    """
+    if isinstance(data, list):
+        print("Warning: AI returned a list. Attempting to merge into dictionary.")
+        data = _merge_list_response(data)
+    if not isinstance(data, dict):
+        data = {}
+
+    plan = {"coaching_notes": _notes_to_text(data.get("coaching_notes"))}
+    errors = {}
+
+    for key, exercises in data.items():
+        day = _DAY_LOOKUP.get(str(key).strip().lower())
+        if day is None:
+            continue
+        if not isinstance(exercises, list):
+            exercises = [exercises]
+
+        clean, day_errors = [], []
+        for raw in exercises:
+            exercise, error = repair_exercise(raw)
+            if exercise:
+                clean.append(exercise)
+            else:
+                day_errors.append(error)
+
+        if len(clean) < MIN_EXERCISES_PER_DAY:
+            errors[day] = day_errors + ["no valid exercises"]
+        else:
+            plan[day] = clean
+            if day_errors:
+                print(f"Warning: dropped {len(day_errors)} invalid exercise(s) on {day}")
+
+    for day in expected_days or []:
+        if day not in plan and day not in errors:
+            errors[day] = ["day missing from plan"]
+
+    return plan, errors
@@ -0,0 +1,233 @@
+"""
+Progression Engine
+Turns the logged ACTUAL Weight / ACTUAL Reps / RPE columns into estimated
+one-rep maxes and next-week target loads. All history rows are parsed once
+into arrays; e1RM (Epley, with reps-in-reserve from RPE added to the reps
+performed) and the per-exercise bests are then computed in one vectorized
+pass. Loads are autoregulated by how hard the last session felt and rounded
+with calculate_weight, so the planner gets compact precomputed targets
+instead of raw sheet rows.
+"""
+
+import re
+import numpy as np
+
+# Only sets from the most recent weeks of an exercise count towards its max
+RECENT_WEEKS = 4
+
+# Prescriptions aim for this RPE (2 reps in reserve)
+TARGET_RPE = 8
+DEFAULT_TARGET_REPS = 8
+
+# Load change per RPE point the last session was easier (+) or harder (-) than the target
+RPE_LOAD_STEP = 0.025
+MAX_LOAD_ADJUSTMENT = 0.05
+
+# Unlogged RPE counts as a set to failure (conservative)
+DEFAULT_RPE = 10
+
+_WEIGHT_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(?:lbs?|#)?\s*$', re.IGNORECASE)
+_NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+
+
+def calculate_weight(one_rep_max, intensity):
+    """Calculates working weight rounded to nearest 5lbs."""
+    weight = one_rep_max * intensity
+    return round(weight / 5) * 5
+
+
+def parse_weight(value):
+    """'135 lbs' / '135' / 135 -> 135.0; anything else (e.g. 'RPE 7-8', 'BW') -> NaN."""
+    if isinstance(value, bool):
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value) if value > 0 else np.nan
+    match = _WEIGHT_PATTERN.match(str(value))
+    return float(match.group(1)) if match and float(match.group(1)) > 0 else np.nan
+
+
+def _parse_number(value):
+    """First number in a cell ('10-12' -> 10, '12 each leg' -> 12), NaN if none."""
+    if isinstance(value, bool):
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER_PATTERN.search(str(value))
+    return float(match.group()) if match else np.nan
+
+
+def parse_actuals(records):
+    """
+    Parses sheet records into arrays (exercise, week, weight, reps, rpe).
+    WorkoutLog rows use the ACTUAL columns (blank until the set is logged);
+    older history rows without them use Weight / Reps.
+    """
+    exercises, weeks, weights, reps, rpes = [], [], [], [], []
+    for record in records or []:
+        if not isinstance(record, dict) or not record.get('Exercise'):
+            continue
+        if 'ACTUAL Weight' in record:
+            weight, rep = record.get('ACTUAL Weight'), record.get('ACTUAL Reps')
+        else:
+            weight, rep = record.get('Weight'), record.get('Reps')
+        exercises.append(str(record['Exercise']).strip())
+        weeks.append(_parse_number(record.get('Week')))
+        weights.append(parse_weight(weight))
+        reps.append(_parse_number(rep))
+        rpes.append(_parse_number(record.get('RPE')))
+    return {
+        "exercise": np.array(exercises, dtype=object),
+        "week": np.array(weeks, dtype=float),
+        "weight": np.array(weights, dtype=float),
+        "reps": np.array(reps, dtype=float),
+        "rpe": np.array(rpes, dtype=float)
+    }
+
+
+def epley_e1rm(weight, reps, rpe):
+    """Epley estimate with reps in reserve: weight * (1 + (reps + (10 - RPE)) / 30). Works on arrays."""
+    rpe = np.clip(np.where(np.isnan(rpe), DEFAULT_RPE, rpe), 1, 10)
+    return weight * (1 + (reps + (10 - rpe)) / 30)
+
+
+def estimate_maxes(records, recent_weeks=RECENT_WEEKS):
+    """
+    Estimated max per exercise from every logged set.
+
+    Returns {exercise: {"e1rm", "week", "last_weight", "last_reps", "last_rpe"}}: the best
+    e1RM over the exercise's last `recent_weeks` logged weeks plus its latest logged set
+    and the average RPE of its latest week (None if no RPE was logged).
+    """
+    actuals = parse_actuals(records)
+    e1rm = epley_e1rm(actuals["weight"], actuals["reps"], actuals["rpe"])
+    valid = ~np.isnan(e1rm) & ~np.isnan(actuals["week"]) & (actuals["reps"] > 0)
+    if not valid.any():
+        return {}
+
+    names, group = np.unique(actuals["exercise"][valid], return_inverse=True)
+    weeks = actuals["week"][valid]
+    e1rm = e1rm[valid]
+    rpe = actuals["rpe"][valid]
+    rows = np.arange(len(weeks))
+
+    latest = np.full(len(names), -np.inf)
+    np.maximum.at(latest, group, weeks)
+
+    recent = weeks > latest[group] - recent_weeks
+    best = np.full(len(names), np.nan)
+    np.fmax.at(best, group[recent], e1rm[recent])
+
+    in_latest = weeks == latest[group]
+    last_row = np.full(len(names), -1)
+    np.maximum.at(last_row, group[in_latest], rows[in_latest])
+
+    rated = in_latest & ~np.isnan(rpe)
+    rpe_sum = np.zeros(len(names))
+    rpe_count = np.zeros(len(names))
+    np.add.at(rpe_sum, group[rated], rpe[rated])
+    np.add.at(rpe_count, group[rated], 1)
+
+    weight = actuals["weight"][valid]
+    reps = actuals["reps"][valid]
+    estimates = {}
+    for i, name in enumerate(names):
+        row = last_row[i]
+        estimates[name] = {
+            "e1rm": round(float(best[i]), 1),
+            "week": int(latest[i]),
+            "last_weight": float(weight[row]),
+            "last_reps": int(reps[row]),
+            "last_rpe": round(float(rpe_sum[i] / rpe_count[i]), 1) if rpe_count[i] else None
+        }
+    return estimates
+
+
+def update_profile_maxes(profile, estimates):
+    """Writes the estimated maxes into profile['maxes']. Returns {exercise: (old, new)} for changed entries."""
+    maxes = profile.setdefault('maxes', {})
+    changes = {}
+    for exercise, estimate in estimates.items():
+        new_max = int(round(estimate["e1rm"]))
+        if maxes.get(exercise) != new_max:
+            changes[exercise] = (maxes.get(exercise), new_max)
+            maxes[exercise] = new_max
+    return changes
+
+
+def target_intensity(reps, rpe=TARGET_RPE):
+    """Fraction of 1RM that leaves (10 - rpe) reps in reserve for a set of `reps` (inverse Epley)."""
+    return 1 / (1 + (reps + (10 - rpe)) / 30)
+
+
+def load_adjustment(last_rpe):
+    """Autoregulation: push the load when the last session was easier than TARGET_RPE, back off when harder."""
+    if last_rpe is None:
+        return 0.0
+    return float(np.clip((TARGET_RPE - last_rpe) * RPE_LOAD_STEP, -MAX_LOAD_ADJUSTMENT, MAX_LOAD_ADJUSTMENT))
+
+
+def target_load(e1rm, adjustment=0.0, reps=DEFAULT_TARGET_REPS, rpe=TARGET_RPE):
+    """Working weight for `reps` reps at `rpe` from an e1RM and an autoregulation adjustment."""
+    return calculate_weight(e1rm * (1 + adjustment), target_intensity(reps, rpe))
+
+
+def next_week_targets(estimates, reps=DEFAULT_TARGET_REPS):
+    """{exercise: {"e1rm", "last", "adjustment", "load", "reps", "rpe"}} - the compact targets handed to the planner."""
+    targets = {}
+    for exercise, estimate in estimates.items():
+        last = f"{estimate['last_weight']:g}x{estimate['last_reps']}"
+        if estimate["last_rpe"] is not None:
+            last += f" @{estimate['last_rpe']:g}"
+        adjustment = load_adjustment(estimate["last_rpe"])
+        targets[exercise] = {
+            "e1rm": estimate["e1rm"],
+            "last": last,
+            "adjustment": adjustment,
+            "load": target_load(estimate["e1rm"], adjustment, reps),
+            "reps": reps,
+            "rpe": TARGET_RPE
+        }
+    return targets
+
+
+def update_progression(profile, records):
+    """
+    Estimates maxes from the full history, updates profile['maxes'] and returns
+    (targets, changes) for next week.
+    """
+    estimates = estimate_maxes(records)
+    changes = update_profile_maxes(profile, estimates)
+    return next_week_targets(estimates), changes
+
+
+def format_targets(targets):
+    """One line per exercise for the planning prompt."""
+    return "\n".join(
+        f"- {exercise}: e1RM {t['e1rm']:g} lbs, last {t['last']} -> {t['load']} lbs x {t['reps']} @RPE {t['rpe']}"
+        for exercise, t in sorted(targets.items())
+    )
+
+
+def apply_targets(weekly_plan_data, targets, rpe=TARGET_RPE):
+    """
+    Sets target_weight on planned exercises that have a tracked max, computed for the
+    planned rep count (first number of 'reps') at `rpe`. Returns the number updated.
+    """
+    if not targets:
+        return 0
+    updated = 0
+    for day, exercises in weekly_plan_data.items():
+        if day == 'coaching_notes' or not isinstance(exercises, list):
+            continue
+        for ex in exercises:
+            target = targets.get(ex.get('exercise')) if isinstance(ex, dict) else None
+            if not target:
+                continue
+            reps = _parse_number(ex.get('reps'))
+            if np.isnan(reps) or reps < 1:
+                reps = target["reps"]
+            load = target_load(target["e1rm"], target["adjustment"], reps, rpe)
+            ex['target_weight'] = f"{load} lbs"
+            updated += 1
+    return updated
+
@@ -0,0 +1,159 @@
+"""
+Readiness Engine
+Scores daily training readiness from the cached Garmin recovery history.
+Each metric is compared against its own rolling baseline (z-score), then
+combined with the absolute thresholds from profile['recovery_metrics']
+into a 0-100 readiness score and a per-day intensity multiplier.
+"""
+
+import numpy as np
+
+# (metric key, direction) - direction -1 means higher values are worse
+METRICS = [
+    ("sleep_duration_hours", 1),
+    ("sleep_score", 1),
+    ("stress_level", -1),
+    ("body_battery_morning", 1),
+    ("hrv_avg", 1)
+]
+
+BASELINE_WINDOW_DAYS = 28
+MIN_BASELINE_SAMPLES = 3
+NEUTRAL_SCORE = 50
+Z_SCORE_WEIGHT = 15      # score points per standard deviation
+THRESHOLD_PENALTY = 10   # score points per breached absolute threshold
+READY_SCORE = 40
+
+# Multiplier range applied to planned loads
+MIN_MULTIPLIER = 0.85
+MAX_MULTIPLIER = 1.05
+
+DEFAULT_RECOVERY_METRICS = {
+    "min_sleep_hours": 6,
+    "max_stress_threshold": 60
+}
+
+
+def history_to_arrays(history):
+    """
+    Converts the recovery cache ({date_str: day_dict}) into a date array and
+    a (days x metrics) float matrix with NaN for missing values.
+    """
+    date_strs = sorted(history)
+    values = np.full((len(date_strs), len(METRICS)), np.nan)
+    for row, date_str in enumerate(date_strs):
+        day = history[date_str]
+        for col, (key, _) in enumerate(METRICS):
+            value = day.get(key)
+            if value is not None:
+                values[row, col] = value
+    return np.array(date_strs, dtype='datetime64[D]'), values
+
+
+def _rolling_baseline(values, window):
+    """
+    Mean and std of the previous `window` rows for every row, ignoring NaNs.
+    Uses cumulative sums so the whole matrix is processed in one pass.
+    """
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+
+    zeros = np.zeros((1, values.shape[1]))
+    sums = np.vstack([zeros, np.cumsum(filled, axis=0)])
+    squares = np.vstack([zeros, np.cumsum(filled ** 2, axis=0)])
+    counts = np.vstack([zeros, np.cumsum(present, axis=0)])
+
+    rows = np.arange(values.shape[0])
+    lo = np.maximum(rows - window, 0)
+    n = counts[rows] - counts[lo]
+    total = sums[rows] - sums[lo]
+    total_sq = squares[rows] - squares[lo]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / n
+        std = np.sqrt(np.maximum(total_sq / n - mean ** 2, 0.0))
+    mean[n < MIN_BASELINE_SAMPLES] = np.nan
+    return mean, std
+
+
+def score_history(history, recovery_metrics=None, window=BASELINE_WINDOW_DAYS):
+    """
+    Scores every day in the recovery history at once.
+
+    Returns a dict with:
+    - dates: datetime64 array
+    - z_scores: (days x metrics) array, signed so positive is better
+    - score: readiness score per day (0-100)
+    - intensity_multiplier: load multiplier per day
+    """
+    thresholds = dict(DEFAULT_RECOVERY_METRICS)
+    thresholds.update(recovery_metrics or {})
+
+    dates, values = history_to_arrays(history)
+    if len(dates) == 0:
+        return {"dates": dates, "z_scores": values, "score": np.array([]), "intensity_multiplier": np.array([])}
+
+    mean, std = _rolling_baseline(values, window)
+    directions = np.array([d for _, d in METRICS])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z_scores = (values - mean) / np.maximum(std, 1e-6) * directions
+    z_scores = np.clip(z_scores, -3, 3)
+
+    # Average the metrics that have both a value and a baseline
+    valid = ~np.isnan(z_scores)
+    z_sum = np.where(valid, z_scores, 0.0).sum(axis=1)
+    z_count = valid.sum(axis=1)
+    combined = np.divide(z_sum, z_count, out=np.zeros_like(z_sum), where=z_count > 0)
+
+    # Absolute thresholds from the profile still apply without a baseline
+    sleep_col = [k for k, _ in METRICS].index("sleep_duration_hours")
+    stress_col = [k for k, _ in METRICS].index("stress_level")
+    with np.errstate(invalid='ignore'):
+        breaches = (values[:, sleep_col] < thresholds["min_sleep_hours"]).astype(int)
+        breaches += (values[:, stress_col] > thresholds["max_stress_threshold"]).astype(int)
+
+    score = np.clip(NEUTRAL_SCORE + Z_SCORE_WEIGHT * combined - THRESHOLD_PENALTY * breaches, 0, 100)
+    multiplier = np.where(
+        score < NEUTRAL_SCORE,
+        1 - (NEUTRAL_SCORE - score) / NEUTRAL_SCORE * (1 - MIN_MULTIPLIER),
+        1 + (score - NEUTRAL_SCORE) / (100 - NEUTRAL_SCORE) * (MAX_MULTIPLIER - 1)
+    )
+
+    return {
+        "dates": dates,
+        "z_scores": z_scores,
+        "score": score,
+        "intensity_multiplier": np.round(multiplier, 3)
+    }
+
+
+def get_readiness(history, recovery_metrics=None, target_date=None):
+    """
+    Returns the readiness summary for one day (the latest cached day by default),
+    or None if that day is not in the history.
+    """
+    scored = score_history(history, recovery_metrics)
+    if len(scored["dates"]) == 0:
+        return None
+
+    if target_date is None:
+        row = len(scored["dates"]) - 1
+    else:
+        matches = np.nonzero(scored["dates"] == np.datetime64(target_date, 'D'))[0]
+        if len(matches) == 0:
+            return None
+        row = int(matches[0])
+
+    score = float(round(scored["score"][row], 1))
+    z_scores = {
+        key: round(float(z), 2)
+        for (key, _), z in zip(METRICS, scored["z_scores"][row])
+        if not np.isnan(z)
+    }
+    return {
+        "date": str(scored["dates"][row]),
+        "score": score,
+        "intensity_multiplier": float(scored["intensity_multiplier"][row]),
+        "ready": score >= READY_SCORE,
+        "z_scores": z_scores
+    }
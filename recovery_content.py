@@ -0,0 +1,155 @@
+"""
+Recovery Content Selector
+Loads recovery_database.json once into an index keyed by body region,
+duration and intensity, and attaches warm-ups, cool-downs and yoga flows
+to each training day locally (no AI call needed).
+"""
+
+import os
+import re
+import json
+from functools import lru_cache
+
+RECOVERY_DATABASE_FILE = os.path.join(os.path.dirname(__file__), 'recovery_database.json')
+
+# Keywords used to map routine keys and day focus text to body regions
+REGION_KEYWORDS = {
+    "lower": ["lower", "leg", "glute", "hamstring", "quad", "calf", "calves", "hip", "posterior", "anterior"],
+    "upper": ["upper", "back", "shoulder", "arm", "chest", "tricep", "bicep", "push", "pull", "delt"],
+    "full": ["full body"]
+}
+
+# Routines whose key contains one of these words are higher intensity
+MODERATE_KEYWORDS = ["dynamic", "energize"]
+
+# Time budget for the warm-up inside the ~60-75 minute session
+WARMUP_BUDGET_MIN = 10
+
+
+def _parse_minutes(duration):
+    """Parses '10 mins' -> 10. Returns None if there is no number."""
+    match = re.search(r'\d+', str(duration or ''))
+    return int(match.group()) if match else None
+
+
+def _match_regions(text):
+    """Returns the set of body regions mentioned in a key or focus string."""
+    text = text.lower().replace('_', ' ')
+    regions = {region for region, words in REGION_KEYWORDS.items() if any(w in text for w in words)}
+    if "full" in regions:
+        regions.update(["lower", "upper"])
+    return regions
+
+
+def _index_routine(kind, key, routine):
+    """Normalizes one routine into an index entry."""
+    regions = (_match_regions(key) & {"lower", "upper"}) or {"lower", "upper"}
+    return {
+        "kind": kind,
+        "key": key,
+        "name": routine.get("name", key),
+        "duration_min": _parse_minutes(routine.get("duration")),
+        "intensity": "moderate" if any(w in key for w in MODERATE_KEYWORDS) else "low",
+        "regions": sorted(regions),
+        "best_for": routine.get("best_for", []),
+        "url": routine.get("url"),
+        "exercises": routine.get("exercises", []),
+        "description": routine.get("description", "")
+    }
+
+
+@lru_cache(maxsize=None)
+def load_recovery_index(path=RECOVERY_DATABASE_FILE):
+    """
+    Parses the recovery database once and indexes it.
+    Returns {"warmup" | "cooldown" | "yoga": {region: [entries sorted by duration]},
+             "rest_day": {key: routine}}.
+    """
+    try:
+        with open(path, 'r') as f:
+            database = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error loading recovery database: {e}")
+        database = {}
+
+    sections = {
+        "warmup": database.get("warmup_routines", {}),
+        "cooldown": database.get("stretching_routines", {}),
+        "yoga": database.get("yoga_flows", {})
+    }
+
+    index = {}
+    for kind, routines in sections.items():
+        by_region = {"lower": [], "upper": []}
+        for key, routine in routines.items():
+            entry = _index_routine(kind, key, routine)
+            for region in entry["regions"]:
+                by_region[region].append(entry)
+        for entries in by_region.values():
+            entries.sort(key=lambda e: e["duration_min"] or 0)
+        index[kind] = by_region
+
+    index["rest_day"] = database.get("rest_day_activities", {})
+    return index
+
+
+def _pick(entries, max_minutes=None, intensity=None, phase=None):
+    """Picks the best entry: matching cycle phase first, then intensity, within the time budget."""
+    candidates = [e for e in entries if max_minutes is None or (e["duration_min"] or 0) <= max_minutes] or entries
+    if intensity:
+        candidates = [e for e in candidates if e["intensity"] == intensity] or candidates
+    if phase:
+        phase_label = f"{phase} phase"
+        candidates = [e for e in candidates if phase_label in e["best_for"]] or candidates
+    return candidates[0] if candidates else None
+
+
+def _summary(entry):
+    """Compact view of an index entry for the plan/email/dashboard."""
+    if entry is None:
+        return None
+    return {
+        "name": entry["name"],
+        "duration_min": entry["duration_min"],
+        "url": entry["url"],
+        "exercises": entry["exercises"]
+    }
+
+
+def select_recovery_content(profile, readiness=None, cycle_phase=None):
+    """
+    Chooses a warm-up and cool-down for every scheduled day from its focus,
+    plus an optional yoga flow when readiness is low or the cycle phase calls for it.
+
+    Args:
+        profile: The user profile (uses schedule_slots)
+        readiness: readiness_engine.get_readiness() result or None
+        cycle_phase: cycle_engine.get_cycle_phase() result or None
+
+    Returns {day_name: {"warmup", "cooldown", "yoga"}, "rest_days": {...}}.
+    """
+    index = load_recovery_index()
+    not_ready = readiness is not None and not readiness.get("ready", True)
+    phase = cycle_phase["phase"] if cycle_phase else None
+
+    content = {}
+    for slot in profile.get('schedule_slots', []):
+        regions = _match_regions(slot.get('focus', '')) or {"lower", "upper"}
+        # Lower body wins when a day mixes both (glute-focused full body days)
+        region = "lower" if "lower" in regions else "upper"
+
+        yoga = None
+        if not_ready or phase in ("Menstrual", "Luteal"):
+            yoga = _pick(index["yoga"][region], intensity="low", phase=phase)
+
+        content[slot['day_name']] = {
+            "warmup": _summary(_pick(index["warmup"][region], max_minutes=WARMUP_BUDGET_MIN)),
+            # Low readiness gets the longest cool-down available
+            "cooldown": _summary(index["cooldown"][region][-1] if not_ready and index["cooldown"][region]
+                                 else _pick(index["cooldown"][region])),
+            "yoga": _summary(yoga)
+        }
+
+    rest_key = "full_rest" if not_ready or phase == "Menstrual" else "active_recovery"
+    content["rest_days"] = index["rest_day"].get(rest_key)
+    return content
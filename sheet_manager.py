@@ -1,31 +1,61 @@
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import json
 import os
+from functools import lru_cache
+
+import api_limiter
+import backends
+import instrumentation
+import plan_diff
 
 # Path to the credentials file provided by the user
 CREDENTIALS_FILE = 'gen-lang-client-0542545748-1653ac1bd093.json'
 SCOPE = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
 
+# WorkoutLog columns (matches improved_apps_script.js)
+LOG_HEADER = ["Week", "Day", "Exercise", "Sets", "Reps", "Rest", "Target Weight", "ACTUAL Weight", "ACTUAL Reps", "RPE", "Coach Cues", "My Notes", "Done"]
+LOG_SHEET_TITLE = "WorkoutLog"
+SEPARATOR_COLOR = {"red": 0.9, "green": 0.9, "blue": 0.9}
+
+def is_configured():
+    """False when there is no service account file, so the sheet stage is skipped rather than failed."""
+    return backends.is_fake('sheets') or os.path.exists(CREDENTIALS_FILE)
+
+def get_client():
+    """Returns the shared gspread client (re-created if the backend configuration changes)."""
+    return _cached_client(backends.generation())
+
+@lru_cache(maxsize=1)
+@instrumentation.timed("sheets.authorize")
+def _cached_client(backend_generation):
+    return backends.create('sheets', _authorize)
+
+def _authorize():
+    # Imported on first use so importing this module stays cheap
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    creds = ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_FILE, SCOPE)
+    return gspread.authorize(creds)
+
+@instrumentation.timed("sheets.get_last_week_logs")
 def get_last_week_logs(sheet_name="My Workout Plan"):
     """
     Connects to Google Sheets using the service account and fetches logs.
     """
+    import gspread
     print(f"Connecting to Google Sheets: {sheet_name}...")
     
     try:
-        creds = ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_FILE, SCOPE)
-        client = gspread.authorize(creds)
+        client = get_client()
         
         # Open the spreadsheet
-        sheet = client.open(sheet_name)
+        sheet = api_limiter.call_with_retry('sheets', client.open, sheet_name)
         
-        # Assuming the first worksheet contains the logs, or we look for a specific tab
-        # For now, let's grab the first worksheet
-        worksheet = sheet.sheet1
+        # The logged weeks (and the athlete's ACTUAL columns) are in the WorkoutLog tab,
+        # which isn't the first one once the Apps Script adds "Start Here"
+        worksheet = api_limiter.call_with_retry('sheets', sheet.worksheet, LOG_SHEET_TITLE)
         
         # Get all values
-        all_values = worksheet.get_all_records()
+        all_values = api_limiter.call_with_retry('sheets', worksheet.get_all_records)
         
         # If empty, return a message
         if not all_values:
@@ -39,128 +69,308 @@ def get_last_week_logs(sheet_name="My Workout Plan"):
 
     except gspread.exceptions.SpreadsheetNotFound:
         return f"Error: Spreadsheet '{sheet_name}' not found. Please share it with the service account email."
+    except gspread.exceptions.WorksheetNotFound:
+        return "No logs found in the sheet."
     except FileNotFoundError:
         return f"Error: Credentials file '{CREDENTIALS_FILE}' not found."
     except Exception as e:
         return f"Error reading sheet: {str(e)}"
 
+@instrumentation.timed("sheets.get_historical_data")
 def get_historical_data(sheet_name="My Workout Plan"):
     """
     Fetches all historical data to plot progress.
-    Returns a list of dictionaries.
+    Returns a list of dictionaries (the WorkoutLog rows).
     """
+    import gspread
     try:
-        creds = ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_FILE, SCOPE)
-        client = gspread.authorize(creds)
-        sheet = client.open(sheet_name)
-        worksheet = sheet.sheet1
-        return worksheet.get_all_records()
+        client = get_client()
+        sheet = api_limiter.call_with_retry('sheets', client.open, sheet_name)
+        worksheet = api_limiter.call_with_retry('sheets', sheet.worksheet, LOG_SHEET_TITLE)
+        return api_limiter.call_with_retry('sheets', worksheet.get_all_records)
+    except gspread.exceptions.WorksheetNotFound:
+        return []
     except Exception as e:
         print(f"Error fetching historical data: {e}")
         return []
 
+def build_week_rows(weekly_plan_data, week_number, phase, profile):
+    """
+    Builds the WorkoutLog rows for one week: a week header row, one row per
+    exercise in schedule order and a blank row after each day.
+    """
+    rows_to_add = []
+    
+    # Add a separator/header row for the week
+    phase_name = phase['name'] if phase else "AI Coached"
+    rows_to_add.append([f"WEEK {week_number} - {phase_name}", "", "", "", "", "", "", "", "", "", "", "", ""])
+
+    # Sort days to match schedule order
+    day_order = [d['day_name'] for d in profile['schedule_slots']]
+    
+    for day_name in day_order:
+        if day_name not in weekly_plan_data:
+            continue
+        
+        exercises = weekly_plan_data[day_name]
+        if not isinstance(exercises, list):
+            continue
+        
+        for ex in exercises:
+            exercise_name = ex.get('exercise', 'Unknown')
+            
+            # Use AI-provided values if available, fallback to phase or defaults
+            if phase:
+                sets = phase.get('sets', 3)
+                reps = phase.get('reps', '10')
+                rest = phase.get('rest', '60s')
+                # Calculate weight from phase intensity
+                max_weight = profile['maxes'].get(exercise_name)
+                if max_weight:
+                    cycle_count = (week_number - 1) // 4
+                    adjusted_max = max_weight * (1 + (cycle_count * 0.025))
+                    intensity = phase.get('intensity', 0.7)
+                    weight = round((adjusted_max * intensity) / 5) * 5
+                    weight_str = f"{weight} lbs"
+                else:
+                    weight_str = "RPE 7-8"
+            else:
+                # AI-driven: use per-exercise values
+                sets = ex.get('sets', 3)
+                reps = ex.get('reps', '10')
+                rest = ex.get('rest', '60s')
+                weight_str = ex.get('target_weight', 'RPE 7-8')
+
+            row = [
+                week_number,
+                day_name,
+                exercise_name,
+                sets,
+                reps,
+                rest,
+                weight_str,
+                "",  # ACTUAL Weight
+                "",  # ACTUAL Reps
+                "",  # RPE
+                ex.get('cues', ''),
+                "",  # My Notes
+                False  # Done (Checkbox unchecked)
+            ]
+            rows_to_add.append(row)
+        
+        # Add an empty row between days
+        rows_to_add.append(["", "", "", "", "", "", "", "", "", "", "", "", ""])
+    return rows_to_add
+
+def _cell(value, bold=False, background=None):
+    """One Sheets API CellData for a row value ('' stays an empty cell)."""
+    cell = {}
+    if isinstance(value, bool):
+        cell["userEnteredValue"] = {"boolValue": value}
+        # Done column: a checkbox
+        cell["dataValidation"] = {"condition": {"type": "BOOLEAN"}}
+    elif isinstance(value, (int, float)):
+        cell["userEnteredValue"] = {"numberValue": value}
+    elif value != "":
+        cell["userEnteredValue"] = {"stringValue": str(value)}
+    if bold or background:
+        cell["userEnteredFormat"] = {}
+        if bold:
+            cell["userEnteredFormat"]["textFormat"] = {"bold": True}
+        if background:
+            cell["userEnteredFormat"]["backgroundColor"] = background
+    return cell
+
+def _row_data(row, **fmt):
+    return {"values": [_cell(value, **fmt) for value in row]}
+
+def build_log_requests(rows, sheet_id, start_index, create=False):
+    """
+    Builds the batchUpdate requests that log one week: the tab (when create is set,
+    sized to the header), the header row (always rewritten, so a cleared sheet gets it
+    back) and every row of the week written at start_index, the end of the tab's grid,
+    in rows appended for it, with formatting and the Done checkboxes set in the same
+    requests. Writing at a known row lets the week be updated in place later without
+    reading the sheet back.
+    """
+    requests = []
+    if create:
+        requests.append({"addSheet": {"properties": {
+            "sheetId": sheet_id, "title": LOG_SHEET_TITLE,
+            "gridProperties": {"rowCount": 1, "columnCount": len(LOG_HEADER), "frozenRowCount": 1}
+        }}})
+    requests.append({"appendDimension": {"sheetId": sheet_id, "dimension": "ROWS", "length": len(rows)}})
+    requests.append({"updateCells": {
+        "start": {"sheetId": sheet_id, "rowIndex": 0, "columnIndex": 0},
+        "rows": [_row_data(LOG_HEADER, bold=True)],
+        "fields": "userEnteredValue,userEnteredFormat"
+    }})
+    # The first row is the week separator
+    week_rows = [_row_data(rows[0], bold=True, background=SEPARATOR_COLOR)] + [_row_data(row) for row in rows[1:]]
+    requests.append({"updateCells": {
+        "start": {"sheetId": sheet_id, "rowIndex": start_index, "columnIndex": 0},
+        "rows": week_rows,
+        "fields": "userEnteredValue,userEnteredFormat,dataValidation"
+    }})
+    return requests
+
+def _find_sheet(sheet, title):
+    """
+    Returns (sheet_id, row_count) for a tab, reading only the tabs' ids, titles and grid
+    sizes. row_count is None when the tab doesn't exist (sheet_id is then a free id).
+    """
+    metadata = api_limiter.call_with_retry(
+        'sheets', sheet.fetch_sheet_metadata,
+        params={"fields": "sheets.properties(sheetId,title,gridProperties.rowCount)"}
+    )
+    properties = [s["properties"] for s in metadata.get("sheets", [])]
+    for props in properties:
+        if props.get("title") == title:
+            return props["sheetId"], props.get("gridProperties", {}).get("rowCount", 0)
+    return max((props.get("sheetId", 0) for props in properties), default=0) + 1, None
+
+@instrumentation.timed("sheets.log_week")
 def log_week_to_sheet(sheet_name, weekly_plan_data, week_number, phase, profile):
     """
     Appends the generated weekly plan to the 'WorkoutLog' tab in Google Sheets.
     Now supports AI-driven per-exercise sets/reps (phase can be None).
+    The whole week (tab creation, header, rows, checkboxes, formatting) is one
+    batch_update, so the API calls don't grow with the length of the sheet.
+    Returns where the week was written ({"sheet_id", "start_row"}, for update_week_rows),
+    or None if it couldn't be logged.
     """
     print(f"Logging Week {week_number} to Google Sheet...")
     try:
-        creds = ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_FILE, SCOPE)
-        client = gspread.authorize(creds)
-        sheet = client.open(sheet_name)
-        
-        # Get or create WorkoutLog tab
-        try:
-            worksheet = sheet.worksheet("WorkoutLog")
-        except gspread.exceptions.WorksheetNotFound:
-            worksheet = sheet.add_worksheet(title="WorkoutLog", rows=100, cols=20)
-            # Add header if new (Matches improved_apps_script.js)
-            worksheet.append_row(["Week", "Day", "Exercise", "Sets", "Reps", "Rest", "Target Weight", "ACTUAL Weight", "ACTUAL Reps", "RPE", "Coach Cues", "My Notes", "Done"])
-
-        # Find the first empty row based on Column A (Week)
-        col_a_values = worksheet.col_values(1)
-        next_row = len(col_a_values) + 1
-        
-        # If header is missing (e.g. cleared sheet), add it
-        if next_row == 1:
-             worksheet.append_row(["Week", "Day", "Exercise", "Sets", "Reps", "Rest", "Target Weight", "ACTUAL Weight", "ACTUAL Reps", "RPE", "Coach Cues", "My Notes", "Done"])
-             next_row = 2
+        client = get_client()
+        sheet = api_limiter.call_with_retry('sheets', client.open, sheet_name)
 
-        rows_to_add = []
-        
-        # Add a separator/header row for the week
-        phase_name = phase['name'] if phase else "AI Coached"
-        rows_to_add.append([f"WEEK {week_number} - {phase_name}", "", "", "", "", "", "", "", "", "", "", "", ""])
+        sheet_id, row_count = _find_sheet(sheet, LOG_SHEET_TITLE)
+        # A new tab has only the header row, so the week starts right below it
+        start_row = row_count if row_count is not None else 1
+        rows_to_add = build_week_rows(weekly_plan_data, week_number, phase, profile)
+        requests = build_log_requests(rows_to_add, sheet_id, start_row, create=row_count is None)
+        api_limiter.call_write_with_retry('sheets', sheet.batch_update, {"requests": requests})
 
-        # Sort days to match schedule order
-        day_order = [d['day_name'] for d in profile['schedule_slots']]
-        
-        for day_name in day_order:
-            if day_name not in weekly_plan_data:
-                continue
-            
-            exercises = weekly_plan_data[day_name]
-            if not isinstance(exercises, list):
-                continue
-            
-            for ex in exercises:
-                exercise_name = ex.get('exercise', 'Unknown')
-                
-                # Use AI-provided values if available, fallback to phase or defaults
-                if phase:
-                    sets = phase.get('sets', 3)
-                    reps = phase.get('reps', '10')
-                    rest = phase.get('rest', '60s')
-                    # Calculate weight from phase intensity
-                    max_weight = profile['maxes'].get(exercise_name)
-                    if max_weight:
-                        cycle_count = (week_number - 1) // 4
-                        adjusted_max = max_weight * (1 + (cycle_count * 0.025))
-                        intensity = phase.get('intensity', 0.7)
-                        weight = round((adjusted_max * intensity) / 5) * 5
-                        weight_str = f"{weight} lbs"
-                    else:
-                        weight_str = "RPE 7-8"
-                else:
-                    # AI-driven: use per-exercise values
-                    sets = ex.get('sets', 3)
-                    reps = ex.get('reps', '10')
-                    rest = ex.get('rest', '60s')
-                    weight_str = ex.get('target_weight', 'RPE 7-8')
-
-                row = [
-                    week_number,
-                    day_name,
-                    exercise_name,
-                    sets,
-                    reps,
-                    rest,
-                    weight_str,
-                    "",  # ACTUAL Weight
-                    "",  # ACTUAL Reps
-                    "",  # RPE
-                    ex.get('cues', ''),
-                    "",  # My Notes
-                    False  # Done (Checkbox unchecked)
-                ]
-                rows_to_add.append(row)
-            
-            # Add an empty row between days
-            rows_to_add.append(["", "", "", "", "", "", "", "", "", "", "", "", ""])
-
-        # Use update to write to the specific range
-        # Calculate end range
-        end_row = next_row + len(rows_to_add) - 1
-        range_name = f"A{next_row}:M{end_row}"
-        worksheet.update(range_name=range_name, values=rows_to_add)
-        
-        print(f"Successfully logged workout to sheet (Rows {next_row}-{end_row}).")
-        return True
+        print(f"Successfully logged workout to sheet ({len(rows_to_add)} rows).")
+        return {"sheet_id": sheet_id, "start_row": start_row}
 
     except Exception as e:
         print(f"Error logging to sheet: {e}")
-        return False
+        return None
+
+# Columns the plan writes; ACTUAL Weight/Reps, RPE, My Notes and Done belong to the athlete
+PLANNED_COLUMN_RANGES = [(0, 7), (10, 11)]  # A-G, K (Coach Cues)
+
+def _row_key(row):
+    """Aligns week rows by (week, day, exercise); separators and blank rows key on their text."""
+    return tuple(str(v) for v in row[:3])
+
+def _write_row_request(sheet_id, row_index, row, separator=False):
+    fmt = {"bold": True, "background": SEPARATOR_COLOR} if separator else {}
+    return {"updateCells": {
+        "start": {"sheetId": sheet_id, "rowIndex": row_index, "columnIndex": 0},
+        "rows": [_row_data(row, **fmt)],
+        "fields": "userEnteredValue,userEnteredFormat,dataValidation"
+    }}
+
+def build_update_requests(old_rows, new_rows, sheet_id, start_index):
+    """
+    Builds the batchUpdate requests that turn one logged week (old_rows, starting at
+    sheet row start_index) into new_rows. Rows with the same key only get their planned
+    columns rewritten, so logged results survive; inserted and removed exercises become
+    row inserts/deletes. Opcodes are applied bottom-up so earlier row indices stay valid.
+    """
+    requests = []
+    for tag, i1, i2, j1, j2 in reversed(plan_diff.align([_row_key(r) for r in old_rows], [_row_key(r) for r in new_rows])):
+        if tag == 'equal':
+            for offset in reversed(range(i2 - i1)):
+                old, new = old_rows[i1 + offset], new_rows[j1 + offset]
+                for first, last in PLANNED_COLUMN_RANGES:
+                    if old[first:last] != new[first:last]:
+                        requests.append({"updateCells": {
+                            "start": {"sheetId": sheet_id, "rowIndex": start_index + i1 + offset, "columnIndex": first},
+                            "rows": [_row_data(new[first:last])],
+                            "fields": "userEnteredValue"
+                        }})
+            continue
+        if i2 > i1:
+            requests.append({"deleteDimension": {"range": {
+                "sheetId": sheet_id, "dimension": "ROWS",
+                "startIndex": start_index + i1, "endIndex": start_index + i2
+            }}})
+        if j2 > j1:
+            requests.append({"insertDimension": {"range": {
+                "sheetId": sheet_id, "dimension": "ROWS",
+                "startIndex": start_index + i1, "endIndex": start_index + i1 + (j2 - j1)
+            }, "inheritFromBefore": False}})
+            requests.extend(
+                _write_row_request(sheet_id, start_index + i1 + offset, new_rows[j], separator=j == 0)
+                for offset, j in enumerate(range(j1, j2))
+            )
+    return requests
+
+def _find_week_block(first_column, old_rows, week_number):
+    """Index of the week's separator row, or None if the logged block doesn't match old_rows."""
+    prefix = f"WEEK {week_number} - "
+    starts = [i for i, v in enumerate(first_column) if str(v).startswith(prefix)]
+    if not starts:
+        return None
+    start = starts[-1]
+    column = [str(v) for v in first_column[start:start + len(old_rows)]]
+    column += [""] * (len(old_rows) - len(column))
+    if column != [str(r[0]) for r in old_rows]:
+        return None
+    return start
+
+def _logged_block_start(sheet, location, old_rows):
+    """
+    The stored start row of the week, if its first column still matches old_rows.
+    Reads only the week's own rows, so the check doesn't grow with the sheet.
+    """
+    start = location.get("start_row")
+    if start is None or location.get("sheet_id") is None:
+        return None
+    block = api_limiter.call_with_retry(
+        'sheets', sheet.values_get, f"'{LOG_SHEET_TITLE}'!A{start + 1}:A{start + len(old_rows)}"
+    )
+    column = [str(row[0]) if row else "" for row in block.get("values", [])]
+    column += [""] * (len(old_rows) - len(column))
+    return start if column == [str(r[0]) for r in old_rows] else None
+
+@instrumentation.timed("sheets.update_week")
+def update_week_rows(sheet_name, old_plan, new_plan, week_number, phase, profile, location=None):
+    """
+    Rewrites only the rows of an already logged week that differ between old_plan and
+    new_plan (one batch_update, sized by the change). location is what log_week_to_sheet
+    returned; without it, or when rows above the week moved it, the week is searched for
+    in the first column. Returns the number of requests sent, or None when the week's
+    block can't be found and a full log is needed.
+    """
+    try:
+        client = get_client()
+        sheet = api_limiter.call_with_retry('sheets', client.open, sheet_name)
+
+        old_rows = build_week_rows(old_plan, week_number, phase, profile)
+        new_rows = build_week_rows(new_plan, week_number, phase, profile)
+        sheet_id = (location or {}).get("sheet_id")
+        start = _logged_block_start(sheet, location, old_rows) if location else None
+        if start is None:
+            worksheet = api_limiter.call_with_retry('sheets', sheet.worksheet, LOG_SHEET_TITLE)
+            first_column = api_limiter.call_with_retry('sheets', worksheet.col_values, 1)
+            sheet_id, start = worksheet.id, _find_week_block(first_column, old_rows, week_number)
+        if start is None:
+            print(f"Week {week_number} not found as logged in the sheet.")
+            return None
+
+        requests = build_update_requests(old_rows, new_rows, sheet_id, start)
+        if requests:
+            api_limiter.call_write_with_retry('sheets', sheet.batch_update, {"requests": requests})
+        print(f"Updated week {week_number} in the sheet ({len(requests)} changes).")
+        return len(requests)
+
+    except Exception as e:
+        print(f"Error updating sheet: {e}")
+        return None
 
 if __name__ == "__main__":
     # Test run
@@ -0,0 +1,253 @@
+"""
+Static Site Exporter
+Pre-renders the weekly plan as static HTML: one page per week, one per
+training day and an index of all weeks, so the dashboard can serve finished
+pages with no runtime work. Assets (stylesheet, progress chart) are written
+under content-hashed names (progress.3f2a9c1b07.png) and never change once
+written, so they can be cached forever; only the small HTML pages change.
+"""
+
+import os
+import re
+import json
+import hashlib
+from html import escape
+
+import cycle_engine
+import instrumentation
+import plan_analyzer
+
+SITE_DIR = os.path.join(os.path.dirname(__file__), 'dashboard', 'public', 'plans')
+ASSET_DIR = 'assets'
+MANIFEST_FILE = 'manifest.json'
+HASH_LENGTH = 10
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+SITE_CSS = """
+body { font-family: 'Segoe UI', sans-serif; color: #333; background: #f9f9f9; margin: 0; padding: 20px; }
+main { max-width: 760px; margin: 0 auto; background: #fff; border-radius: 12px; box-shadow: 0 2px 8px rgba(0,0,0,0.1); padding: 24px; }
+h1, h2 { color: #d81b60; }
+nav a, a { color: #0066cc; text-decoration: none; }
+.notes { background: #f0f7ff; padding: 15px; border-radius: 8px; margin: 15px 0; }
+.cycle { border-left: 4px solid #d81b60; background: #fdf0f5; padding: 12px 15px; border-radius: 8px; }
+.chart { width: 100%; max-width: 680px; }
+.days { list-style: none; padding: 0; }
+.days li { padding: 10px 0; border-bottom: 1px solid #eee; }
+table { border-collapse: collapse; width: 100%; }
+th { background: #d81b60; color: #fff; }
+th, td { padding: 8px; text-align: left; }
+tr:nth-child(even) td { background: #f5f5f5; }
+.muted { color: #666; font-size: 13px; }
+""".strip()
+
+
+def content_hash(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def write_asset(site_dir, name, data):
+    """
+    Writes data as assets/<stem>.<hash><ext> (skipped if that file exists) and
+    returns its path relative to site_dir.
+    """
+    stem, ext = os.path.splitext(name)
+    relative = f"{ASSET_DIR}/{stem}.{content_hash(data)}{ext}"
+    path = os.path.join(site_dir, relative)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb' if isinstance(data, bytes) else 'w') as f:
+            f.write(data)
+    return relative
+
+
+def day_slug(day_name):
+    return re.sub(r'[^a-z0-9]+', '-', day_name.lower()).strip('-')
+
+
+def _page(title, body, css_href):
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8" />
+<meta name="viewport" content="width=device-width, initial-scale=1.0" />
+<title>{escape(title)}</title>
+<link rel="stylesheet" href="{css_href}" />
+</head>
+<body>
+<main>
+{body}
+</main>
+</body>
+</html>
+"""
+
+
+def _day_order(profile, weekly_plan_data):
+    scheduled = [slot['day_name'] for slot in profile.get('schedule_slots', [])]
+    days = [d for d in scheduled + DAYS if isinstance(weekly_plan_data.get(d), list)]
+    return list(dict.fromkeys(days))
+
+
+def _day_focus(profile, day_name):
+    return next((s.get('focus', 'Workout') for s in profile.get('schedule_slots', []) if s['day_name'] == day_name), "Workout")
+
+
+def _notes_text(notes):
+    return notes if isinstance(notes, str) else " ".join(map(str, notes or []))
+
+
+def render_day_page(profile, weekly_plan_data, week, day_name, css_href):
+    """One training day: warm-up, exercise table, cool-down and recovery flow."""
+    exercises = weekly_plan_data[day_name]
+    day_recovery = weekly_plan_data.get('recovery_content', {}).get(day_name, {})
+    body = [
+        f'<nav><a href="./">&larr; Week {week}</a></nav>',
+        f"<h1>{escape(day_name)} - {escape(_day_focus(profile, day_name))}</h1>"
+    ]
+    warmup = day_recovery.get('warmup')
+    if warmup:
+        moves = ", ".join(f"{escape(m['name'])} ({escape(str(m.get('reps', '')))})" for m in warmup['exercises'])
+        body.append(f'<p class="muted"><strong>Warm-Up ({warmup["duration_min"]} min):</strong> {moves}</p>')
+
+    rows = "".join(
+        f"<tr><td><a href=\"{escape(ex.get('url', '#'))}\">{escape(str(ex.get('exercise', 'Unknown')))}</a></td>"
+        f"<td>{escape(str(ex.get('sets', 3)))}</td><td>{escape(str(ex.get('reps', '10')))}</td>"
+        f"<td><strong>{escape(str(ex.get('target_weight', 'RPE 7-8')))}</strong></td>"
+        f"<td>{escape(str(ex.get('rest', '60s')))}</td><td class=\"muted\">{escape(str(ex.get('cues', '')))}</td></tr>"
+        for ex in exercises
+    )
+    body.append("<table><tr><th>Exercise</th><th>Sets</th><th>Reps</th><th>Weight</th><th>Rest</th><th>Cues</th></tr>"
+                f"{rows}</table>")
+
+    cooldown = day_recovery.get('cooldown')
+    if cooldown:
+        stretches = ", ".join(f"<a href=\"{escape(s.get('url', '#'))}\">{escape(s['name'])}</a> ({escape(str(s.get('duration', '')))})"
+                              for s in cooldown['exercises'])
+        body.append(f'<p class="muted"><strong>Cool-Down ({cooldown["duration_min"]} min):</strong> {stretches}</p>')
+    yoga = day_recovery.get('yoga')
+    if yoga:
+        body.append(f'<p class="muted"><strong>Recovery Flow:</strong> <a href="{escape(yoga["url"])}">{escape(yoga["name"])}</a> '
+                    f'({yoga["duration_min"]} min)</p>')
+
+    return _page(f"Week {week} - {day_name}", "\n".join(body), css_href)
+
+
+def render_week_page(profile, weekly_plan_data, week, css_href, chart_href=None):
+    """Week overview: cycle phase, coach's notes, progress chart, days and weekly volume."""
+    body = [
+        '<nav><a href="../">&larr; All weeks</a></nav>',
+        f"<h1>{escape(profile.get('user_name', 'Your'))} Training Protocol: Week {week}</h1>"
+    ]
+    cycle_phase = cycle_engine.get_cycle_phase(profile)
+    if cycle_phase:
+        body.append(f'<div class="cycle"><strong>Cycle Phase:</strong> {escape(cycle_phase["phase"])} (Day {cycle_phase["day"]})<br>'
+                    f'<em>{escape(cycle_phase["training_tip"])}</em></div>')
+    notes = _notes_text(weekly_plan_data.get('coaching_notes'))
+    if notes:
+        body.append(f'<div class="notes"><strong>Coach\'s Notes:</strong><br>{escape(notes)}</div>')
+    if chart_href:
+        body.append(f'<img class="chart" src="{chart_href}" alt="Progress Chart" />')
+
+    items = "".join(
+        f"<li><a href=\"{day_slug(day)}.html\"><strong>{escape(day)}</strong> - {escape(_day_focus(profile, day))}</a>"
+        f"<br><span class=\"muted\">{escape(', '.join(str(ex.get('exercise', '')) for ex in weekly_plan_data[day]))}</span></li>"
+        for day in _day_order(profile, weekly_plan_data)
+    )
+    body.append(f'<ul class="days">{items}</ul>')
+
+    weekly_sets = plan_analyzer.analyze_plan(weekly_plan_data, profile)["weekly_sets"]
+    if weekly_sets:
+        volume = ", ".join(f"{muscle} {sets:g}" for muscle, sets in weekly_sets.items())
+        body.append(f'<p class="muted"><strong>Weekly sets per muscle:</strong> {escape(volume)}</p>')
+
+    return _page(f"Week {week}", "\n".join(body), css_href)
+
+
+def render_index_page(profile, manifest, css_href):
+    weeks = sorted(manifest.get("weeks", {}), key=int, reverse=True)
+    items = "".join(f'<li><a href="week-{w}/">Week {w}</a></li>' for w in weeks)
+    body = f"<h1>{escape(profile.get('user_name', 'Your'))} Training Weeks</h1>\n<ul class=\"days\">{items}</ul>"
+    return _page("Training Weeks", body, css_href)
+
+
+def load_manifest(site_dir):
+    path = os.path.join(site_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"weeks": {}}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (ValueError, OSError) as e:
+        print(f"Rebuilding unreadable site manifest {path}: {e}")
+        return {"weeks": {}}
+
+
+def _write_page(site_dir, relative, html):
+    path = os.path.join(site_dir, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(html)
+
+
+@instrumentation.timed("site.export")
+def export_week(profile, weekly_plan_data, week, chart_png=None, site_dir=SITE_DIR):
+    """
+    Writes week-<week>/index.html, one page per training day, the hashed assets,
+    the weeks index and manifest.json. Earlier weeks' pages are kept.
+    Returns the manifest entry for the week.
+    """
+    css = write_asset(site_dir, "site.css", SITE_CSS)
+    chart = write_asset(site_dir, "progress.png", chart_png) if chart_png else None
+
+    week_dir = f"week-{week}"
+    pages = [f"{week_dir}/index.html"]
+    _write_page(site_dir, pages[0], render_week_page(profile, weekly_plan_data, week, f"../{css}", chart and f"../{chart}"))
+    for day_name in _day_order(profile, weekly_plan_data):
+        pages.append(f"{week_dir}/{day_slug(day_name)}.html")
+        _write_page(site_dir, pages[-1], render_day_page(profile, weekly_plan_data, week, day_name, f"../{css}"))
+
+    manifest = load_manifest(site_dir)
+    entry = {"pages": pages, "assets": [a for a in (css, chart) if a]}
+    manifest["weeks"][str(week)] = entry
+    _write_page(site_dir, "index.html", render_index_page(profile, manifest, css))
+    with open(os.path.join(site_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Static pages for week {week} written to {site_dir}")
+    return entry
+
+
+@instrumentation.timed("site.update")
+def update_week_pages(profile, weekly_plan_data, week, days, site_dir=SITE_DIR):
+    """
+    Rewrites a published week's index page and only the pages of `days` (pages of days
+    no longer in the plan are removed), keeping its hashed assets. Falls back to
+    export_week when the week was never exported. Returns the manifest entry.
+    """
+    manifest = load_manifest(site_dir)
+    entry = manifest["weeks"].get(str(week))
+    if not entry:
+        return export_week(profile, weekly_plan_data, week, None, site_dir)
+
+    css = next((a for a in entry["assets"] if a.endswith(".css")), None) or write_asset(site_dir, "site.css", SITE_CSS)
+    chart = next((a for a in entry["assets"] if a.endswith(".png")), None)
+    week_dir = f"week-{week}"
+    _write_page(site_dir, f"{week_dir}/index.html",
+                render_week_page(profile, weekly_plan_data, week, f"../{css}", chart and f"../{chart}"))
+
+    plan_days = _day_order(profile, weekly_plan_data)
+    for day_name in days:
+        relative = f"{week_dir}/{day_slug(day_name)}.html"
+        if day_name in plan_days:
+            _write_page(site_dir, relative, render_day_page(profile, weekly_plan_data, week, day_name, f"../{css}"))
+        elif os.path.exists(os.path.join(site_dir, relative)):
+            os.remove(os.path.join(site_dir, relative))
+
+    entry["pages"] = [f"{week_dir}/index.html"] + [f"{week_dir}/{day_slug(d)}.html" for d in plan_days]
+    with open(os.path.join(site_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return entry
+
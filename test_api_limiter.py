@@ -0,0 +1,89 @@
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+import api_limiter
+
+
+class FakeResponse(dict):
+    """httplib2-style response: a dict of headers with a status attribute."""
+    def __init__(self, status, headers=None):
+        super().__init__(headers or {})
+        self.status = status
+
+
+class HttpError(Exception):
+    """Shaped like googleapiclient.errors.HttpError."""
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.resp = FakeResponse(status, headers)
+
+
+class TestApiLimiter(unittest.TestCase):
+    def setUp(self):
+        # Generous bucket so patched sleeps only come from retries
+        api_limiter._buckets['test-api'] = api_limiter.TokenBucket(rate=1000, burst=100)
+
+    def test_token_bucket_limits_rate(self):
+        bucket = api_limiter.TokenBucket(rate=20, burst=2)
+        start = time.monotonic()
+        for _ in range(4):
+            bucket.acquire()
+        # 2 burst tokens free, 2 more at 20/s
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    @patch('api_limiter.time.sleep')
+    def test_retries_429_honoring_retry_after(self, mock_sleep):
+        func = MagicMock(side_effect=[HttpError(429, {'retry-after': '7'}), "ok"])
+        self.assertEqual(api_limiter.call_with_retry('test-api', func, 1, key="v"), "ok")
+        func.assert_called_with(1, key="v")
+        mock_sleep.assert_called_once_with(7.0)
+
+    @patch('api_limiter.time.sleep')
+    def test_non_retryable_error_is_raised(self, mock_sleep):
+        func = MagicMock(side_effect=HttpError(403))
+        with self.assertRaises(HttpError):
+            api_limiter.call_with_retry('test-api', func)
+        self.assertEqual(func.call_count, 1)
+
+    @patch('api_limiter.time.sleep')
+    def test_gives_up_after_max_retries(self, mock_sleep):
+        func = MagicMock(side_effect=ConnectionError("reset"))
+        with self.assertRaises(ConnectionError):
+            api_limiter.call_with_retry('test-api', func)
+        self.assertEqual(func.call_count, api_limiter.MAX_RETRIES + 1)
+        for call in mock_sleep.call_args_list:
+            self.assertLessEqual(call[0][0], api_limiter.MAX_DELAY_S)
+
+    @patch('api_limiter.time.sleep')
+    def test_requests_connection_error_is_retryable(self, mock_sleep):
+        func = MagicMock(side_effect=[requests.exceptions.ConnectionError("reset"), requests.exceptions.ReadTimeout(), "ok"])
+        self.assertEqual(api_limiter.call_with_retry('test-api', func), "ok")
+        self.assertEqual(func.call_count, 3)
+
+    @patch('api_limiter.time.sleep')
+    def test_write_is_not_resent_after_it_may_have_applied(self, mock_sleep):
+        for error in (HttpError(503), TimeoutError("read timed out"), requests.exceptions.ReadTimeout()):
+            func = MagicMock(side_effect=error)
+            with self.assertRaises(type(error)):
+                api_limiter.call_write_with_retry('test-api', func)
+            self.assertEqual(func.call_count, 1)
+
+    @patch('api_limiter.time.sleep')
+    def test_write_is_resent_when_rate_limited_or_refused(self, mock_sleep):
+        try:
+            try:
+                raise ConnectionRefusedError(111, "Connection refused")
+            except ConnectionRefusedError as e:
+                raise requests.exceptions.ConnectionError("Max retries exceeded") from e
+        except requests.exceptions.ConnectionError as e:
+            refused = e
+        func = MagicMock(side_effect=[HttpError(429), refused, "ok"])
+        self.assertEqual(api_limiter.call_write_with_retry('test-api', func), "ok")
+        self.assertEqual(func.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
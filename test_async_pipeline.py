@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.modules.setdefault('google.generativeai', MagicMock())
+
+import api_limiter
+import backends
+import garmin_manager
+import instrumentation
+import workout_generator
+import async_pipeline
+
+PROFILE_PATH = os.path.join(os.path.dirname(__file__), 'user_profile.json')
+LATENCY_S = 0.03
+
+
+class TestAsyncPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved_buckets = dict(api_limiter._buckets)
+        for api in api_limiter.RATE_LIMITS:
+            api_limiter.set_rate_limit(api, rate=1e9, burst=1e9)
+        self.cache_patch = patch.object(garmin_manager, 'RECOVERY_CACHE_FILE', os.path.join(self.tmp.name, 'cache.json'))
+        self.cache_patch.start()
+        self.env_patch = patch.dict(os.environ, {}, clear=True)
+        self.env_patch.start()
+
+    def tearDown(self):
+        self.env_patch.stop()
+        self.cache_patch.stop()
+        backends.configure("live")
+        api_limiter._buckets.clear()
+        api_limiter._buckets.update(self.saved_buckets)
+        self.tmp.cleanup()
+
+    def athlete(self, name):
+        out = os.path.join(self.tmp.name, name)
+        os.makedirs(out)
+        path = os.path.join(out, 'athlete.json')
+        shutil.copy(PROFILE_PATH, path)
+        return path, out
+
+    def test_matches_sync_pipeline_and_overlaps_io(self):
+        backends.configure("fake", latency_s=LATENCY_S, seed=1)
+        path, out = self.athlete("sync")
+        started = time.perf_counter()
+        sync_result = workout_generator.run_weekly_pipeline(workout_generator.load_profile(path), path, output_dir=out)
+        sync_s = time.perf_counter() - started
+
+        backends.configure("fake", latency_s=LATENCY_S, seed=1)
+        path, out = self.athlete("async")
+        started = time.perf_counter()
+        async_result = asyncio.run(async_pipeline.run_weekly_pipeline_async(
+            workout_generator.load_profile(path), path, output_dir=out
+        ))
+        async_s = time.perf_counter() - started
+
+        self.assertEqual(async_result["degraded"], [])
+        self.assertEqual(async_result["stages"]["calendar"], sync_result["stages"]["calendar"])
+        self.assertEqual(workout_generator.load_profile(path)['current_week'], async_result["week"] + 1)
+        self.assertLess(async_s, sync_s * 0.7)
+
+    def test_concurrent_stage_spans_nest_correctly(self):
+        backends.configure("fake", seed=1)
+        path, out = self.athlete("spans")
+        instrumentation.reset()
+        asyncio.run(async_pipeline.run_weekly_pipeline_async(workout_generator.load_profile(path), path, output_dir=out))
+
+        paths = {s["path"] for s in instrumentation.get_report()["spans"]}
+        self.assertIn("stage.plan/gemini.generate", paths)
+        self.assertIn("stage.calendar/calendar.create_event", paths)
+        self.assertIn("stage.sheet/sheets.log_week", paths)
+
+    @patch('workout_generator.plan_analyzer.day_violations', return_value={})
+    def test_async_selection_shares_the_day_retries(self, _rules):
+        profile = {
+            "current_week": 1, "primary_goal": "Hypertrophy", "exercise_database": {},
+            "schedule_slots": [{"day_name": "Monday", "focus": "Legs"}, {"day_name": "Tuesday", "focus": "Upper"}]
+        }
+        responses = ['{"coaching_notes": "Go", "Monday": [{"exercise": "Squat"}], "Tuesday": []}',
+                     '{"Tuesday": [{"exercise": "Row", "sets": "3"}], "Monday": [{"exercise": "Lunge"}]}']
+        prompts = []
+
+        async def generate(prompt, generation_config=None):
+            prompts.append(prompt)
+            return MagicMock(text=responses[len(prompts) - 1])
+
+        model = MagicMock(generate_content_async=generate)
+        with patch.object(workout_generator, 'get_gemini_model', return_value=model):
+            plan = asyncio.run(async_pipeline.select_exercises_async(profile, []))
+
+        self.assertEqual(len(prompts), 2)
+        self.assertIn("ONLY a JSON object with these day keys (Tuesday)", prompts[1])
+        self.assertEqual(plan["Monday"][0]["exercise"], "Squat")
+        self.assertEqual(plan["Tuesday"][0]["sets"], 3)
+
+    def test_gemini_async_retry(self):
+        calls = []
+
+        async def flaky(prompt, generation_config=None):
+            calls.append(prompt)
+            if len(calls) == 1:
+                raise backends.FakeServiceError("gemini", code=429)
+            return MagicMock(text='{"Monday": [{"exercise": "Squat"}]}')
+
+        model = MagicMock(generate_content_async=flaky)
+        with patch('api_limiter.backoff_delay', return_value=0):
+            data = asyncio.run(async_pipeline._generate_json_async(model, "prompt"))
+        self.assertEqual(data["Monday"][0]["exercise"], "Squat")
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
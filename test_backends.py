@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.modules.setdefault('google.generativeai', MagicMock())
+
+import backends
+import api_limiter
+import garmin_manager
+import sheet_manager
+import calendar_manager
+import workout_generator
+
+PROFILE_PATH = os.path.join(os.path.dirname(__file__), 'user_profile.json')
+
+
+class TestBackends(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved_buckets = dict(api_limiter._buckets)
+        for api in api_limiter.RATE_LIMITS:
+            api_limiter.set_rate_limit(api, rate=1e9, burst=1e9)
+
+    def tearDown(self):
+        backends.configure("live")
+        api_limiter._buckets.clear()
+        api_limiter._buckets.update(self.saved_buckets)
+        self.tmp.cleanup()
+
+    def test_live_by_default(self):
+        live = MagicMock(return_value="live-client")
+        self.assertEqual(backends.create("sheets", live, 1, key="x"), "live-client")
+        live.assert_called_once_with(1, key="x")
+
+    def test_fake_selected_per_service(self):
+        backends.configure("fake", services=["calendar"])
+        self.assertIsInstance(backends.create("calendar", MagicMock()), backends.FakeCalendarService)
+        self.assertFalse(backends.is_fake("sheets"))
+
+    def test_error_rate_is_deterministic_and_retryable(self):
+        def failures(seed):
+            backends.configure("fake", error_rate=0.5, seed=seed)
+            client = backends.FakeGarminClient()
+            outcome = []
+            for _ in range(20):
+                try:
+                    client.get_stress_data("2025-11-06")
+                    outcome.append(False)
+                except backends.FakeServiceError as e:
+                    self.assertTrue(api_limiter.is_retryable(e))
+                    outcome.append(True)
+            return outcome
+
+        self.assertEqual(failures(7), failures(7))
+        self.assertTrue(any(failures(7)))
+
+    def test_clients_rebuilt_when_backend_changes(self):
+        backends.configure("fake")
+        self.assertIsInstance(sheet_manager.get_client(), backends.FakeSheetsClient)
+        self.assertIsInstance(calendar_manager.get_calendar_service(), backends.FakeCalendarService)
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_weekly_pipeline_runs_on_fakes(self):
+        backends.configure("fake", seed=1)
+        profile_path = os.path.join(self.tmp.name, 'athlete.json')
+        shutil.copy(PROFILE_PATH, profile_path)
+        profile = workout_generator.load_profile(profile_path)
+
+        with patch.object(garmin_manager, 'RECOVERY_CACHE_FILE', os.path.join(self.tmp.name, 'cache.json')):
+            result = workout_generator.run_weekly_pipeline(profile, profile_path, output_dir=self.tmp.name)
+
+        self.assertEqual(result["degraded"], [])
+        self.assertEqual(len(backends.fake_state("smtp")["sent"]), 1)
+        events = backends.fake_state("calendar")[profile.get('calendar_id', workout_generator.DEFAULT_RECIPIENT)]
+        self.assertEqual(len(events), result["stages"]["calendar"])
+        log = sheet_manager.get_client().open(profile['google_sheet_name']).worksheet("WorkoutLog")
+        self.assertEqual(log.rows[0], sheet_manager.LOG_HEADER)
+        with open(profile_path) as f:
+            self.assertEqual(json.load(f)['current_week'], result["week"] + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.modules.setdefault('google.generativeai', MagicMock())
+
+import batch_runner
+import garmin_manager
+
+
+class TestBatchRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.profiles = os.path.join(self.tmp.name, 'athletes')
+        os.makedirs(self.profiles)
+        for name in ("ana", "bea", "cam"):
+            with open(os.path.join(self.profiles, f"{name}.json"), 'w') as f:
+                json.dump({"current_week": 1}, f)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_manifest_from_directory_and_file(self):
+        athletes = batch_runner.load_manifest(self.profiles)
+        self.assertEqual([a["name"] for a in athletes], ["ana", "bea", "cam"])
+
+        manifest = os.path.join(self.tmp.name, 'manifest.json')
+        with open(manifest, 'w') as f:
+            json.dump([{"profile": "athletes/bea.json", "recipient": "bea@example.com"}], f)
+        athletes = batch_runner.load_manifest(manifest)
+        self.assertEqual(athletes[0]["recipient"], "bea@example.com")
+        self.assertTrue(os.path.exists(athletes[0]["profile"]))
+
+    def test_gemini_concurrency_is_bounded(self):
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def fake_pipeline(profile, profile_path, recipient, output_dir, api_slots):
+            with api_slots["gemini"]:
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                time.sleep(0.05)
+                with lock:
+                    active[0] -= 1
+            return {"week": 1, "stages": {"plan": True}}
+
+        output = os.path.join(self.tmp.name, 'out')
+        with patch('batch_runner.workout_generator.run_weekly_pipeline', side_effect=fake_pipeline):
+            report = batch_runner.run_batch(batch_runner.load_manifest(self.profiles), output, workers=3)
+
+        self.assertEqual(report["succeeded"], 3)
+        self.assertLessEqual(peak[0], batch_runner.API_CONCURRENCY["gemini"])
+        self.assertTrue(os.path.exists(os.path.join(output, 'batch_report.json')))
+
+    def test_each_athlete_has_its_own_garmin_account_and_cache(self):
+        seen = {}
+
+        def fake_pipeline(profile, profile_path, recipient, output_dir, api_slots):
+            name = os.path.basename(output_dir)
+            time.sleep(0.01)
+            garmin_manager.update_recovery_cache({"date": "2026-10-18", "sleep_score": len(name) * 10 + ord(name[0])})
+            seen[name] = (garmin_manager.recovery_cache_file(), garmin_manager._credential_env())
+            return {"week": 1, "stages": {"plan": True}}
+
+        output = os.path.join(self.tmp.name, 'out')
+        with patch('batch_runner.workout_generator.run_weekly_pipeline', side_effect=fake_pipeline):
+            batch_runner.run_batch(batch_runner.load_manifest(self.profiles), output, workers=3)
+
+        for name in ("ana", "bea", "cam"):
+            cache_file, credential_env = seen[name]
+            self.assertEqual(cache_file, os.path.join(output, name, garmin_manager.RECOVERY_CACHE_NAME))
+            self.assertEqual(credential_env, (f"GARMIN_EMAIL_{name.upper()}", f"GARMIN_PASSWORD_{name.upper()}"))
+            with open(cache_file) as f:
+                self.assertEqual(json.load(f), {"2026-10-18": {"sleep_score": 30 + ord(name[0])}})
+        self.assertEqual(garmin_manager.recovery_cache_file(), garmin_manager.RECOVERY_CACHE_FILE)
+
+    def test_failure_is_reported_per_athlete(self):
+        with patch('batch_runner.workout_generator.run_weekly_pipeline', side_effect=RuntimeError("boom")):
+            report = batch_runner.run_batch(batch_runner.load_manifest(self.profiles),
+                                            os.path.join(self.tmp.name, 'out'), workers=2)
+        self.assertEqual(report["succeeded"], 0)
+        self.assertEqual(report["results"][0]["error"], "boom")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import socket
+import unittest
+
+import api_limiter
+import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.saved_buckets = dict(api_limiter._buckets)
+
+    def tearDown(self):
+        api_limiter._buckets.clear()
+        api_limiter._buckets.update(self.saved_buckets)
+
+    def test_cases_run_offline_at_each_scale(self):
+        cases = ["progression.estimate", "plan.repair", "sheet.rows", "calendar.push", "garmin.recovery", "dashboard.export"]
+        report = benchmark.run_benchmarks(cases, scales=[1, 2], repeat=1)
+
+        self.assertEqual(set(report["results"]), set(cases))
+        for timings in report["results"].values():
+            self.assertEqual(set(timings), {"1x", "2x"})
+            self.assertGreaterEqual(timings["2x"]["median_ms"], 0)
+
+    def test_network_blocked(self):
+        with benchmark.network_blocked():
+            with self.assertRaises(RuntimeError):
+                socket.create_connection(("127.0.0.1", 9), timeout=1)
+
+    def test_scale_records_shifts_weeks(self):
+        records = [{"Date": "2025-11-03", "Week": 4, "Exercise": "Squat", "Weight": "95 lbs"}]
+        scaled = benchmark.scale_records(records, 3)
+        self.assertEqual([r["Date"] for r in scaled], ["2025-10-20", "2025-10-27", "2025-11-03"])
+        self.assertEqual([r["Week"] for r in scaled], [2, 3, 4])
+
+    def test_compare_results(self):
+        current = {"results": {"sheet.rows": {"1x": {"median_ms": 1.0}, "10x": {"median_ms": 5.0}}}}
+        baseline = {"results": {"sheet.rows": {"1x": {"median_ms": 2.0}}}}
+        self.assertEqual(benchmark.compare_results(current, baseline), {"sheet.rows": {"1x": 0.5}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,25 +1,51 @@
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+sys.modules.setdefault('google.generativeai', MagicMock())
+
+import api_limiter
+import backends
 import calendar_manager
-import os
-
-# Test with the user's email as the calendar ID
-calendar_id = 'mazzocchilianna@gmail.com'
-
-print(f"Testing Calendar Access for: {calendar_id}")
-
-service = calendar_manager.get_calendar_service()
-
-if service:
-    print("Service authenticated successfully.")
-    try:
-        # Try to create a simple test event
-        calendar_manager.create_workout_event(
-            service, 
-            "Monday", 
-            "TEST EVENT: AI Workout Generator Connection Verified", 
-            calendar_id
-        )
-        print("Test event creation attempted.")
-    except Exception as e:
-        print(f"Failed to create event: {e}")
-else:
-    print("Failed to authenticate service.")
+
+CALENDAR_ID = 'athlete@example.com'
+
+
+class TestCalendarManager(unittest.TestCase):
+    def setUp(self):
+        self.saved_buckets = dict(api_limiter._buckets)
+        api_limiter.set_rate_limit('calendar', rate=1e9, burst=1e9)
+        backends.configure("fake", seed=1)
+        self.service = backends.FakeCalendarService()
+
+    def tearDown(self):
+        backends.configure("live")
+        api_limiter._buckets.clear()
+        api_limiter._buckets.update(self.saved_buckets)
+
+    def events(self):
+        return backends.fake_state("calendar")[CALENDAR_ID]
+
+    def test_create_event_on_next_occurrence_of_day(self):
+        event = calendar_manager.create_workout_event(self.service, "Monday", "Hip Thrust 4x10", CALENDAR_ID)
+
+        self.assertEqual(self.events(), {event["id"]: event})
+        self.assertEqual(event["summary"], "💪 Workout: Monday")
+        self.assertEqual(event["description"], "Hip Thrust 4x10")
+        self.assertTrue(event["start"]["dateTime"].endswith("T04:30:00"))
+
+    def test_unknown_day_creates_nothing(self):
+        self.assertIsNone(calendar_manager.create_workout_event(self.service, "Someday", "Rest", CALENDAR_ID))
+        self.assertNotIn(CALENDAR_ID, backends.fake_state("calendar"))
+
+    def test_update_and_delete_event(self):
+        event = calendar_manager.create_workout_event(self.service, "Friday", "Old", CALENDAR_ID)
+
+        calendar_manager.update_workout_event(self.service, event["id"], "New", CALENDAR_ID)
+        self.assertEqual(self.events()[event["id"]]["description"], "New")
+        self.assertTrue(calendar_manager.delete_workout_event(self.service, event["id"], CALENDAR_ID))
+        self.assertEqual(self.events(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import shutil
+import smtplib
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.modules.setdefault('google.generativeai', MagicMock())
+
+import api_limiter
+import backends
+import calendar_manager
+import checkpoints
+import email_delivery
+import garmin_manager
+import sheet_manager
+import workout_generator
+
+PROFILE_PATH = os.path.join(os.path.dirname(__file__), 'user_profile.json')
+
+
+class TestRunCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = checkpoints.checkpoint_path(3, self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_stages_persist_across_loads(self):
+        checkpoint = checkpoints.RunCheckpoint(self.path, 3)
+        checkpoint.complete("plan", {"Monday": []})
+        checkpoint.record("calendar", "Monday", "evt1")
+
+        reloaded = checkpoints.RunCheckpoint(self.path, 3)
+        self.assertTrue(reloaded.is_done("plan"))
+        self.assertFalse(reloaded.is_done("calendar"))
+        self.assertEqual(reloaded.output("calendar"), {"Monday": "evt1"})
+        self.assertEqual(reloaded.completed_stages(), ["plan"])
+
+    def test_other_week_starts_fresh(self):
+        checkpoints.RunCheckpoint(self.path, 3).complete("plan", {})
+        self.assertFalse(checkpoints.RunCheckpoint(self.path, 4).is_done("plan"))
+
+    def test_clear(self):
+        checkpoint = checkpoints.RunCheckpoint(self.path, 3)
+        checkpoint.complete("email")
+        checkpoint.clear()
+        self.assertFalse(os.path.exists(self.path))
+
+
+class TestResumePipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved_buckets = dict(api_limiter._buckets)
+        for api in api_limiter.RATE_LIMITS:
+            api_limiter.set_rate_limit(api, rate=1e9, burst=1e9)
+        backends.configure("fake", seed=1)
+        self.profile_path = os.path.join(self.tmp.name, 'athlete.json')
+        shutil.copy(PROFILE_PATH, self.profile_path)
+        self.cache_patch = patch.object(garmin_manager, 'RECOVERY_CACHE_FILE', os.path.join(self.tmp.name, 'cache.json'))
+        self.cache_patch.start()
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        backends.configure("live")
+        api_limiter._buckets.clear()
+        api_limiter._buckets.update(self.saved_buckets)
+        self.tmp.cleanup()
+
+    def run_pipeline(self):
+        profile = workout_generator.load_profile(self.profile_path)
+        return workout_generator.run_weekly_pipeline(profile, self.profile_path, output_dir=self.tmp.name)
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_rerun_resumes_only_failed_stage(self):
+        week = workout_generator.load_profile(self.profile_path)['current_week']
+
+        with patch.object(sheet_manager, 'log_week_to_sheet', return_value=False):
+            first = self.run_pipeline()
+        self.assertEqual(first["degraded"], ["sheet"])
+        self.assertEqual(workout_generator.load_profile(self.profile_path)['current_week'], week)
+
+        events_before = dict(next(iter(backends.fake_state("calendar").values())))
+        with patch.object(workout_generator, 'select_exercises_for_week') as select:
+            second = self.run_pipeline()
+            select.assert_not_called()
+
+        self.assertEqual(second["degraded"], [])
+        self.assertEqual(set(second["resumed"]), {"plan", "email", "calendar", "dashboard", "site"})
+        self.assertEqual(len(backends.fake_state("smtp")["sent"]), 1)
+        self.assertEqual(next(iter(backends.fake_state("calendar").values())), events_before)
+        self.assertEqual(workout_generator.load_profile(self.profile_path)['current_week'], week + 1)
+        self.assertFalse(os.path.exists(checkpoints.checkpoint_path(week, os.path.join(self.tmp.name, 'checkpoints'))))
+
+    @patch.dict(os.environ, {}, clear=True)
+    @patch('api_limiter.time.sleep')
+    def test_queued_email_is_sent_by_the_next_run(self, _sleep):
+        week = workout_generator.load_profile(self.profile_path)['current_week']
+        outbox = os.path.join(self.tmp.name, email_delivery.OUTBOX_DIR)
+
+        with patch.object(backends.FakeSMTP, 'send_message', side_effect=smtplib.SMTPDataError(451, b"Try later")):
+            first = self.run_pipeline()
+        self.assertEqual(first["degraded"], ["email"])
+        self.assertEqual(len(email_delivery.pending(outbox)), 1)
+        # Left over from an earlier week; only the outbox flush sends it
+        msg = email_delivery.build_message("<p>Plan</p>", "Week 1", "coach@example.com", "athlete@example.com")
+        email_delivery.enqueue(msg, workout_generator.email_message_id(1, "athlete@example.com"), outbox)
+
+        second = self.run_pipeline()
+        self.assertEqual(second["degraded"], [])
+        self.assertEqual(email_delivery.pending(outbox), [])
+        # This week's email went out once from the outbox and wasn't queued again by the email stage
+        self.assertEqual(len(backends.fake_state("smtp")["sent"]), 2)
+        self.assertEqual(workout_generator.load_profile(self.profile_path)['current_week'], week + 1)
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_unconfigured_services_do_not_block_the_week(self):
+        # Only Gemini and Garmin are available; no SMTP, calendar or sheet credentials
+        backends.configure("fake", services=["gemini", "garmin"], seed=1)
+        week = workout_generator.load_profile(self.profile_path)['current_week']
+        with patch.object(calendar_manager, 'credentials_file', return_value=None), \
+                patch.object(sheet_manager, 'CREDENTIALS_FILE', os.path.join(self.tmp.name, 'missing.json')), \
+                patch.object(sheet_manager, 'get_historical_data', return_value=[]):
+            result = self.run_pipeline()
+
+        self.assertEqual(result["degraded"], [])
+        self.assertEqual((result["stages"]["calendar"], result["stages"]["sheet"]), ("skipped", "skipped"))
+        self.assertTrue(result["stages"]["email"])
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, 'weekly_plan.html')))
+        self.assertEqual(workout_generator.load_profile(self.profile_path)['current_week'], week + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
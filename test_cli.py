@@ -0,0 +1,150 @@
+import io
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import contextlib
+from unittest.mock import MagicMock, patch
+
+sys.modules.setdefault('google.generativeai', MagicMock())
+
+import api_limiter
+import backends
+import checkpoints
+import cli
+import garmin_manager
+import instrumentation
+import workout_generator
+
+PROFILE_PATH = os.path.join(os.path.dirname(__file__), 'user_profile.json')
+
+
+@patch.dict(os.environ, {}, clear=True)
+@patch.object(instrumentation, 'write_run_report')
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = self.tmp.name
+        self.saved_buckets = dict(api_limiter._buckets)
+        for api in api_limiter.RATE_LIMITS:
+            api_limiter.set_rate_limit(api, rate=1e9, burst=1e9)
+        backends.configure("fake", seed=1)
+        self.profile_path = os.path.join(self.out, 'athlete.json')
+        shutil.copy(PROFILE_PATH, self.profile_path)
+        self.cache_path = os.path.join(self.out, 'cache.json')
+        self.cache_patch = patch.object(garmin_manager, 'RECOVERY_CACHE_FILE', self.cache_path)
+        self.cache_patch.start()
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        backends.configure("live")
+        api_limiter._buckets.clear()
+        api_limiter._buckets.update(self.saved_buckets)
+        self.tmp.cleanup()
+
+    def cli(self, *args):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(io.StringIO()):
+            code = cli.main([*args, '--profile', self.profile_path, '--output-dir', self.out, '--json'])
+        return code, json.loads(stdout.getvalue())
+
+    def week(self):
+        return workout_generator.load_profile(self.profile_path)['current_week']
+
+    def test_dry_run_plan_writes_nothing(self, _report):
+        with open(self.profile_path) as f:
+            before = f.read()
+        code, output = self.cli('plan', '--dry-run')
+
+        self.assertEqual(code, 0)
+        plan = output["stages"]["plan"]
+        self.assertEqual(plan["source"], "gemini")
+        self.assertEqual(plan["violations"], {})
+        self.assertIn("Monday", plan["days"])
+        self.assertIn("stage.plan", output["spans"])
+        with open(self.profile_path) as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(sorted(os.listdir(self.out)), ['athlete.json'])
+
+    def test_selected_stages_share_the_week_checkpoint(self, _report):
+        week = self.week()
+        code, output = self.cli('run', '--stages', 'plan', 'push-calendar', 'log-sheet')
+
+        self.assertEqual(code, 0)
+        self.assertEqual(list(output["stages"]), ['plan', 'push-calendar', 'log-sheet'])
+        events = output["stages"]["push-calendar"]["events"]
+        self.assertEqual(set(events), set(output["stages"]["plan"]["days"]))
+        self.assertEqual(self.week(), week)
+
+        checkpoint = checkpoints.RunCheckpoint(checkpoints.checkpoint_path(week, os.path.join(self.out, 'checkpoints')), week)
+        self.assertEqual(checkpoint.completed_stages(), ['plan', 'calendar', 'sheet'])
+
+        # The full run resumes from the stages done above and only adds the rest
+        code, output = self.cli('run')
+        self.assertEqual(code, 0)
+        self.assertEqual(set(output["stages"]["pipeline"]["resumed"]), {'plan', 'calendar', 'sheet'})
+        self.assertEqual(len(next(iter(backends.fake_state("calendar").values()))), len(events))
+        self.assertEqual(self.week(), week + 1)
+
+    def test_replan_after_the_run_updates_the_published_week(self, _report):
+        week = self.week()
+        self.cli('run')
+        self.assertEqual(self.week(), week + 1)
+        published = workout_generator.open_published_checkpoint(self.out)
+        self.assertEqual(published.data["week"], week)
+        plan = published.output("plan")
+        new = dict(plan, Monday=plan["Monday"][:-1])
+        events = len(next(iter(backends.fake_state("calendar").values())))
+
+        with patch.object(workout_generator, 'release_block_week', return_value=(new, None)):
+            code, output = self.cli('plan', '--replan')
+
+        self.assertEqual(code, 0)
+        stage = output["stages"]["plan"]
+        self.assertEqual(stage["week"], week)
+        self.assertEqual(stage["changes"]["republished"]["calendar"], 1)
+        self.assertEqual(len(next(iter(backends.fake_state("calendar").values()))), events)
+        self.assertEqual(workout_generator.open_published_checkpoint(self.out).output("plan")["Monday"], new["Monday"])
+        self.assertEqual(self.week(), week + 1)
+
+    def test_dry_run_calendar_only_describes_events(self, _report):
+        self.cli('plan')
+        calls = backends.fake_state("calls").get("calendar", 0)
+        code, output = self.cli('push-calendar', '--dry-run')
+
+        self.assertEqual(code, 0)
+        self.assertIn("Monday", output["stages"]["push-calendar"]["would_create"])
+        self.assertEqual(backends.fake_state("calls").get("calendar", 0), calls)
+
+    def test_stage_without_plan_fails(self, _report):
+        code, output = self.cli('render')
+        self.assertEqual(code, 1)
+        self.assertIn("run the plan stage first", output["stages"]["render"]["error"])
+
+    def test_daily_recovery_uses_the_selected_profile(self, _report):
+        profile = workout_generator.load_profile(self.profile_path)
+        profile["menstrual_cycle"]["track_cycle"] = False
+        workout_generator.save_profile(profile, self.profile_path)
+
+        code, output = self.cli('daily-recovery')
+
+        self.assertEqual(code, 0)
+        self.assertIsNone(output["stages"]["daily-recovery"]["cycle_phase"])
+
+    def test_backfill_fills_missing_days(self, _report):
+        code, output = self.cli('backfill', '--days', '3')
+        self.assertEqual(code, 0)
+        self.assertEqual(output["stages"]["backfill"]["fetched"], 3)
+        # The cache under --output-dir is filled, not the default one
+        with garmin_manager.athlete_account(os.path.join(self.out, garmin_manager.RECOVERY_CACHE_NAME)):
+            self.assertEqual(len(garmin_manager.load_recovery_cache()), 3)
+        self.assertFalse(os.path.exists(self.cache_path))
+
+        code, output = self.cli('backfill', '--days', '3')
+        self.assertEqual((output["stages"]["backfill"]["fetched"], output["stages"]["backfill"]["already_cached"]), (0, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from datetime import date
+
+import numpy as np
+
+import cycle_engine
+
+PROFILE = {
+    "menstrual_cycle": {
+        "last_period_start": "2025-11-27",
+        "average_cycle_length": 28,
+        "track_cycle": True
+    }
+}
+
+
+class TestCycleEngine(unittest.TestCase):
+    def test_phase_boundaries(self):
+        expected = {1: "Menstrual", 5: "Menstrual", 6: "Follicular", 14: "Follicular",
+                    15: "Ovulation", 17: "Ovulation", 18: "Luteal", 28: "Luteal"}
+        for day, phase in expected.items():
+            target = date(2025, 11, 26 + day) if day <= 4 else date(2025, 12, day - 4)
+            info = cycle_engine.get_cycle_phase(PROFILE, target)
+            self.assertEqual(info["day"], day)
+            self.assertEqual(info["phase"], phase)
+
+    def test_wraps_to_next_cycle(self):
+        info = cycle_engine.get_cycle_phase(PROFILE, date(2025, 12, 25))
+        self.assertEqual(info["day"], 1)
+        self.assertEqual(info["intensity_modifier"], 0.85)
+
+    def test_disabled_tracking(self):
+        self.assertIsNone(cycle_engine.get_cycle_phase({"menstrual_cycle": {"track_cycle": False}}))
+        self.assertIsNone(cycle_engine.get_cycle_phase({}))
+
+    def test_calendar_lookup_matches_single_day(self):
+        calendar = cycle_engine.build_cycle_calendar(PROFILE, date(2025, 11, 1), date(2026, 3, 1))
+        dates = np.array(["2025-11-27", "2026-01-10", "2027-01-01"], dtype="datetime64[D]")
+        offsets = cycle_engine.lookup_cycle_days(calendar, dates)
+        self.assertEqual(offsets[-1], -1)
+        info = cycle_engine.phase_at(calendar, offsets[1])
+        self.assertEqual(info, cycle_engine.get_cycle_phase(PROFILE, date(2026, 1, 10)))
+
+
+if __name__ == '__main__':
+    unittest.main()
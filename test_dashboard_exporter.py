@@ -0,0 +1,131 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from unittest.mock import patch
+
+import api_limiter
+import backends
+import dashboard_exporter
+
+WORKOUTS = {
+    "Monday": [
+        {"exercise": "Barbell Hip Thrust", "sets": 4, "reps": "8", "rest": "2-3 mins", "target_weight": "135 lbs"},
+        {"exercise": "Frog Pumps", "sets": 3, "reps": "25", "rest": "45s", "target_weight": "BW"}
+    ]
+}
+MONDAY = "2025-11-03"
+
+
+class TestAdjustedToday(unittest.TestCase):
+    def test_low_readiness_scales_today(self):
+        recovery = {"readiness_score": 20, "intensity_multiplier": 0.9}
+        adjusted = dashboard_exporter.build_adjusted_today(WORKOUTS, recovery, {"intensity_modifier": 0.95}, MONDAY)
+
+        self.assertEqual(adjusted["day"], "Monday")
+        self.assertEqual(adjusted["multiplier"], 0.855)
+        thrust, pumps = adjusted["exercises"]
+        self.assertEqual(thrust["target_weight"], "115 lbs")
+        self.assertEqual(thrust["planned_weight"], "135 lbs")
+        self.assertEqual((thrust["sets"], thrust["planned_sets"]), (3, 4))
+        self.assertEqual(thrust["rest"], "2-4 mins")
+        self.assertEqual(pumps["target_weight"], "BW")
+        # The plan itself is untouched
+        self.assertEqual(WORKOUTS["Monday"][0]["sets"], 4)
+
+    def test_good_day_keeps_volume_and_rest(self):
+        recovery = {"readiness_score": 80, "intensity_multiplier": 1.03}
+        adjusted = dashboard_exporter.build_adjusted_today(WORKOUTS, recovery, {"intensity_modifier": 1.1}, MONDAY)
+        thrust = adjusted["exercises"][0]
+        self.assertEqual(adjusted["multiplier"], dashboard_exporter.MAX_TODAY_MULTIPLIER)
+        self.assertEqual((thrust["sets"], thrust["rest"], thrust["target_weight"]), (4, "2-3 mins", "150 lbs"))
+
+    def test_rest_day(self):
+        adjusted = dashboard_exporter.build_adjusted_today(WORKOUTS, {}, None, "2025-11-04")
+        self.assertTrue(adjusted["rest_day"])
+        self.assertEqual(adjusted["exercises"], [])
+
+    def test_dashboard_includes_adjusted_today(self):
+        recovery_data = {"date": MONDAY, "sleep_duration_hours": 7.5, "stress_level": 30}
+        data = dashboard_exporter.build_dashboard_data(WORKOUTS, {"current_week": 2}, recovery_data, history={}, today=MONDAY)
+        self.assertEqual(data["adjusted_today"]["day"], "Monday")
+        self.assertEqual(data["adjusted_today"]["exercises"][0]["target_weight"], "135 lbs")
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_daily_export_rescales_todays_session(self):
+        # Garmin data is for last night (yesterday); the session rescaled must be today's
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        saved_buckets = dict(api_limiter._buckets)
+        self.addCleanup(api_limiter._buckets.update, saved_buckets)
+        api_limiter.set_rate_limit('garmin', rate=1e9, burst=1e9)
+        backends.configure("fake", seed=1)
+        self.addCleanup(backends.configure, "live")
+        data_path = os.path.join(tmp, 'dashboard_data.json')
+        workouts = {day: WORKOUTS["Monday"] for day in dashboard_exporter.DAYS}
+        with open(data_path, 'w') as f:
+            json.dump({"workouts": workouts}, f)
+
+        with patch('garmin_manager.RECOVERY_CACHE_FILE', os.path.join(tmp, 'recovery_cache.json')):
+            dashboard_exporter.export_garmin_only(data_path)
+
+        with open(data_path) as f:
+            adjusted = json.load(f)["adjusted_today"]
+        tz = dashboard_exporter.load_user_profile().get('timezone') or dashboard_exporter.DEFAULT_TIMEZONE
+        today = datetime.now(ZoneInfo(tz)).date()
+        self.assertEqual(adjusted["date"], today.isoformat())
+        self.assertEqual(adjusted["day"], dashboard_exporter.DAYS[today.weekday()])
+
+
+class TestCoachContext(unittest.TestCase):
+    def setUp(self):
+        self.profile = {
+            "user_name": "Lianna", "current_week": 3, "maxes": {"Smith Machine Squat": 75, "Lat Pulldown": 70},
+            "user_context": {"stats": "Female", "gym_profile": "Planet Fitness", "specific_goals": "Glutes"}
+        }
+        self.history = {f"2025-11-{d:02d}": {"sleep_duration_hours": 6 if d > 7 else 8, "stress_level": 30}
+                        for d in range(1, 15)}
+        recovery = {"readiness_score": 42, "intensity_multiplier": 0.97}
+        self.data = {
+            "last_updated": "2025-11-03T07:00:00", "current_week": 3, "recovery": recovery,
+            "cycle_phase": {"phase": "Luteal", "day": 20, "energy": "MODERATE", "training_tip": "Keep volume steady."},
+            "coaching_notes": "Stay consistent.", "workouts": WORKOUTS,
+            "adjusted_today": dashboard_exporter.build_adjusted_today(WORKOUTS, recovery, None, MONDAY)
+        }
+
+    def test_context_summarizes_the_week(self):
+        context = dashboard_exporter.build_coach_context(self.data, self.profile, self.history)
+        text = context["text"]
+        self.assertTrue(text.startswith("- Athlete: Lianna, Female"))
+        self.assertIn("Today (Monday, load x0.97): Barbell Hip Thrust 4x8 @ 130 lbs", text)
+        self.assertIn("Sleep 7-day avg 6.0h (-2.0 vs prior week)", text)
+        self.assertIn("Cycle: Luteal (day 20)", text)
+        self.assertIn("Key lifts (est. 1RM): Smith Machine Squat 75 lbs, Lat Pulldown 70 lbs", text)
+        self.assertEqual(context["dropped_lines"], 0)
+        # Same data, same text: nothing time-dependent in the prompt
+        self.assertEqual(dashboard_exporter.build_coach_context(self.data, self.profile, self.history)["text"], text)
+
+    def test_budget_drops_lowest_priority_lines(self):
+        context = dashboard_exporter.build_coach_context(self.data, self.profile, self.history, token_budget=40)
+        self.assertLessEqual(len(context["text"]), 40 * dashboard_exporter.CHARS_PER_TOKEN)
+        self.assertIn("Athlete", context["text"])
+        self.assertNotIn("Today (Monday", context["text"])
+        self.assertGreater(context["dropped_lines"], 0)
+
+    def test_export_writes_coach_context(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        recovery_data = {"date": MONDAY, "sleep_duration_hours": 7.5, "stress_level": 30}
+        with patch('garmin_manager.RECOVERY_CACHE_FILE', os.path.join(tmp, 'recovery_cache.json')):
+            dashboard_exporter.export_dashboard_data(WORKOUTS, self.profile, os.path.join(tmp, 'dashboard_data.json'), recovery_data)
+        with open(os.path.join(tmp, dashboard_exporter.COACH_CONTEXT_FILE)) as f:
+            context = json.load(f)
+        self.assertIn("Training week 3", context["text"])
+        self.assertLessEqual(context["approx_tokens"], dashboard_exporter.COACH_CONTEXT_TOKEN_BUDGET)
+
+
+if __name__ == '__main__':
+    unittest.main()
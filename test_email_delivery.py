@@ -0,0 +1,109 @@
+import os
+import smtplib
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import api_limiter
+import backends
+import email_delivery
+
+PNG = b"\x89PNG\r\n\x1a\nfake-chart"
+
+
+class TestEmailDelivery(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.outbox = os.path.join(self.tmp.name, 'outbox')
+        self.saved_buckets = dict(api_limiter._buckets)
+        api_limiter.set_rate_limit('email', rate=1000, burst=100)
+        backends.configure("fake", services=["smtp"])
+
+    def tearDown(self):
+        email_delivery.close_connection()
+        backends.configure("live")
+        api_limiter._buckets.clear()
+        api_limiter._buckets.update(self.saved_buckets)
+        self.tmp.cleanup()
+
+    def queue(self, n):
+        for i in range(n):
+            msg = email_delivery.build_message(
+                '<img src="cid:progress-chart">', f"Week {i}", "coach@example.com",
+                f"athlete{i}@example.com", {"progress-chart": PNG}
+            )
+            email_delivery.enqueue(msg, f"week{i}_athlete{i}@example.com", self.outbox)
+
+    def test_message_has_inline_cid_image(self):
+        msg = email_delivery.build_message('<img src="cid:progress-chart">', "Plan", "a@x", "b@x", {"progress-chart": PNG})
+        self.assertEqual(msg.get_content_subtype(), "related")
+        image = msg.get_payload()[1]
+        self.assertEqual(image["Content-ID"], "<progress-chart>")
+        self.assertEqual(image.get_payload(decode=True), PNG)
+
+    def test_requeue_replaces_instead_of_duplicating(self):
+        self.queue(2)
+        self.queue(2)
+        self.assertEqual(len(email_delivery.pending(self.outbox)), 2)
+
+    def test_flush_reuses_one_connection(self):
+        self.queue(3)
+        sent, failed = email_delivery.flush_outbox("coach@example.com", "pw", self.outbox)
+
+        self.assertEqual((sent, failed), (3, 0))
+        self.assertEqual(backends.fake_state("smtp")["connections"], 1)
+        self.assertEqual(email_delivery.pending(self.outbox), [])
+
+    @patch('api_limiter.time.sleep')
+    def test_disconnect_mid_send_stays_queued(self, _sleep):
+        # The server may already have accepted the message, so it is not resent in this flush
+        self.queue(1)
+        calls = []
+
+        def dropped(self, msg):
+            calls.append(msg)
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+
+        with patch.object(backends.FakeSMTP, 'send_message', dropped):
+            sent, failed = email_delivery.flush_outbox("coach@example.com", "pw", self.outbox)
+        self.assertEqual((sent, failed), (0, 1))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(email_delivery.pending(self.outbox)), 1)
+
+        # The next flush reconnects and delivers it
+        sent, failed = email_delivery.flush_outbox("coach@example.com", "pw", self.outbox)
+        self.assertEqual((sent, failed), (1, 0))
+        self.assertEqual(backends.fake_state("smtp")["connections"], 2)
+
+    @patch('api_limiter.time.sleep')
+    def test_transient_refusal_is_retried(self, _sleep):
+        self.queue(1)
+        original = backends.FakeSMTP.send_message
+        calls = []
+
+        def busy(self, msg):
+            calls.append(msg)
+            if len(calls) == 1:
+                raise smtplib.SMTPDataError(451, b"Try again later")
+            return original(self, msg)
+
+        with patch.object(backends.FakeSMTP, 'send_message', busy):
+            sent, failed = email_delivery.flush_outbox("coach@example.com", "pw", self.outbox)
+        self.assertEqual((sent, failed), (1, 0))
+        self.assertEqual(len(calls), 2)
+
+    def test_permanent_failure_stays_queued(self):
+        self.queue(1)
+        refused = smtplib.SMTPDataError(554, b"Message rejected")
+        with patch.object(backends.FakeSMTP, 'send_message', side_effect=refused):
+            sent, failed = email_delivery.flush_outbox("coach@example.com", "pw", self.outbox)
+        self.assertEqual((sent, failed), (0, 1))
+        self.assertEqual(len(email_delivery.pending(self.outbox)), 1)
+
+    def test_inline_as_data_uris(self):
+        html = email_delivery.inline_as_data_uris('<img src="cid:progress-chart">', {"progress-chart": PNG})
+        self.assertIn('src="data:image/png;base64,', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
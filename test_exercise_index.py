@@ -0,0 +1,58 @@
+import os
+import json
+import time
+import unittest
+
+import exercise_index
+
+PROFILE_PATH = os.path.join(os.path.dirname(__file__), 'user_profile.json')
+
+
+class TestExerciseIndex(unittest.TestCase):
+    def setUp(self):
+        with open(PROFILE_PATH) as f:
+            self.profile = json.load(f)
+        self.index = exercise_index.ExerciseIndex(self.profile['exercise_database'])
+
+    def test_near_duplicates_across_categories(self):
+        self.assertEqual(self.index.find_duplicate("Frog Pump")[1]['name'], "Frog Pumps")
+        self.assertEqual(self.index.find_duplicate("DB Hip Thrust")[1]['name'], "Dumbbell Hip Thrust")
+        self.assertIsNone(self.index.find_duplicate("Dumbbell Overhead Extension"))
+
+    def test_add_skips_duplicates(self):
+        self.assertEqual(self.index.add("Finisher", {"name": "Cable Kickback"}), "Cable Kickbacks")
+        self.assertIsNone(self.index.add("Finisher", {"name": "Banded Clamshell"}))
+        self.assertEqual(self.index.find_duplicate("Banded Clamshells")[1]['name'], "Banded Clamshell")
+
+    def test_match_category(self):
+        self.assertEqual(self.index.match_category("Core Stability"), "Core_Stability")
+        self.assertEqual(self.index.match_category("Plyometrics"), "Plyometrics")
+
+    def test_banned_equipment_from_gym_profile(self):
+        self.assertEqual(exercise_index.banned_equipment(self.profile), ["barbell"])
+        self.assertEqual(exercise_index.banned_equipment({}), [])
+
+    def test_substitutes_barbell_moves(self):
+        plan = {"coaching_notes": "", "Monday": [
+            {"exercise": "Barbell Hip Thrust", "category": "Glute_Compound_Heavy", "is_new": False},
+            {"exercise": "Barbell Back Squat", "category": "Squat_Pattern", "is_new": True},
+            {"exercise": "Barbell Curl", "category": "Bicep_Isolation", "is_new": True},
+            {"exercise": "Cable Kickbacks", "category": "Glute_Shortened_Iso"}
+        ]}
+        swaps = exercise_index.enforce_equipment(plan, self.profile)
+        self.assertEqual(swaps, [
+            ("Barbell Hip Thrust", "Smith Machine Hip Thrust"),
+            ("Barbell Back Squat", "Smith Machine Squat"),
+            ("Barbell Curl", "Dumbbell Curls")
+        ])
+        self.assertFalse(any(ex["is_new"] for ex in plan["Monday"][:3]))
+
+    def test_lookup_is_fast(self):
+        start = time.perf_counter()
+        for _ in range(100):
+            self.index.find_duplicate("Smith Machine Hip Thrusts")
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
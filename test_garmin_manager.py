@@ -0,0 +1,46 @@
+import unittest
+from datetime import datetime, timezone
+
+import garmin_manager
+
+
+def ts(year, month, day, hour, minute=0):
+    """UTC timestamp in milliseconds."""
+    return int(datetime(year, month, day, hour, minute, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+class TestBodyBatterySummary(unittest.TestCase):
+    def test_morning_uses_local_time(self):
+        # 07:00 UTC is 02:00 in New York (winter), 11:00 UTC is 06:00
+        readings = [
+            [ts(2026, 1, 5, 7), 40],
+            [ts(2026, 1, 5, 11), 80],
+            [ts(2026, 1, 5, 15), 60],
+        ]
+        summary = garmin_manager.summarize_body_battery(readings, 'America/New_York')
+        self.assertEqual(summary["morning"], 80)
+        self.assertEqual(summary["hourly"][2], 40)
+        self.assertEqual(summary["hourly"][7], None)
+
+        utc_summary = garmin_manager.summarize_body_battery(readings, 'UTC')
+        self.assertEqual(utc_summary["morning"], 40)
+
+    def test_rates_min_max(self):
+        readings = [
+            [ts(2026, 1, 5, 0), 20],
+            [ts(2026, 1, 5, 4), 60],   # +10/h while charging
+            [ts(2026, 1, 5, 6), 50],   # -5/h while draining
+            [ts(2026, 1, 5, 8), None],
+        ]
+        summary = garmin_manager.summarize_body_battery(readings, 'UTC')
+        self.assertEqual((summary["min"], summary["max"], summary["current"]), (20, 60, 50))
+        self.assertEqual(summary["charge_per_hour"], 10.0)
+        self.assertEqual(summary["drain_per_hour"], 5.0)
+
+    def test_no_valid_readings(self):
+        self.assertIsNone(garmin_manager.summarize_body_battery([[ts(2026, 1, 5, 0), None]]))
+        self.assertIsNone(garmin_manager.summarize_body_battery([]))
+
+
+if __name__ == '__main__':
+    unittest.main()
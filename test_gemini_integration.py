@@ -2,6 +2,7 @@ import unittest
 from unittest.mock import MagicMock, patch
 import os
 import sys
+import json
 
 # Add current directory to path to import workout_generator
 sys.path.append(os.getcwd())
@@ -13,31 +14,61 @@ sys.modules['google.generativeai'] = MagicMock()
 import workout_generator
 
 class TestGeminiIntegration(unittest.TestCase):
+    @patch('workout_generator.sheet_manager.get_last_week_logs', return_value=[])
     @patch('workout_generator.genai')
     @patch.dict(os.environ, {'GEMINI_API_KEY': 'fake_key'})
-    def test_get_ai_cues_success(self, mock_genai):
-        # Setup mock
+    def test_select_exercises_success(self, mock_genai, _mock_logs):
+        # Recorded model output (list-shaped notes, "3-4" sets, aliased keys)
+        with open(os.path.join(os.path.dirname(__file__), 'fixtures', 'gemini_plan_response.json')) as f:
+            recorded = json.load(f)
         mock_model = MagicMock()
-        mock_response = MagicMock()
-        mock_response.text = "Keep core tight."
-        mock_model.generate_content.return_value = mock_response
+        mock_model.generate_content.return_value = MagicMock(text=recorded["text"])
         mock_genai.GenerativeModel.return_value = mock_model
 
-        # Call function
-        cues = workout_generator.get_ai_cues("Squat", "200 lbs", "Strength", "Hypertrophy")
+        profile = {
+            "current_week": 4, "primary_goal": "Hypertrophy", "exercise_database": {},
+            "schedule_slots": [{"day_name": d, "focus": "Full Body"} for d in ("Monday", "Tuesday", "Friday")]
+        }
+        plan = workout_generator.select_exercises_for_week(profile)
 
-        # Assertions
-        self.assertEqual(cues, "Keep core tight.")
         mock_genai.configure.assert_called_with(api_key='fake_key')
-        mock_genai.GenerativeModel.assert_called_with('gemini-1.5-pro')
+        mock_genai.GenerativeModel.assert_called_with('gemini-3-pro-preview')
         mock_model.generate_content.assert_called_once()
+        self.assertIsInstance(plan["coaching_notes"], str)
+        self.assertTrue(all(isinstance(ex["sets"], int) for ex in plan["Monday"]))
 
     @patch('workout_generator.genai')
-    def test_get_ai_cues_no_key(self, mock_genai):
+    def test_select_exercises_no_key(self, mock_genai):
         # Ensure no API key in env
         with patch.dict(os.environ, {}, clear=True):
-            cues = workout_generator.get_ai_cues("Squat", "200 lbs", "Strength", "Hypertrophy")
-            self.assertIn("API Key missing", cues)
+            plan = workout_generator.select_exercises_for_week({"schedule_slots": []})
+            self.assertIsNone(plan)
+            mock_genai.GenerativeModel.assert_not_called()
+
+    @patch('workout_generator.plan_analyzer.day_violations', return_value={})
+    @patch('workout_generator.sheet_manager.get_last_week_logs', return_value=[])
+    @patch('workout_generator.genai')
+    @patch.dict(os.environ, {'GEMINI_API_KEY': 'fake_key'})
+    def test_select_exercises_retries_only_bad_days(self, mock_genai, _mock_logs, _mock_rules):
+        profile = {
+            "current_week": 1, "primary_goal": "Hypertrophy", "exercise_database": {},
+            "schedule_slots": [{"day_name": "Monday", "focus": "Legs"}, {"day_name": "Tuesday", "focus": "Upper"}]
+        }
+        first = MagicMock(text='{"coaching_notes": "Go", "Monday": [{"exercise": "Squat"}], "Tuesday": []}')
+        # The retry also sends back a Monday that wasn't asked for; it must not replace the original
+        retry = MagicMock(text='{"Tuesday": [{"exercise": "Row", "sets": "3"}], "Monday": [{"exercise": "Lunge"}]}')
+        mock_model = MagicMock()
+        mock_model.generate_content.side_effect = [first, retry]
+        mock_genai.GenerativeModel.return_value = mock_model
+
+        plan = workout_generator.select_exercises_for_week(profile)
+
+        self.assertEqual(mock_model.generate_content.call_count, 2)
+        retry_prompt = mock_model.generate_content.call_args_list[1][0][0]
+        self.assertIn("ONLY a JSON object with these day keys (Tuesday)", retry_prompt)
+        self.assertEqual(plan["Monday"][0]["exercise"], "Squat")
+        self.assertEqual(plan["Tuesday"][0]["sets"], 3)
+        self.assertEqual(plan["coaching_notes"], "Go")
 
 if __name__ == '__main__':
     unittest.main()
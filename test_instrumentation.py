@@ -0,0 +1,63 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+import instrumentation
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        instrumentation.reset()
+
+    def test_nested_spans_record_path_and_errors(self):
+        with instrumentation.span("stage.plan"):
+            with instrumentation.span("gemini.generate"):
+                pass
+        with self.assertRaises(ValueError):
+            with instrumentation.span("stage.sheet"):
+                raise ValueError("boom")
+
+        spans = {s["name"]: s for s in instrumentation.get_report()["spans"]}
+        self.assertEqual(spans["gemini.generate"]["path"], "stage.plan/gemini.generate")
+        self.assertEqual(spans["stage.plan"]["status"], "ok")
+        self.assertEqual(spans["stage.sheet"]["status"], "error")
+
+    def test_timed_decorator_and_summary(self):
+        @instrumentation.timed("chart.render")
+        def render():
+            return "png"
+
+        self.assertEqual(render(), "png")
+        render()
+        summary = instrumentation.summarize()
+        self.assertEqual(summary["chart.render"]["calls"], 2)
+        self.assertEqual(summary["chart.render"]["errors"], 0)
+
+    def test_record_gemini_usage(self):
+        response = MagicMock()
+        response.usage_metadata.prompt_token_count = 1200
+        response.usage_metadata.candidates_token_count = 800
+        response.usage_metadata.total_token_count = 2000
+        instrumentation.record_gemini_usage(response)
+        instrumentation.record_gemini_usage(response)
+
+        counters = instrumentation.get_report()["counters"]
+        self.assertEqual(counters["gemini.prompt_tokens"], 2400)
+        self.assertEqual(counters["gemini.total_tokens"], 4000)
+        self.assertEqual(counters["gemini.calls"], 2)
+
+    def test_write_run_report(self):
+        instrumentation.count("gemini.prompt_chars", 5000)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = instrumentation.write_run_report("weekly", report_dir=tmp)
+            self.assertTrue(os.path.basename(path).startswith("weekly_"))
+            with open(path) as f:
+                report = json.load(f)
+        self.assertEqual(report["run"], "weekly")
+        self.assertEqual(report["counters"]["gemini.prompt_chars"], 5000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+sys.modules.setdefault('google.generativeai', MagicMock())
+
+import api_limiter
+import backends
+import garmin_manager
+import mesocycle_planner
+import progression_engine
+import workout_generator
+
+PROFILE_PATH = os.path.join(os.path.dirname(__file__), 'user_profile.json')
+
+TEMPLATE = {
+    "coaching_notes": "Glute focus.",
+    "Monday": [
+        {"exercise": "Barbell Hip Thrust", "sets": 4, "reps": "10", "rest": "90s", "target_weight": "RPE 8"},
+        {"exercise": "Frog Pumps", "sets": 3, "reps": "25", "rest": "45s", "target_weight": "BW"}
+    ]
+}
+
+
+def targets_for(e1rm):
+    estimate = {"e1rm": e1rm, "week": 1, "last_weight": 100.0, "last_reps": 8, "last_rpe": 8.0}
+    return progression_engine.next_week_targets({"Barbell Hip Thrust": estimate})
+
+
+class TestMesocyclePlanner(unittest.TestCase):
+    def test_block_periodizes_tracked_lifts(self):
+        block = mesocycle_planner.build_block(TEMPLATE, 5, targets_for(200))
+        self.assertEqual(sorted(block["weeks"]), ["5", "6", "7", "8"])
+
+        phases = [block["weeks"][str(w)]["mesocycle"]["phase"] for w in range(5, 9)]
+        self.assertEqual(phases, mesocycle_planner.BLOCK_PHASES)
+        realization = block["weeks"]["7"]["Monday"]
+        self.assertEqual(realization[0]["reps"], "3-5")
+        self.assertEqual(realization[1]["reps"], "25")
+        self.assertEqual(block["weeks"]["8"]["Monday"][1]["sets"], 2)
+
+    def test_release_loads_follow_phase(self):
+        block = mesocycle_planner.build_block(TEMPLATE, 1, targets_for(200))
+        loads = [int(mesocycle_planner.release_week(block, week, targets_for(200))["Monday"][0]["target_weight"].split()[0])
+                 for week in (1, 2, 3)]
+        self.assertEqual(loads, sorted(loads))
+        self.assertEqual(mesocycle_planner.release_week(block, 1, targets_for(200))["Monday"][1]["target_weight"], "BW")
+
+    def test_later_weeks_get_their_own_cycle_phase_notes(self):
+        block = mesocycle_planner.build_block(TEMPLATE, 1, targets_for(200))
+        self.assertIn("Glute focus.", block["weeks"]["1"]["coaching_notes"])
+        for week in ("2", "3", "4"):
+            self.assertNotIn("Glute focus.", block["weeks"][week]["coaching_notes"])
+
+        luteal = {"phase": "Luteal", "training_tip": "Keep intensity moderate."}
+        week2 = mesocycle_planner.release_week(block, 2, targets_for(200), luteal)
+        self.assertIn("Luteal phase this week: Keep intensity moderate.", week2["coaching_notes"])
+        week1 = mesocycle_planner.release_week(block, 1, targets_for(200), luteal)
+        self.assertEqual(week1["coaching_notes"], block["weeks"]["1"]["coaching_notes"])
+
+    def test_training_week_start(self):
+        self.assertEqual(workout_generator.training_week_start(date(2026, 10, 18)), date(2026, 10, 19))
+        self.assertEqual(workout_generator.training_week_start(date(2026, 10, 21)), date(2026, 10, 19))
+
+    def test_replan_reasons(self):
+        readiness = {"score": 60}
+        block = mesocycle_planner.build_block(TEMPLATE, 1, targets_for(200), readiness)
+        self.assertIsNone(mesocycle_planner.replan_reason(block, 2, targets_for(205), {"score": 55}))
+        self.assertIn("no planned block", mesocycle_planner.replan_reason(block, 5))
+        self.assertIn("Barbell Hip Thrust", mesocycle_planner.replan_reason(block, 2, targets_for(240)))
+        self.assertIn("readiness", mesocycle_planner.replan_reason(block, 2, targets_for(200), {"score": 20}))
+
+
+class TestBlockPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved_buckets = dict(api_limiter._buckets)
+        for api in api_limiter.RATE_LIMITS:
+            api_limiter.set_rate_limit(api, rate=1e9, burst=1e9)
+        backends.configure("fake", seed=1)
+        self.profile_path = os.path.join(self.tmp.name, 'athlete.json')
+        shutil.copy(PROFILE_PATH, self.profile_path)
+        self.cache_patch = patch.object(garmin_manager, 'RECOVERY_CACHE_FILE', os.path.join(self.tmp.name, 'cache.json'))
+        self.cache_patch.start()
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        backends.configure("live")
+        api_limiter._buckets.clear()
+        api_limiter._buckets.update(self.saved_buckets)
+        self.tmp.cleanup()
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_only_first_week_of_block_calls_gemini(self):
+        phases = []
+        for _ in range(mesocycle_planner.BLOCK_WEEKS + 1):
+            profile = workout_generator.load_profile(self.profile_path)
+            result = workout_generator.run_weekly_pipeline(profile, self.profile_path, output_dir=self.tmp.name)
+            self.assertEqual(result["degraded"], [])
+            block = mesocycle_planner.load_block(mesocycle_planner.block_path(self.tmp.name))
+            phases.append(block["weeks"][str(result["week"])]["mesocycle"]["phase"])
+
+        self.assertEqual(phases, mesocycle_planner.BLOCK_PHASES + ["Accumulation"])
+        self.assertEqual(backends.fake_state("calls")["gemini"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from datetime import date, timedelta
+
+import numpy as np
+
+import cycle_engine
+import performance_analytics
+
+START = date(2026, 1, 1)
+DAYS = 84
+
+
+def make_profile():
+    return {
+        "current_week": 14,
+        "menstrual_cycle": {"last_period_start": START.isoformat(), "average_cycle_length": 28, "track_cycle": True}
+    }
+
+
+def make_data(sleep_effect=0.02, follicular_boost=0.05):
+    """One logged squat set a day: a steady progression, scaled by sleep and a follicular boost."""
+    rng = np.random.default_rng(0)
+    records, history = [], {}
+    for i in range(DAYS):
+        day = START + timedelta(days=i)
+        sleep = round(float(rng.uniform(5, 9)), 2)
+        phase = cycle_engine.get_cycle_phase(make_profile(), day)["phase"]
+        weight = 100 * (1 + 0.002 * i) * (1 + sleep_effect * (sleep - 7)) * (1 + follicular_boost * (phase == "Follicular"))
+        records.append({"Date": day.isoformat(), "Week": i // 7 + 1, "Day": day.strftime("%A"), "Exercise": "Squat",
+                        "ACTUAL Weight": f"{weight:.2f} lbs", "ACTUAL Reps": 5, "RPE": 8})
+        history[day.isoformat()] = {"sleep_duration_hours": sleep}
+    return records, history
+
+
+class TestPerformanceAnalytics(unittest.TestCase):
+    def test_dates_from_week_and_day(self):
+        records = [{"Week": 4, "Day": "Monday"}, {"Week": 3, "Day": "tuesday"},
+                   {"Week": 2, "Day": "Monday", "Date": "2026-01-05"}, {"Week": "", "Day": "Friday"}]
+        dates = performance_analytics.record_dates(records, 5, today=date(2026, 10, 21))
+        self.assertEqual([str(d) for d in dates], ["2026-10-19", "2026-10-13", "2026-01-05", "NaT"])
+
+    def test_progression_alone_is_not_performance(self):
+        records, history = make_data(sleep_effect=0, follicular_boost=0)
+        joined = performance_analytics.join_sets(records, history, make_profile())
+        self.assertEqual(len(joined["performance"]), DAYS)
+        self.assertLess(np.abs(joined["performance"]).max(), 0.002)
+
+    def test_sleep_correlation_and_slope(self):
+        records, history = make_data(follicular_boost=0)
+        report = performance_analytics.build_report(records, history, make_profile())
+
+        sleep = report["correlations"]["sleep_duration_hours"]
+        self.assertGreater(sleep["r"], 0.95)
+        self.assertAlmostEqual(sleep["slope_pct"], 2.0, delta=0.2)
+        self.assertEqual(sleep["sets"], DAYS)
+        self.assertNotIn("hrv_avg", report["correlations"])
+        self.assertTrue(report["lines"][0].startswith("Sleep: +2.0% strength per +1h"))
+
+    def test_phase_deltas_become_learned_modifiers(self):
+        records, history = make_data(sleep_effect=0)
+        profile = make_profile()
+        report, changes = performance_analytics.update_performance(profile, records, history)
+
+        follicular = report["phases"]["Follicular"]
+        self.assertGreater(follicular["delta_pct"], 2.5)
+        self.assertLess(report["phases"]["Menstrual"]["delta_pct"], 0)
+        # Shrunk from the data (~1.03) towards the 1.1 default
+        self.assertTrue(1.03 < follicular["modifier"] < 1.1)
+        self.assertGreater(report["intensity_modifiers"]["Menstrual"], 0.85)
+        self.assertEqual(changes["Follicular"], (1.1, follicular["modifier"]))
+        self.assertIs(profile["performance_report"], report)
+
+        phase = cycle_engine.get_cycle_phase(profile, START + timedelta(days=7))
+        self.assertEqual(phase["intensity_modifier"], follicular["modifier"])
+
+    def test_too_little_data_keeps_defaults(self):
+        records, history = make_data()
+        profile = make_profile()
+        report, changes = performance_analytics.update_performance(profile, records[:5], history)
+
+        self.assertEqual(report["correlations"], {})
+        self.assertEqual(report["intensity_modifiers"], {})
+        self.assertEqual(changes, {})
+        self.assertEqual(cycle_engine.get_cycle_phase(profile, START)["intensity_modifier"], 0.85)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.modules.setdefault('google.generativeai', MagicMock())
+
+import plan_analyzer
+import plan_schema
+import workout_generator
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'gemini_plan_response.json')
+PROFILE_PATH = os.path.join(os.path.dirname(__file__), 'user_profile.json')
+
+
+def _day(*categories, reps="8-10"):
+    return [{"exercise": f"Move {i}", "category": c, "sets": 3, "reps": reps} for i, c in enumerate(categories)]
+
+
+class TestPlanAnalyzer(unittest.TestCase):
+    def setUp(self):
+        with open(FIXTURE_PATH) as f:
+            self.plan, _ = plan_schema.repair_plan(json.loads(json.load(f)["text"]))
+        with open(PROFILE_PATH) as f:
+            self.profile = json.load(f)
+
+    def test_taxonomy(self):
+        self.assertEqual(plan_analyzer.muscles_for("Glute_Compound_Heavy"), {"glutes": 1.0})
+        self.assertEqual(plan_analyzer.muscles_for("Hinge_Pattern"), {"hamstrings": 1.0, "glutes": 0.5})
+        self.assertEqual(plan_analyzer.muscles_for("", "Cable Row"), {"back": 1.0, "biceps": 0.5})
+        self.assertTrue(plan_analyzer.is_compound("Squat_Pattern"))
+        self.assertFalse(plan_analyzer.is_compound("Glute_Shortened_Iso"))
+
+    def test_intensity_buckets(self):
+        self.assertEqual(plan_analyzer.intensity_bucket("6-8"), "heavy")
+        self.assertEqual(plan_analyzer.intensity_bucket("10-12"), "moderate")
+        self.assertEqual(plan_analyzer.intensity_bucket("15-20"), "high")
+        self.assertEqual(plan_analyzer.intensity_bucket("45s"), "other")
+
+    def test_recorded_plan_passes(self):
+        analysis = plan_analyzer.analyze_plan(self.plan, self.profile)
+        self.assertEqual(analysis["violations"], {})
+        self.assertEqual(sum(analysis["intensity"].values()),
+                         sum(day["sets"] for day in analysis["days"].values()))
+        self.assertGreater(analysis["weekly_sets"]["glutes"], 0)
+
+    def test_flags_short_day_and_missed_focus(self):
+        profile = {"schedule_slots": [{"day_name": "Monday", "categories": ["Glute_Compound_Heavy", "Hinge_Pattern"]}]}
+        plan = {"Monday": _day("Bicep_Isolation", "Tricep_Isolation", "Row_Horizontal")}
+        problems = plan_analyzer.day_violations(plan, profile)["Monday"]
+        self.assertIn("only 3 exercises (minimum 5)", problems)
+        self.assertIn("misses the day's focus (glutes, hamstrings)", problems)
+
+    def test_flags_more_than_six_exercises(self):
+        plan = {"Tuesday": _day("Squat_Pattern", "Row", "Bench", "Calves", "Core_Stability", "Bicep_Isolation", "Tricep_Isolation")}
+        self.assertEqual(plan_analyzer.day_violations(plan)["Tuesday"], ["7 exercises (maximum 6)"])
+        plan["Tuesday"].pop()
+        self.assertEqual(plan_analyzer.day_violations(plan), {})
+
+    def test_week_warnings(self):
+        profile = {"user_context": {"specific_goals": "Focus: Glutes, Core"}}
+        plan = {"Monday": _day("Squat_Pattern", "Core_Stability", "Calves", "Row", "Bench", reps="15")}
+        warnings = plan_analyzer.analyze_plan(plan, profile)["warnings"]
+        self.assertIn("glutes: 1.5 weekly sets (goal muscle, minimum 6)", warnings)
+        self.assertTrue(any(w.startswith("high rep range is 100%") for w in warnings))
+
+    def test_analysis_is_fast(self):
+        start = time.perf_counter()
+        for _ in range(200):
+            plan_analyzer.analyze_plan(self.plan, self.profile)
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    @patch('workout_generator.sheet_manager.get_last_week_logs', return_value=[])
+    @patch('workout_generator.genai')
+    @patch.dict(os.environ, {'GEMINI_API_KEY': 'fake_key'})
+    def test_selection_re_requests_rule_breaking_days(self, mock_genai, _mock_logs):
+        profile = {
+            "current_week": 1, "primary_goal": "Hypertrophy", "exercise_database": {},
+            "schedule_slots": [{"day_name": "Monday", "focus": "Legs"}, {"day_name": "Tuesday", "focus": "Upper"}]
+        }
+        tuesday = [{"exercise": f"Row {i}", "category": "Row_Horizontal"} for i in range(5)]
+        first = MagicMock(text=json.dumps({"coaching_notes": "Go", "Monday": [{"exercise": "Squat", "category": "Squat_Pattern"}], "Tuesday": tuesday}))
+        monday = [{"exercise": f"Squat {i}", "category": "Squat_Pattern"} for i in range(5)]
+        retry = MagicMock(text=json.dumps({"Monday": monday}))
+        mock_model = MagicMock()
+        mock_model.generate_content.side_effect = [first, retry]
+        mock_genai.GenerativeModel.return_value = mock_model
+
+        plan = workout_generator.select_exercises_for_week(profile)
+
+        self.assertEqual(mock_model.generate_content.call_count, 2)
+        retry_prompt = mock_model.generate_content.call_args_list[1][0][0]
+        self.assertIn("ONLY a JSON object with these day keys (Monday)", retry_prompt)
+        self.assertIn("only 1 exercises (minimum 5)", retry_prompt)
+        self.assertEqual(len(plan["Monday"]), 5)
+        self.assertEqual(plan["Tuesday"][0]["exercise"], "Row 0")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+import os
+import sys
+import copy
+import json
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.modules.setdefault('google.generativeai', MagicMock())
+
+import api_limiter
+import backends
+import calendar_manager
+import dashboard_exporter
+import garmin_manager
+import plan_diff
+import sheet_manager
+import workout_generator
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+PROFILE_PATH = os.path.join(os.path.dirname(__file__), 'user_profile.json')
+
+
+def load_plan():
+    with open(os.path.join(FIXTURE_DIR, 'gemini_plan_response.json')) as f:
+        return json.loads(json.load(f)["text"])
+
+
+def replanned(plan):
+    """Monday: hip thrust gets a set more and a new finisher; Friday loses its frog pumps."""
+    new = copy.deepcopy(plan)
+    new["Monday"][0]["sets"] += 1
+    new["Monday"].append({"exercise": "Cable Pull Through", "category": "Glute_Finisher", "sets": 2, "reps": "20", "rest": "45s"})
+    new["Friday"] = [ex for ex in new["Friday"] if ex.get("exercise") != "Frog Pumps"]
+    return new
+
+
+class TestDiffPlans(unittest.TestCase):
+    def setUp(self):
+        self.plan = load_plan()
+
+    def test_identical_plans_have_no_changes(self):
+        diff = plan_diff.diff_plans(self.plan, copy.deepcopy(self.plan))
+        self.assertTrue(plan_diff.is_empty(diff))
+        self.assertEqual(plan_diff.summarize(diff), [])
+
+    def test_reports_only_changed_exercises(self):
+        diff = plan_diff.diff_plans(self.plan, replanned(self.plan))
+
+        self.assertEqual(plan_diff.changed_days(diff), ["Monday", "Friday"])
+        monday = diff["days"]["Monday"]["changes"]
+        self.assertEqual([(c["op"], c["exercise"]) for c in monday],
+                         [("changed", "Smith Machine Hip Thrust"), ("added", "Cable Pull Through")])
+        self.assertEqual(monday[0]["fields"], {"sets": [4, 5]})
+        self.assertEqual(diff["days"]["Friday"]["changes"], [{"op": "removed", "exercise": "Frog Pumps", "index": 5}])
+        self.assertFalse(diff["notes_changed"])
+
+    def test_inserted_exercise_does_not_shift_the_rest(self):
+        new = copy.deepcopy(self.plan)
+        new["Tuesday"].insert(0, {"exercise": "Band Pull Aparts", "sets": 2, "reps": "20"})
+        changes = plan_diff.diff_plans(self.plan, new)["days"]["Tuesday"]["changes"]
+        self.assertEqual(changes, [{"op": "added", "exercise": "Band Pull Aparts", "index": 0}])
+
+    def test_added_and_removed_days(self):
+        new = copy.deepcopy(self.plan)
+        new["Saturday"] = new.pop("Wednesday")
+        new["coaching_notes"] = "Deload."
+        diff = plan_diff.diff_plans(self.plan, new)
+        self.assertEqual(diff["days"]["Wednesday"]["status"], "removed")
+        self.assertEqual(diff["days"]["Saturday"]["status"], "added")
+        self.assertIn("Coaching notes updated", plan_diff.summarize(diff))
+
+
+@patch.dict(os.environ, {}, clear=True)
+class TestRepublishChanges(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved_buckets = dict(api_limiter._buckets)
+        for api in api_limiter.RATE_LIMITS:
+            api_limiter.set_rate_limit(api, rate=1e9, burst=1e9)
+        backends.configure("fake", seed=1)
+        self.cache_patch = patch.object(garmin_manager, 'RECOVERY_CACHE_FILE', os.path.join(self.tmp.name, 'cache.json'))
+        self.cache_patch.start()
+        self.profile = workout_generator.load_profile(PROFILE_PATH)
+        self.week = self.profile['current_week']
+        self.sheet_name = self.profile.get('google_sheet_name', 'My Workout Plan')
+        self.plan = load_plan()
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        backends.configure("live")
+        api_limiter._buckets.clear()
+        api_limiter._buckets.update(self.saved_buckets)
+        self.tmp.cleanup()
+
+    def log_rows(self):
+        return backends.fake_state("sheets")[self.sheet_name].worksheet(sheet_manager.LOG_SHEET_TITLE).rows
+
+    def publish(self):
+        """Publishes self.plan to the fake calendar and sheet and the dashboard JSON, like a weekly run."""
+        checkpoint = workout_generator.open_run_checkpoint(self.week, self.tmp.name)
+        checkpoint.complete("plan", self.plan)
+        service = calendar_manager.get_calendar_service()
+        for day in workout_generator.training_days(self.plan):
+            event = calendar_manager.create_workout_event(
+                service, day, workout_generator.build_calendar_description(self.plan, day), 'athlete'
+            )
+            checkpoint.record("calendar", day, event["id"])
+        checkpoint.complete("calendar", checkpoint.output("calendar"))
+        logged = sheet_manager.log_week_to_sheet(self.sheet_name, self.plan, self.week, None, self.profile)
+        checkpoint.complete("sheet", {"sheet": self.sheet_name, **logged})
+        recovery = {"date": "2026-10-19"}
+        data_path = os.path.join(self.tmp.name, 'dashboard_data.json')
+        dashboard_exporter.export_dashboard_data(self.plan, self.profile, data_path, recovery)
+        checkpoint.complete("dashboard", data_path)
+        return checkpoint
+
+    def test_sheet_update_rewrites_planned_columns_and_keeps_results(self):
+        location = sheet_manager.log_week_to_sheet(self.sheet_name, self.plan, self.week, None, self.profile)
+        rows = self.log_rows()
+        thrust = next(i for i, row in enumerate(rows) if row[2:3] == ["Smith Machine Hip Thrust"])
+        rows[thrust][7:10] = ["135 lbs", "12", 8]
+        new = replanned(self.plan)
+
+        sent = sheet_manager.update_week_rows(self.sheet_name, self.plan, new, self.week, None, self.profile, location)
+
+        # One planned-column rewrite, one inserted row (insert + write), one deleted row
+        self.assertEqual(sent, 4)
+        # Planned columns end up exactly as a fresh log of the new plan
+        sheet_manager.log_week_to_sheet("Fresh", new, self.week, None, self.profile)
+        expected = backends.fake_state("sheets")["Fresh"].worksheet(sheet_manager.LOG_SHEET_TITLE).rows
+        rows = self.log_rows()
+        self.assertEqual([row[:7] + row[10:11] for row in rows], [row[:7] + row[10:11] for row in expected])
+        self.assertEqual(rows[thrust][3], 5)
+        self.assertEqual(rows[thrust][7:10], ["135 lbs", "12", 8])
+
+    def test_sheet_update_finds_week_moved_by_inserted_rows(self):
+        location = sheet_manager.log_week_to_sheet(self.sheet_name, self.plan, self.week, None, self.profile)
+        self.log_rows()[1:1] = [["Athlete note"], []]
+        calls = backends.fake_state("calls")["sheets"]
+
+        sent = sheet_manager.update_week_rows(self.sheet_name, self.plan, replanned(self.plan), self.week, None, self.profile, location)
+
+        self.assertEqual(sent, 4)
+        # The stored rows no longer match, so the week is looked up in the first column
+        self.assertEqual(backends.fake_state("calls")["sheets"] - calls, 5)
+        self.assertEqual(self.log_rows()[1], ["Athlete note"])
+
+    def test_republish_touches_only_changed_days(self):
+        checkpoint = self.publish()
+        events = next(iter(backends.fake_state("calendar").values()))
+        before = {event_id: dict(event) for event_id, event in events.items()}
+        calls = dict(backends.fake_state("calls"))
+        new = replanned(self.plan)
+
+        result = workout_generator.republish_changes(self.profile, checkpoint, self.plan, new, self.tmp.name, 'athlete')
+
+        self.assertEqual(result["stages"]["calendar"], 2)
+        self.assertEqual(backends.fake_state("calls")["calendar"] - calls["calendar"], 2)
+        # open, the week's own rows, one batch_update
+        self.assertEqual(backends.fake_state("calls")["sheets"] - calls["sheets"], 3)
+        ids = checkpoint.output("calendar")
+        changed = {ids["Monday"], ids["Friday"]}
+        for event_id, event in events.items():
+            if event_id in changed:
+                self.assertNotEqual(event["description"], before[event_id]["description"])
+            else:
+                self.assertEqual(event, before[event_id])
+        self.assertIn("Cable Pull Through", events[ids["Monday"]]["description"])
+        self.assertEqual(checkpoint.output("plan"), new)
+
+        with open(checkpoint.output("dashboard")) as f:
+            dashboard = json.load(f)
+        self.assertEqual(dashboard["workouts"]["Monday"], new["Monday"])
+        self.assertEqual(dashboard["workouts"]["Friday"], new["Friday"])
+        self.assertEqual(list(dashboard["workouts"]), workout_generator.training_days(self.plan))
+
+    def test_republish_deletes_events_of_removed_days(self):
+        checkpoint = self.publish()
+        new = copy.deepcopy(self.plan)
+        del new["Thursday"]
+
+        workout_generator.republish_changes(self.profile, checkpoint, self.plan, new, self.tmp.name, 'athlete')
+
+        self.assertNotIn("Thursday", checkpoint.output("calendar"))
+        self.assertEqual(len(next(iter(backends.fake_state("calendar").values()))), len(workout_generator.training_days(new)))
+
+
+if __name__ == '__main__':
+    unittest.main()
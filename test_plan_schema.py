@@ -0,0 +1,41 @@
+import unittest
+
+import plan_schema
+
+
+class TestPlanSchema(unittest.TestCase):
+    def test_coerces_exercise_fields(self):
+        plan, errors = plan_schema.repair_plan({
+            "Monday": [{"exercise": "Hip Thrust", "sets": "3-4", "reps": 12, "rest": 90, "is_new": "true"}]
+        }, ["Monday"])
+        self.assertEqual(errors, {})
+        ex = plan["Monday"][0]
+        self.assertEqual((ex["sets"], ex["reps"], ex["rest"], ex["is_new"]), (4, "12", "90s", True))
+        self.assertIn("Hip+Thrust", ex["url"])
+
+    def test_coaching_notes_stay_text(self):
+        plan, _ = plan_schema.repair_plan({
+            "coaching_notes": [{"exercise": "Push hard this week."}],
+            "Monday": ["Cable Kickbacks"]
+        })
+        self.assertEqual(plan["coaching_notes"], "Push hard this week.")
+        self.assertEqual(plan["Monday"][0]["exercise"], "Cable Kickbacks")
+
+    def test_list_response_is_merged(self):
+        plan, errors = plan_schema.repair_plan([
+            {"day": "Monday", "exercises": [{"name": "Leg Press"}]},
+            {"tuesday": [{"exercise": "Lat Pulldown"}]}
+        ], ["Monday", "Tuesday"])
+        self.assertEqual(errors, {})
+        self.assertEqual(plan["Monday"][0]["exercise"], "Leg Press")
+        self.assertNotIn("name", plan["Monday"][0])
+        self.assertEqual(plan["Tuesday"][0]["exercise"], "Lat Pulldown")
+
+    def test_bad_and_missing_days_are_reported(self):
+        plan, errors = plan_schema.repair_plan({"Monday": [{"sets": 3}]}, ["Monday", "Tuesday"])
+        self.assertNotIn("Monday", plan)
+        self.assertEqual(set(errors), {"Monday", "Tuesday"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import time
+import unittest
+from datetime import date, timedelta
+
+import readiness_engine
+
+
+def make_history(days, **overrides):
+    start = date(2025, 1, 1)
+    history = {}
+    for i in range(days):
+        history[(start + timedelta(days=i)).isoformat()] = {
+            "sleep_duration_hours": 7.5 + (i % 3) * 0.2,
+            "sleep_score": 80 + (i % 5),
+            "stress_level": 30 + (i % 4),
+            "body_battery_morning": 70 + (i % 6),
+            "hrv_avg": 45 + (i % 3)
+        }
+    last = (start + timedelta(days=days - 1)).isoformat()
+    history[last].update(overrides)
+    return history
+
+
+class TestReadinessEngine(unittest.TestCase):
+    def test_typical_day_is_neutral(self):
+        readiness = readiness_engine.get_readiness(make_history(30))
+        self.assertTrue(readiness["ready"])
+        self.assertAlmostEqual(readiness["intensity_multiplier"], 1.0, delta=0.05)
+
+    def test_bad_night_lowers_score(self):
+        history = make_history(30, sleep_duration_hours=4.5, sleep_score=35,
+                               stress_level=70, body_battery_morning=20, hrv_avg=30)
+        readiness = readiness_engine.get_readiness(history, {"min_sleep_hours": 7, "max_stress_threshold": 50})
+        self.assertFalse(readiness["ready"])
+        self.assertLess(readiness["intensity_multiplier"], 0.9)
+        self.assertLess(readiness["z_scores"]["stress_level"], 0)
+
+    def test_profile_thresholds_apply_without_baseline(self):
+        history = {"2025-01-01": {"sleep_duration_hours": 6.5, "stress_level": 55}}
+        strict = readiness_engine.get_readiness(history, {"min_sleep_hours": 7, "max_stress_threshold": 50})
+        lenient = readiness_engine.get_readiness(history, {"min_sleep_hours": 6, "max_stress_threshold": 60})
+        self.assertLess(strict["score"], lenient["score"])
+
+    def test_empty_history(self):
+        self.assertIsNone(readiness_engine.get_readiness({}))
+
+    def test_season_scores_quickly(self):
+        history = make_history(365)
+        start = time.perf_counter()
+        scored = readiness_engine.score_history(history)
+        self.assertEqual(len(scored["score"]), 365)
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+import recovery_content
+
+PROFILE = {
+    "schedule_slots": [
+        {"day_name": "Monday", "focus": "Glutes & Hamstrings (Posterior)"},
+        {"day_name": "Tuesday", "focus": "Upper Body Structure (Supersets)"},
+    ]
+}
+
+
+class TestRecoveryContent(unittest.TestCase):
+    def test_index_is_parsed_once(self):
+        self.assertIs(recovery_content.load_recovery_index(), recovery_content.load_recovery_index())
+
+    def test_region_matches_day_focus(self):
+        content = recovery_content.select_recovery_content(PROFILE)
+        self.assertEqual(content["Monday"]["warmup"]["name"], "Lower Body Warm-Up")
+        self.assertEqual(content["Tuesday"]["cooldown"]["name"], "Upper Body Cool Down")
+        self.assertIsNone(content["Monday"]["yoga"])
+        self.assertEqual(content["rest_days"]["name"], "Active Recovery Day")
+
+    def test_low_readiness_adds_recovery_flow(self):
+        content = recovery_content.select_recovery_content(
+            PROFILE, readiness={"ready": False}, cycle_phase={"phase": "Luteal"})
+        self.assertEqual(content["Monday"]["yoga"]["name"], "Evening Unwind Flow")
+        self.assertEqual(content["rest_days"]["name"], "Full Rest Day")
+
+
+if __name__ == '__main__':
+    unittest.main()
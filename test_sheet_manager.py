@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import unittest
+from unittest.mock import MagicMock
+
+sys.modules.setdefault('google.generativeai', MagicMock())
+
+import backends
+import api_limiter
+import plan_schema
+import sheet_manager
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+PROFILE_PATH = os.path.join(os.path.dirname(__file__), 'user_profile.json')
+
+
+class TestLogWeekToSheet(unittest.TestCase):
+    def setUp(self):
+        self.saved_buckets = dict(api_limiter._buckets)
+        for api in api_limiter.RATE_LIMITS:
+            api_limiter.set_rate_limit(api, rate=1e9, burst=1e9)
+        backends.configure("fake", services=["sheets"])
+        with open(PROFILE_PATH) as f:
+            self.profile = json.load(f)
+        with open(os.path.join(FIXTURE_DIR, 'gemini_plan_response.json')) as f:
+            self.plan, _ = plan_schema.repair_plan(json.loads(json.load(f)["text"]))
+
+    def tearDown(self):
+        backends.configure("live")
+        api_limiter._buckets.clear()
+        api_limiter._buckets.update(self.saved_buckets)
+
+    def log_week(self, week):
+        before = backends.fake_state("calls").get("sheets", 0)
+        self.assertTrue(sheet_manager.log_week_to_sheet("Log Test", self.plan, week, None, self.profile))
+        return backends.fake_state("calls")["sheets"] - before
+
+    def worksheet(self):
+        return sheet_manager.get_client().open("Log Test").worksheet(sheet_manager.LOG_SHEET_TITLE)
+
+    def test_first_log_creates_tab_with_header(self):
+        self.log_week(1)
+        log = self.worksheet()
+        rows = sheet_manager.build_week_rows(self.plan, 1, None, self.profile)
+        self.assertEqual(log.rows[0], sheet_manager.LOG_HEADER)
+        self.assertEqual(log.rows[1][0], "WEEK 1 - AI Coached")
+        self.assertEqual(len(log.rows), 1 + len(rows))
+
+    def test_next_week_appends_after_last_row(self):
+        self.log_week(1)
+        self.log_week(2)
+        weeks = [row[0] for row in self.worksheet().rows if str(row[0]).startswith("WEEK")]
+        self.assertEqual(weeks, ["WEEK 1 - AI Coached", "WEEK 2 - AI Coached"])
+
+    def test_log_returns_where_the_week_starts(self):
+        self.log_week(1)
+        location = sheet_manager.log_week_to_sheet("Log Test", self.plan, 2, None, self.profile)
+        self.assertEqual(self.worksheet().rows[location["start_row"]][0], "WEEK 2 - AI Coached")
+        self.assertEqual(location["sheet_id"], self.worksheet().id)
+
+    def test_actuals_are_read_back_from_the_log_tab(self):
+        self.log_week(1)
+        rows = self.worksheet().rows
+        # The week's last exercise, so it is also among the recent rows get_last_week_logs returns
+        last = max(i for i, row in enumerate(rows) if len(row) > 2 and row[2] and i > 0)
+        exercise = rows[last][2]
+        rows[last][7:10] = ["135 lbs", "12", 8]
+
+        for records in (sheet_manager.get_historical_data("Log Test"), sheet_manager.get_last_week_logs("Log Test")):
+            logged = next(r for r in records if r["Exercise"] == exercise)
+            self.assertEqual((logged["ACTUAL Weight"], logged["ACTUAL Reps"], logged["RPE"]), ("135 lbs", "12", 8))
+
+    def test_no_log_tab_yet(self):
+        self.assertEqual(sheet_manager.get_historical_data("Log Test"), [])
+        self.assertEqual(sheet_manager.get_last_week_logs("Log Test"), "No logs found in the sheet.")
+
+    def test_api_calls_do_not_grow_with_sheet(self):
+        calls = [self.log_week(week) for week in range(1, 6)]
+        self.assertEqual(len(set(calls)), 1)
+        # open + tab metadata + one batch_update
+        self.assertEqual(calls[0], 3)
+
+    def test_done_column_is_checkbox(self):
+        rows = sheet_manager.build_week_rows(self.plan, 1, None, self.profile)
+        append = sheet_manager.build_log_requests(rows, 7, 1)[-1]["updateCells"]
+        exercise_row = append["rows"][1]["values"]
+        self.assertEqual(exercise_row[-1]["dataValidation"], {"condition": {"type": "BOOLEAN"}})
+        self.assertTrue(append["rows"][0]["values"][0]["userEnteredFormat"]["textFormat"]["bold"])
+
+
+if __name__ == '__main__':
+    unittest.main()
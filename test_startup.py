@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+import subprocess
+import unittest
+
+# Cold-import budget per entry module (a fresh interpreter each time)
+IMPORT_BUDGET_S = 0.75
+
+# Integrations that must only be imported at their point of use
+HEAVY_MODULES = ["google.generativeai", "gspread", "oauth2client", "googleapiclient", "garminconnect", "matplotlib"]
+
+PROBE = """
+import sys, json, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def cold_import(module):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class TestStartup(unittest.TestCase):
+    def test_entry_points_import_no_heavy_integrations(self):
+        for module in ("workout_generator", "async_pipeline", "dashboard_exporter", "cli"):
+            with self.subTest(module=module):
+                self.assertEqual(cold_import(module)["loaded"], [])
+
+    def test_import_time_budget(self):
+        for module in ("workout_generator", "dashboard_exporter"):
+            with self.subTest(module=module):
+                # Best of two, so one slow filesystem read doesn't fail the run
+                elapsed = min(cold_import(module)["elapsed"] for _ in range(2))
+                self.assertLess(elapsed, IMPORT_BUDGET_S)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import json
+import tempfile
+import unittest
+
+import static_site
+
+PLAN = {
+    "coaching_notes": "Push the <heavy> lifts.",
+    "Monday": [
+        {"exercise": "Smith Machine Hip Thrust", "category": "Glute_Compound_Heavy", "sets": 4, "reps": "8-10",
+         "target_weight": "135 lbs", "rest": "2 mins", "url": "https://example.com/thrust"},
+        {"exercise": "Cable Kickbacks", "category": "Glute_Shortened_Iso", "sets": 3, "reps": "15", "rest": "45s"}
+    ],
+    "Thursday": [
+        {"exercise": "Lat Pulldown", "category": "Vertical_Pull", "sets": 3, "reps": "10-12", "rest": "90s"}
+    ],
+    "recovery_content": {"Monday": {"yoga": {"name": "Hip Flow", "url": "https://example.com/yoga", "duration_min": 15}}}
+}
+PROFILE = {
+    "user_name": "Lianna",
+    "schedule_slots": [{"day_name": "Monday", "focus": "Glutes"}, {"day_name": "Thursday", "focus": "Back"}]
+}
+
+
+class TestStaticSite(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.site = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, relative):
+        with open(os.path.join(self.site, relative)) as f:
+            return f.read()
+
+    def test_writes_week_and_day_pages(self):
+        entry = static_site.export_week(PROFILE, PLAN, 5, b"png-bytes", self.site)
+
+        self.assertEqual(entry["pages"], ["week-5/index.html", "week-5/monday.html", "week-5/thursday.html"])
+        week_page = self.read("week-5/index.html")
+        self.assertIn("Push the &lt;heavy&gt; lifts.", week_page)
+        self.assertIn('<a href="monday.html"><strong>Monday</strong> - Glutes</a>', week_page)
+        self.assertIn("Weekly sets per muscle:", week_page)
+        self.assertIn(f'src="../{entry["assets"][1]}"', week_page)
+        monday = self.read("week-5/monday.html")
+        self.assertIn('<a href="https://example.com/thrust">Smith Machine Hip Thrust</a>', monday)
+        self.assertIn("Hip Flow", monday)
+        self.assertIn('href="week-5/"', self.read("index.html"))
+
+    def test_assets_are_content_hashed(self):
+        first = static_site.export_week(PROFILE, PLAN, 5, b"chart-1", self.site)
+        second = static_site.export_week(PROFILE, PLAN, 6, b"chart-2", self.site)
+
+        css, chart = first["assets"]
+        self.assertRegex(chart, r"^assets/progress\.[0-9a-f]{10}\.png$")
+        self.assertEqual(second["assets"][0], css)
+        self.assertNotEqual(second["assets"][1], chart)
+        with open(os.path.join(self.site, chart), 'rb') as f:
+            self.assertEqual(f.read(), b"chart-1")
+
+    def test_manifest_keeps_earlier_weeks(self):
+        static_site.export_week(PROFILE, PLAN, 5, None, self.site)
+        entry = static_site.export_week(PROFILE, PLAN, 6, None, self.site)
+
+        manifest = json.loads(self.read(static_site.MANIFEST_FILE))
+        self.assertEqual(sorted(manifest["weeks"]), ["5", "6"])
+        self.assertEqual(len(entry["assets"]), 1)
+        index = self.read("index.html")
+        self.assertLess(index.index("week-6/"), index.index("week-5/"))
+
+
+if __name__ == '__main__':
+    unittest.main()
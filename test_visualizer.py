@@ -1,7 +1,10 @@
-import visualizer
 import base64
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import visualizer
 
-mock_data = [
+MOCK_DATA = [
     {'Date': '2023-10-01', 'Exercise': 'Barbell Hip Thrust', 'Weight': '135 lbs'},
     {'Date': '2023-10-08', 'Exercise': 'Barbell Hip Thrust', 'Weight': '145 lbs'},
     {'Date': '2023-10-15', 'Exercise': 'Barbell Hip Thrust', 'Weight': '155 lbs'},
@@ -9,12 +12,30 @@ mock_data = [
     {'Date': '2023-10-08', 'Exercise': 'Smith Machine Squat', 'Weight': '100 lbs'},
 ]
 
-try:
-    chart_base64 = visualizer.generate_progress_chart(mock_data)
-    if chart_base64:
-        print("Success: Chart generated.")
-        # print(f"Base64 length: {len(chart_base64)}")
-    else:
-        print("Failure: No chart generated.")
-except Exception as e:
-    print(f"Error: {e}")
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+class TestVisualizer(unittest.TestCase):
+    def test_renders_png(self):
+        png = visualizer.render_progress_chart_png(MOCK_DATA)
+        self.assertTrue(png.startswith(PNG_SIGNATURE))
+
+    def test_base64_chart_is_the_same_png(self):
+        chart = visualizer.generate_progress_chart(MOCK_DATA)
+        self.assertTrue(base64.b64decode(chart).startswith(PNG_SIGNATURE))
+
+    def test_concurrent_renders_match_single_threaded(self):
+        # Each athlete's chart must show only its own data when batch threads render at once
+        datasets = [[dict(row, Weight=f"{100 + 5 * i + j} lbs") for j, row in enumerate(MOCK_DATA)] for i in range(8)]
+        expected = [visualizer.render_progress_chart_png(data) for data in datasets]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            for _ in range(2):
+                self.assertEqual(list(pool.map(visualizer.render_progress_chart_png, datasets)), expected)
+
+    def test_nothing_to_plot(self):
+        self.assertIsNone(visualizer.render_progress_chart_png([]))
+        self.assertIsNone(visualizer.render_progress_chart_png(MOCK_DATA, ["Romanian Deadlift"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
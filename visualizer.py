@@ -1,18 +1,34 @@
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 from datetime import datetime
 import io
 import base64
 
+import instrumentation
+
 def generate_progress_chart(data, exercises_to_plot=["Barbell Hip Thrust", "Smith Machine Squat", "Romanian Deadlift"]):
     """
     Generates a progress chart for specific exercises.
     Returns a base64 encoded image string to embed in HTML.
     """
+    png = render_progress_chart_png(data, exercises_to_plot)
+    return base64.b64encode(png).decode('utf-8') if png else None
+
+@instrumentation.timed("chart.render")
+def render_progress_chart_png(data, exercises_to_plot=["Barbell Hip Thrust", "Smith Machine Squat", "Romanian Deadlift"]):
+    """
+    Renders the progress chart for specific exercises.
+    Returns the PNG bytes (for inline CID email images), or None if there is nothing to plot.
+    Each call draws on its own Figure (no pyplot global state), so batch threads can render at once.
+    """
     if not data:
         return None
 
-    plt.figure(figsize=(10, 6))
+    # matplotlib is only needed once there is something to plot
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
     
     # Organize data by exercise
     # Assumes data has 'Date', 'Exercise', 'Weight' (cleaned)
@@ -41,24 +57,21 @@ def generate_progress_chart(data, exercises_to_plot=["Barbell Hip Thrust", "Smit
     has_data = False
     for ex, values in plot_data.items():
         if values['weights']:
-            plt.plot(values['weights'], marker='o', label=ex)
+            ax.plot(values['weights'], marker='o', label=ex)
             has_data = True
 
     if not has_data:
         return None
 
-    plt.title('Strength Progress (Key Lifts)')
-    plt.xlabel('Sessions')
-    plt.ylabel('Weight (lbs)')
-    plt.legend()
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.tight_layout()
+    ax.set_title('Strength Progress (Key Lifts)')
+    ax.set_xlabel('Sessions')
+    ax.set_ylabel('Weight (lbs)')
+    ax.legend()
+    ax.grid(True, linestyle='--', alpha=0.7)
+    fig.tight_layout()
 
     # Save to buffer
     buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
-    image_base64 = base64.b64encode(buf.read()).decode('utf-8')
-    plt.close()
+    fig.savefig(buf, format='png')
     
-    return image_base64
+    return buf.getvalue()
@@ -1,121 +1,84 @@
 import json
-import smtplib
 import os
+import sys
 import datetime
 import re
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import google.generativeai as genai
+import contextlib
 
 import sheet_manager
 import visualizer
 import calendar_manager
+import cycle_engine
+import api_limiter
+import backends
+import checkpoints
+import email_delivery
+import instrumentation
 import dashboard_exporter
-
-# --- MENSTRUAL CYCLE TRACKING ---
-def get_cycle_phase(profile):
-    """
-    Calculates the current menstrual cycle phase based on last period start date.
-    Returns phase info with training recommendations.
-    """
-    cycle_data = profile.get('menstrual_cycle', {})
-    if not cycle_data.get('track_cycle', False):
-        return None
-    
-    last_period = cycle_data.get('last_period_start')
-    if not last_period:
-        return None
-    
-    try:
-        last_period_date = datetime.datetime.strptime(last_period, '%Y-%m-%d').date()
-    except ValueError:
-        return None
-    
-    today = datetime.date.today()
-    cycle_length = cycle_data.get('average_cycle_length', 28)
-    day_in_cycle = (today - last_period_date).days % cycle_length + 1
-    
-    # Define phases with training implications
-    if 1 <= day_in_cycle <= 5:
-        return {
-            "phase": "Menstrual",
-            "day": day_in_cycle,
-            "energy": "Variable - may be lower",
-            "training_tip": "Listen to your body. Okay to reduce intensity if needed. Focus on form over load.",
-            "intensity_modifier": 0.85  # Slightly reduce if needed
-        }
-    elif 6 <= day_in_cycle <= 14:
-        return {
-            "phase": "Follicular",
-            "day": day_in_cycle,
-            "energy": "HIGH - rising estrogen = strength gains!",
-            "training_tip": "BEST time for heavy lifts & PRs! Push hard, increase weights, train intensely.",
-            "intensity_modifier": 1.1  # Can push harder
-        }
-    elif 15 <= day_in_cycle <= 17:
-        return {
-            "phase": "Ovulation",
-            "day": day_in_cycle,
-            "energy": "PEAK energy but ligament laxity increases",
-            "training_tip": "High energy but be mindful of form. Good for power & HIIT. Warm up well.",
-            "intensity_modifier": 1.05
-        }
-    else:  # 18-28 Luteal
-        return {
-            "phase": "Luteal",
-            "day": day_in_cycle,
-            "energy": "Moderate to low - progesterone rising",
-            "training_tip": "Maintain volume but may need longer rest. Great for hypertrophy work. Stay hydrated.",
-            "intensity_modifier": 0.95
-        }
-
-# --- LEGACY PERIODIZATION (kept for reference, AI now decides dynamically) ---
-PERIODIZATION_REFERENCE = {
-    "Accumulation": {"sets": "3-4", "reps": "10-12", "intensity": "moderate", "rest": "60-90s"},
-    "Intensification": {"sets": "3-4", "reps": "6-8", "intensity": "high", "rest": "2-3 mins"},
-    "Realization": {"sets": "3-5", "reps": "3-5", "intensity": "very high", "rest": "3-5 mins"},
-    "Deload": {"sets": "2-3", "reps": "8-10", "intensity": "low", "rest": "60s"}
-}
-
-def load_profile():
+import garmin_manager
+import exercise_index
+import mesocycle_planner
+import performance_analytics
+import plan_analyzer
+import plan_diff
+import plan_schema
+import progression_engine
+import readiness_engine
+import recovery_content
+import static_site
+
+# --- PERIODIZATION (applied per week of a mesocycle block, see mesocycle_planner) ---
+PERIODIZATION_REFERENCE = mesocycle_planner.PERIODIZATION_REFERENCE
+
+PROFILE_FILE = 'user_profile.json'
+DEFAULT_RECIPIENT = 'mazzocchilianna@gmail.com'
+
+def load_profile(profile_path=PROFILE_FILE):
     """Loads the user's current stats and progress."""
     try:
-        with open('user_profile.json', 'r') as f:
+        with open(profile_path, 'r') as f:
             return json.load(f)
     except FileNotFoundError:
-        print("Error: user_profile.json not found.")
+        print(f"Error: {profile_path} not found.")
         return None
 
-def save_profile(profile):
+def save_profile(profile, profile_path=PROFILE_FILE):
     """Saves the updated profile to JSON."""
-    with open('user_profile.json', 'w') as f:
+    with open(profile_path, 'w') as f:
         json.dump(profile, f, indent=4)
 
-def calculate_weight(one_rep_max, intensity):
-    """Calculates working weight rounded to nearest 5lbs."""
-    weight = one_rep_max * intensity
-    return round(weight / 5) * 5
+calculate_weight = progression_engine.calculate_weight
 
-def select_exercises_for_week(profile):
+# How many times failing days are re-requested before they are dropped
+MAX_DAY_RETRIES = 2
+
+def build_performance_context(last_week_logs, targets=None):
     """
-    Uses Gemini 3 Pro as the ultimate AI coach.
-    The AI decides EVERYTHING: exercises, sets, reps, intensity based on full context.
-    Returns a structured dictionary of the week's workout.
+    Precomputed progression targets plus any notes from last week's rows,
+    or the raw rows when there are no targets yet.
     """
-    api_key = os.environ.get('GEMINI_API_KEY')
-    if not api_key:
-        print("Error: GEMINI_API_KEY not set.")
-        return None
-
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-3-pro-preview')  # Upgraded to Gemini 3 Pro
-
-    # Get Performance Context from Sheets
-    last_week_logs = sheet_manager.get_last_week_logs(profile.get('google_sheet_name', 'My Workout Plan'))
-    performance_context = json.dumps(last_week_logs, indent=2)
+    if not targets:
+        return json.dumps(last_week_logs, indent=2)
+    lines = ["Next-week targets from logged actuals (e1RM, last set, target load x reps @RPE):"]
+    lines += progression_engine.format_targets(targets).split("\n")
+    notes = [
+        f"- {row.get('Day', '')} {row.get('Exercise', '')}: {row.get('My Notes') or row.get('Notes')}"
+        for row in (last_week_logs if isinstance(last_week_logs, list) else [])
+        if isinstance(row, dict) and (row.get('My Notes') or row.get('Notes'))
+    ]
+    if notes:
+        lines += ["Athlete notes:"] + notes
+    return "\n    ".join(lines)
+
+def build_plan_prompt(profile, last_week_logs, targets=None):
+    """
+    Builds the full weekly planning prompt from the profile and recent sheet logs.
+    targets: progression_engine targets; when given they replace the raw log rows.
+    """
+    performance_context = build_performance_context(last_week_logs, targets)
 
     # Get Menstrual Cycle Context
-    cycle_phase = get_cycle_phase(profile)
+    cycle_phase = cycle_engine.get_cycle_phase(profile)
     cycle_context = ""
     if cycle_phase:
         cycle_context = f"""
@@ -174,6 +137,7 @@ def select_exercises_for_week(profile):
     📅 TRAINING SCHEDULE
     ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     Training Days: Monday, Tuesday, Wednesday, Thursday, Friday
+    {mesocycle_planner.block_context()}
     
     Day Focus Guidelines (USE AS INSPIRATION, NOT STRICT RULES):
     - Monday: Glutes & Hamstrings focus
@@ -203,7 +167,7 @@ def select_exercises_for_week(profile):
     2. RESPECT the menstrual cycle phase. Adjust intensity accordingly.
     3. CHALLENGE her! She's intermediate/advanced and wants to be pushed!
     4. VARY exercises week to week. Keep it fresh and hit muscles from different angles.
-    5. PROGRESSIVE OVERLOAD. Increase weights, reps, or sets over time.
+    5. PROGRESSIVE OVERLOAD. Increase weights, reps, or sets over time. Use the precomputed target loads as given.
     6. CUSTOMIZE sets/reps/rest for EACH exercise based on its purpose.
     7. MIX rep ranges: Heavy (5-8), Moderate (8-12), High (12-20) as appropriate.
     8. Include FINISHERS when appropriate (burnout sets, drop sets, etc.)
@@ -211,6 +175,7 @@ def select_exercises_for_week(profile):
     📹 EXERCISE DETAILS:
     - For new exercises, provide a valid YouTube URL.
     - Provide a short, punchy technical cue for each exercise.
+    - Do NOT include warm-ups, cool-downs or stretching - they are attached automatically.
     
     ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     📤 OUTPUT FORMAT (Return ONLY valid JSON, no markdown)
@@ -237,120 +202,283 @@ def select_exercises_for_week(profile):
         "Friday": [...]
     }}
     """
+    return prompt
+
+def build_day_retry_prompt(base_prompt, day_errors):
+    """Asks the model to regenerate only the days that failed validation."""
+    problems = "\n".join(f"    - {day}: {'; '.join(errors)}" for day, errors in day_errors.items())
+    return f"""{base_prompt}
+    
+    ⚠️ Your previous answer had problems on these days:
+{problems}
+    
+    Return ONLY a JSON object with these day keys ({", ".join(day_errors)}), in the same exercise format.
+    Do not include any other days or coaching_notes.
+    """
+
+def _generate_json(model, prompt):
+    """One rate-limited, instrumented Gemini JSON call. Returns the parsed response."""
+    instrumentation.count("gemini.prompt_chars", len(prompt))
+    with instrumentation.span("gemini.generate"):
+        response = api_limiter.call_with_retry(
+            'gemini', model.generate_content, prompt,
+            generation_config={"response_mime_type": "application/json"}
+        )
+    instrumentation.record_gemini_usage(response)
+    return json.loads(response.text)
+
+# google.generativeai, imported on first use (it is slow to import and most paths never call Gemini)
+genai = None
+
+def _gemini_model(model_name, api_key):
+    global genai
+    if genai is None:
+        import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
 
+GEMINI_MODEL = 'gemini-3-pro-preview'  # Upgraded to Gemini 3 Pro
+
+def get_gemini_model():
+    """Returns the configured Gemini model, or None if GEMINI_API_KEY is not set."""
+    api_key, = backends.env_credentials('gemini', 'GEMINI_API_KEY')
+    if not api_key:
+        print("Error: GEMINI_API_KEY not set.")
+        return None
+    return backends.create('gemini', _gemini_model, GEMINI_MODEL, api_key)
+
+def merge_day_retry(weekly_plan_data, retry_plan, days):
+    """
+    Copies the re-requested days that came back valid from a day retry into the plan
+    (other days the model sent back are ignored). Returns the merged days as a plan.
+    """
+    merged = {day: retry_plan[day] for day in plan_schema.DAY_NAMES if day in days and day in retry_plan}
+    weekly_plan_data.update(merged)
+    return merged
+
+def select_exercises_for_week(profile, last_week_logs=None, targets=None):
+    """
+    Uses Gemini 3 Pro as the ultimate AI coach.
+    The AI decides EVERYTHING: exercises, sets, reps, intensity based on full context.
+    Days that fail schema validation are re-requested on their own (up to MAX_DAY_RETRIES).
+    last_week_logs: recent sheet rows (fetched from the sheet if None).
+    targets: progression_engine targets; exercises with a tracked max get their load from them.
+    Returns a structured dictionary of the week's workout.
+    """
+    model = get_gemini_model()
+    if model is None:
+        return None
+
+    # Get Performance Context from Sheets
+    if last_week_logs is None:
+        last_week_logs = sheet_manager.get_last_week_logs(profile.get('google_sheet_name', 'My Workout Plan'))
+    with instrumentation.span("prompt.build"):
+        prompt = build_plan_prompt(profile, last_week_logs, targets)
+
+    generation = plan_generation(profile, prompt, targets)
+    request = next(generation)
+    while True:
+        try:
+            response = _generate_json(model, request)
+        except Exception as e:
+            response = e
+        try:
+            request = generation.send(response)
+        except StopIteration as done:
+            return done.value
+
+def plan_generation(profile, prompt, targets=None):
+    """
+    Everything around the model calls of planning, shared by select_exercises_for_week
+    and async_pipeline.select_exercises_async: a generator that yields each prompt to
+    send and is sent back the parsed JSON response (or the exception the call raised).
+    Repairs the plan, re-requests invalid or rule-breaking days (up to MAX_DAY_RETRIES),
+    enforces equipment and applies targets. Returns the plan, or None if the first call failed.
+    """
+    expected_days = [d['day_name'] for d in profile['schedule_slots']]
     try:
-        response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-        weekly_plan_data = json.loads(response.text)
-        
-        # Handle potential AI formatting error (List instead of Dict)
-        # Handle potential AI formatting error (List instead of Dict)
-        if isinstance(weekly_plan_data, list):
-            print("Warning: AI returned a list. Attempting to merge into dictionary.")
-            merged_data = {}
-            for item in weekly_plan_data:
-                if isinstance(item, dict):
-                    # Check if the dict keys are day names (e.g. {"Monday": [...]})
-                    day_keys = [k for k in item.keys() if k in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]]
-                    if day_keys:
-                        for k in day_keys:
-                            merged_data[k] = item[k]
-                    
-                    # Check if it uses "day" or "day_name" key (e.g. {"day": "Monday", "exercises": [...]})
-                    elif "day" in item and "exercises" in item:
-                        merged_data[item["day"]] = item["exercises"]
-                    elif "day_name" in item and "exercises" in item:
-                        merged_data[item["day_name"]] = item["exercises"]
-                        
-            weekly_plan_data = merged_data
-
-        # Sanitize Data (Ensure all exercises are dicts)
-        weekly_plan_data = sanitize_plan_data(weekly_plan_data)
-
-        return weekly_plan_data
+        response = yield prompt
+        if isinstance(response, Exception):
+            raise response
+        weekly_plan_data, day_errors = plan_schema.repair_plan(response, expected_days)
     except Exception as e:
         print(f"Gemini API Error during planning: {e}")
         return None
+    add_rule_violations(profile, weekly_plan_data, day_errors)
+
+    for attempt in range(MAX_DAY_RETRIES):
+        if not day_errors:
+            break
+        print(f"Re-requesting {len(day_errors)} invalid day(s): {', '.join(day_errors)} (attempt {attempt + 1})")
+        try:
+            instrumentation.count("gemini.day_retries", len(day_errors))
+            retry_response = yield build_day_retry_prompt(prompt, day_errors)
+            if isinstance(retry_response, Exception):
+                raise retry_response
+            requested = day_errors
+            retry_plan, day_errors = plan_schema.repair_plan(retry_response, list(requested))
+        except Exception as e:
+            print(f"Gemini API Error during day retry: {e}")
+            continue
+        merged = merge_day_retry(weekly_plan_data, retry_plan, requested)
+        day_errors = {day: errors for day, errors in day_errors.items() if day in requested}
+        add_rule_violations(profile, merged, day_errors)
 
-def sanitize_plan_data(data):
-    """Ensures the plan data structure is valid (Dict of Lists of Dicts)."""
-    if not isinstance(data, dict):
-        return {}
-    
-    sanitized = {}
-    for day, exercises in data.items():
-        if not isinstance(exercises, list):
-            # If it's just a single item (dict or str), wrap in list
-            exercises = [exercises]
-        
-        clean_exercises = []
-        for ex in exercises:
-            if isinstance(ex, str):
-                # Convert string to default dict object
-                clean_exercises.append({
-                    "exercise": ex,
-                    "category": "Unspecified",
-                    "sets": "3",
-                    "reps": "10",
-                    "rest": "60s",
-                    "cues": "Focus on form.",
-                    "url": f"https://www.youtube.com/results?search_query={ex.replace(' ', '+')}",
-                    "is_new": False
-                })
-            elif isinstance(ex, dict):
-                # Ensure 'exercise' key exists
-                if 'exercise' not in ex:
-                    ex['exercise'] = "Unknown Exercise"
-                clean_exercises.append(ex)
-        
-        sanitized[day] = clean_exercises
-    return sanitized
+    report_unresolved_days(weekly_plan_data, day_errors)
+    enforce_equipment(profile, weekly_plan_data)
+    progression_engine.apply_targets(weekly_plan_data, targets)
+    return weekly_plan_data
 
-def update_database_with_new_exercises(profile, weekly_plan_data):
-    """Checks for new exercises in the AI plan and adds them to the user profile."""
+def add_rule_violations(profile, weekly_plan_data, day_errors):
+    """
+    Adds the plan_analyzer rule violations (exercise count, compounds, day focus) of
+    the days in weekly_plan_data to day_errors, so those days are re-requested too.
+    """
+    for day, problems in plan_analyzer.day_violations(weekly_plan_data, profile).items():
+        day_errors.setdefault(day, []).extend(problems)
+    return day_errors
+
+def report_unresolved_days(weekly_plan_data, day_errors):
+    """Days left with errors after the retries: unusable ones are dropped, rule-breaking ones kept."""
+    dropped = [day for day in day_errors if day not in weekly_plan_data]
+    kept = [day for day in day_errors if day in weekly_plan_data]
+    if dropped:
+        print(f"Warning: dropping days that are still invalid: {', '.join(dropped)}")
+    if kept:
+        print(f"Warning: keeping days that still break plan rules: {', '.join(kept)}")
+
+def enforce_equipment(profile, weekly_plan_data):
+    """Swaps exercises that need equipment the gym doesn't have for their closest allowed variant."""
+    swaps = exercise_index.enforce_equipment(weekly_plan_data, profile)
+    for old, new in swaps:
+        print(f"Swapped {old} -> {new} (equipment not available)")
+    return swaps
+
+def plan_progression(profile, historical_data, profile_path=PROFILE_FILE):
+    """
+    Updates profile['maxes'] from the logged actuals and the recovery/performance report
+    with its learned cycle intensity modifiers (saving the profile if anything changed),
+    and returns next week's progression targets.
+    """
+    with instrumentation.span("progression.estimate"):
+        targets, changes = progression_engine.update_progression(profile, historical_data)
+    for exercise, (old, new) in changes.items():
+        print(f"Estimated max for {exercise}: {old if old is not None else '-'} -> {new} lbs")
+    previous_report = profile.get('performance_report')
+    with instrumentation.span("analytics.performance"):
+        report, modifier_changes = performance_analytics.update_performance(
+            profile, historical_data, garmin_manager.load_recovery_cache()
+        )
+    for phase, (old, new) in modifier_changes.items():
+        print(f"Learned {phase} intensity modifier: {old:g} -> {new:g}")
+    if changes or report != previous_report:
+        save_profile(profile, profile_path)
+    return targets
+
+def training_week_start(today=None):
+    """Monday of the week being planned: tomorrow's on the Sunday run, else the week in progress."""
+    tomorrow = (today or datetime.date.today()) + datetime.timedelta(days=1)
+    return tomorrow - datetime.timedelta(days=tomorrow.weekday())
+
+def release_block_week(profile, targets=None, output_dir=None):
+    """
+    Returns (plan, readiness): this week from the saved mesocycle block, or None for
+    the plan when a new block is needed (none saved, block finished, or drift).
+    """
+    week = profile['current_week']
+    readiness = readiness_engine.get_readiness(
+        garmin_manager.load_recovery_cache(),
+        profile.get('recovery_metrics')
+    )
+    block = mesocycle_planner.load_block(mesocycle_planner.block_path(output_dir))
+    reason = mesocycle_planner.replan_reason(block, week, targets, readiness)
+    if reason:
+        print(f"Planning a new {mesocycle_planner.BLOCK_WEEKS}-week block: {reason}")
+        return None, readiness
+    plan = mesocycle_planner.release_week(
+        block, week, targets, cycle_engine.get_cycle_phase(profile, training_week_start())
+    )
+    print(f"Releasing Week {week} from the mesocycle block ({plan['mesocycle']['phase']})")
+    return plan, readiness
+
+def start_block(profile, template, targets=None, readiness=None, output_dir=None):
+    """Expands the Gemini week plan into a block, saves it and returns its first week."""
+    week = profile['current_week']
+    block = mesocycle_planner.build_block(template, week, targets, readiness)
+    mesocycle_planner.save_block(block, mesocycle_planner.block_path(output_dir))
+    return mesocycle_planner.release_week(block, week, targets)
+
+def update_database_with_new_exercises(profile, weekly_plan_data, profile_path=PROFILE_FILE):
+    """
+    Checks for new exercises in the AI plan and adds them to the user profile.
+    Near-duplicates of existing exercises (in any category) are skipped and new
+    categories are filed under the closest existing one.
+    """
     updates_made = False
+    index = None
     
     for day_name, exercises in weekly_plan_data.items():
+        if not isinstance(exercises, list):
+            continue
         for ex in exercises:
-            if ex.get('is_new'):
-                category = ex['category']
-                # Ensure category exists in DB
-                if category not in profile['exercise_database']:
-                    profile['exercise_database'][category] = []
-                
-                # Check if it's really new (avoid duplicates)
-                existing_names = [e['name'] for e in profile['exercise_database'][category]]
-                if ex['exercise'] not in existing_names:
-                    new_entry = {
-                        "name": ex['exercise'],
-                        "url": ex['url'],
-                        "desc": "AI Suggested Variation",
-                        "alt": "Standard Variation"
-                    }
-                    profile['exercise_database'][category].append(new_entry)
+            if isinstance(ex, dict) and ex.get('is_new'):
+                index = index or exercise_index.ExerciseIndex(profile['exercise_database'])
+                category = index.match_category(ex['category'])
+                new_entry = {
+                    "name": ex['exercise'],
+                    "url": ex['url'],
+                    "desc": "AI Suggested Variation",
+                    "alt": "Standard Variation"
+                }
+                duplicate = index.add(category, new_entry)
+                if duplicate is None:
                     print(f"Added new exercise to DB: {ex['exercise']} ({category})")
                     updates_made = True
+                elif duplicate != ex['exercise']:
+                    print(f"Skipped near-duplicate exercise: {ex['exercise']} (matches {duplicate})")
     
     if updates_made:
-        save_profile(profile)
+        save_profile(profile, profile_path)
 
-import visualizer
-
-# ... (imports)
-
-def generate_html_email(profile, weekly_plan_data):
-    """Generates the HTML email content with hyperlinks. Now uses AI-provided sets/reps/weight."""
-    
-    # Generate Progress Chart
+def attach_recovery_content(profile, weekly_plan_data):
+    """
+    Attaches locally selected warm-ups, cool-downs and yoga flows to the plan
+    under 'recovery_content', based on day focus, readiness and cycle phase.
+    """
+    readiness = readiness_engine.get_readiness(
+        garmin_manager.load_recovery_cache(),
+        profile.get('recovery_metrics')
+    )
+    cycle_phase = cycle_engine.get_cycle_phase(profile)
+    weekly_plan_data['recovery_content'] = recovery_content.select_recovery_content(profile, readiness, cycle_phase)
+    return weekly_plan_data
+
+# Content-ID of the inline progress chart in the weekly email
+EMAIL_CHART_CID = 'progress-chart'
+
+def build_email_chart(profile, historical_data=None):
+    """
+    Renders the progress chart PNG for the email.
+    historical_data: sheet records (fetched from the sheet if None). Returns None on failure.
+    """
     try:
-        historical_data = sheet_manager.get_historical_data(profile.get('google_sheet_name', 'My Workout Plan'))
-        chart_base64 = visualizer.generate_progress_chart(historical_data)
-        chart_html = f'<img src="data:image/png;base64,{chart_base64}" alt="Progress Chart" style="width:100%; max-width:600px;"/>' if chart_base64 else ""
+        if historical_data is None:
+            historical_data = sheet_manager.get_historical_data(profile.get('google_sheet_name', 'My Workout Plan'))
+        return visualizer.render_progress_chart_png(historical_data)
     except Exception as e:
         print(f"Error generating chart: {e}")
-        chart_html = ""
+        return None
+
+@instrumentation.timed("email.render")
+def generate_html_email(profile, weekly_plan_data, chart_src=None):
+    """
+    Generates the HTML email content with hyperlinks. Now uses AI-provided sets/reps/weight.
+    chart_src: image URL for the progress chart (e.g. 'cid:progress-chart'); omitted if None.
+    """
+    chart_html = f'<img src="{chart_src}" alt="Progress Chart" style="width:100%; max-width:600px;"/>' if chart_src else ""
 
     # Get cycle phase for display
-    cycle_phase = get_cycle_phase(profile)
+    cycle_phase = cycle_engine.get_cycle_phase(profile)
     cycle_html = ""
     if cycle_phase:
         phase_colors = {
@@ -368,6 +496,17 @@ def generate_html_email(profile, weekly_plan_data):
         </div>
         """
 
+    # What the logged history says drives performance (performance_analytics)
+    insights = (profile.get('performance_report') or {}).get('lines')
+    insights_html = ""
+    if insights:
+        insights_html = f"""
+        <div style="background: #f5f5f5; padding: 15px; border-radius: 8px; margin: 15px 0;">
+            <strong>📈 What Moves Your Lifts:</strong>
+            <ul style="margin: 8px 0 0 0; padding-left: 20px;">{''.join(f'<li>{line}</li>' for line in insights)}</ul>
+        </div>
+        """
+
     # Get coaching notes from AI
     coaching_notes = weekly_plan_data.get('coaching_notes', 'Train hard, stay focused!')
 
@@ -384,6 +523,8 @@ def generate_html_email(profile, weekly_plan_data):
                 {coaching_notes}
             </div>
             
+            {insights_html}
+
             <p><strong>Goal:</strong> {profile['primary_goal']}</p>
             <hr style="border: none; border-top: 2px solid #eee;">
             {chart_html}
@@ -403,7 +544,13 @@ def generate_html_email(profile, weekly_plan_data):
             
         day_focus = next((d['focus'] for d in profile['schedule_slots'] if d['day_name'] == day_name), "Workout")
         
+        day_recovery = weekly_plan_data.get('recovery_content', {}).get(day_name, {})
+        
         plan_html += f"<h3 style='color: #d81b60; margin-top: 25px;'>{day_name} - {day_focus}</h3>"
+        warmup = day_recovery.get('warmup')
+        if warmup:
+            warmup_moves = ", ".join(f"{m['name']} ({m.get('reps', '')})" for m in warmup['exercises'])
+            plan_html += f"<p style='font-size: 13px; color: #555;'><strong>🔥 Warm-Up ({warmup['duration_min']} min):</strong> {warmup_moves}</p>"
         plan_html += "<table border='0' cellpadding='10' style='border-collapse: collapse; width: 100%; background: #fafafa; border-radius: 8px;'>"
         plan_html += "<tr style='background-color: #d81b60; color: white;'><th>Exercise</th><th>Sets</th><th>Reps</th><th>Weight</th><th>Rest</th><th>Cues</th></tr>"
         
@@ -429,6 +576,14 @@ def generate_html_email(profile, weekly_plan_data):
             </tr>
             """
         plan_html += "</table>"
+        
+        cooldown = day_recovery.get('cooldown')
+        if cooldown:
+            stretches = ", ".join(f"<a href=\"{s.get('url', '#')}\" style=\"color: #0066cc;\">{s['name']}</a> ({s.get('duration', '')})" for s in cooldown['exercises'])
+            plan_html += f"<p style='font-size: 13px; color: #555;'><strong>🧘 Cool-Down ({cooldown['duration_min']} min):</strong> {stretches}</p>"
+        yoga = day_recovery.get('yoga')
+        if yoga:
+            plan_html += f"<p style='font-size: 13px; color: #555;'><strong>🌙 Recovery Flow:</strong> <a href=\"{yoga['url']}\" style=\"color: #0066cc;\">{yoga['name']}</a> ({yoga['duration_min']} min)</p>"
 
     plan_html += """
             <br><hr style="border: none; border-top: 2px solid #eee;">
@@ -439,91 +594,361 @@ def generate_html_email(profile, weekly_plan_data):
     """
     return plan_html
 
-def send_email(content, recipient_email, week_number):
-    """Sends the plan via email."""
-    sender_email = os.environ.get('EMAIL_USER')
-    sender_password = os.environ.get('EMAIL_PASS')
+def build_calendar_description(weekly_plan_data, day_name):
+    """Event description for one day: warm-up, exercises with sets x reps, cool-down."""
+    exercises = weekly_plan_data.get(day_name, [])
+    ex_list = "\n".join([f"- {ex.get('exercise', 'Exercise')} ({ex.get('sets', 3)}x{ex.get('reps', '10')})" for ex in exercises])
+    day_recovery = weekly_plan_data.get('recovery_content', {}).get(day_name, {})
+    if day_recovery.get('warmup'):
+        ex_list = f"Warm-Up: {day_recovery['warmup']['name']}\n{ex_list}"
+    if day_recovery.get('cooldown'):
+        ex_list += f"\nCool-Down: {day_recovery['cooldown']['name']}"
+    return ex_list
+
+def email_configured():
+    """Whether SMTP credentials are set; without them the plan is only saved as HTML."""
+    return all(backends.env_credentials('smtp', 'EMAIL_USER', 'EMAIL_PASS'))
+
+def skip_unconfigured(checkpoint, stage, configured):
+    """Marks a pending stage skipped when its service has no credentials. Returns True if skipped."""
+    if configured or checkpoint.is_done(stage):
+        return False
+    print(f"Skipping {stage}: no credentials configured.")
+    checkpoint.skip(stage, "not configured")
+    return True
+
+def email_message_id(week_number, recipient_email):
+    """Outbox id of a week's plan email (re-queuing the same week replaces it)."""
+    return f"week{week_number}_{recipient_email}"
+
+def flush_email_outbox(checkpoint, week_number, recipient_email, outbox_dir=email_delivery.OUTBOX_DIR):
+    """
+    Sends what earlier runs left queued in the outbox, before anything new is queued.
+    If this week's email is among them, the email stage is marked done so it isn't sent twice.
+    Returns (sent, failed).
+    """
+    if not email_delivery.pending(outbox_dir) or not email_configured():
+        return 0, 0
+    sender_email, sender_password = backends.env_credentials('smtp', 'EMAIL_USER', 'EMAIL_PASS')
+    this_week = email_delivery.outbox_path(email_message_id(week_number, recipient_email), outbox_dir)
+    queued = os.path.exists(this_week)
+    sent, failed = email_delivery.flush_outbox(sender_email, sender_password, outbox_dir)
+    print(f"Outbox: sent {sent} queued email(s), {failed} still queued.")
+    if queued and not os.path.exists(this_week) and not checkpoint.is_done("email"):
+        checkpoint.complete("email", {"sent": True})
+    return sent, failed
+
+def send_email(content, recipient_email, week_number, fallback_path='weekly_plan.html', images=None,
+               outbox_dir=email_delivery.OUTBOX_DIR):
+    """
+    Queues the plan in the outbox and sends it over the shared SMTP connection.
+    images: {content_id: png_bytes} referenced from the HTML as cid: URLs.
+    Returns True if the email was sent; on failure it stays queued for the next run.
+    Without credentials the HTML is saved to fallback_path instead (see email_configured).
+    """
+    sender_email, sender_password = backends.env_credentials('smtp', 'EMAIL_USER', 'EMAIL_PASS')
     
     if not sender_email or not sender_password:
-        print("Skipping email: Credentials not set. Saving to 'weekly_plan.html'.")
-        with open('weekly_plan.html', 'w') as f:
-            f.write(content)
-        return
+        print(f"Skipping email: Credentials not set. Saving to '{fallback_path}'.")
+        with open(fallback_path, 'w') as f:
+            f.write(email_delivery.inline_as_data_uris(content, images))
+        return False
 
-    msg = MIMEMultipart()
-    msg['Subject'] = f"Your Training Plan - Week {week_number}"
-    msg['From'] = sender_email
-    msg['To'] = recipient_email
-    msg.attach(MIMEText(content, 'html'))
+    msg = email_delivery.build_message(
+        content, f"Your Training Plan - Week {week_number}", sender_email, recipient_email, images
+    )
+    path = email_delivery.enqueue(msg, email_message_id(week_number, recipient_email), outbox_dir)
 
     try:
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-            server.login(sender_email, sender_password)
-            server.send_message(msg)
+        email_delivery.deliver(path, sender_email, sender_password)
         print("Email sent successfully.")
+        return True
     except Exception as e:
-        print(f"Failed to send email: {e}")
+        print(f"Failed to send email (kept in outbox): {e}")
+        return False
 
-def update_week(profile):
+def update_week(profile, profile_path=PROFILE_FILE):
     """Increments the week number in the JSON file."""
     profile['current_week'] += 1
-    save_profile(profile)
-
-if __name__ == "__main__":
-    user_profile = load_profile()
-    if user_profile:
-        print(f"Generating plan for Week {user_profile['current_week']}...")
-        
-        # Display cycle phase info
-        cycle_phase = get_cycle_phase(user_profile)
-        if cycle_phase:
-            print(f"🔴 Cycle Phase: {cycle_phase['phase']} (Day {cycle_phase['day']})")
-            print(f"   Training Tip: {cycle_phase['training_tip']}")
-        
-        # 1. Select Exercises (AI decides everything!)
-        print("Consulting Gemini 3 Pro AI Coach...")
-        weekly_workout_data = select_exercises_for_week(user_profile)
-        
-        if weekly_workout_data:
-            # 2. Update DB if new exercises found
-            update_database_with_new_exercises(user_profile, weekly_workout_data)
-            
-            # 3. Generate HTML
-            email_html = generate_html_email(user_profile, weekly_workout_data)
-            
-            # 4. Send Email
-            recipient = os.environ.get('RECIPIENT_EMAIL', 'mazzocchilianna@gmail.com')
-            send_email(email_html, recipient, user_profile['current_week'])
-            
-            # 5. Push to Calendar
-            print("Pushing workouts to Google Calendar...")
+    save_profile(profile, profile_path)
+
+def open_run_checkpoint(week, output_dir=None, resume=True):
+    """Opens the week's checkpoint (under output_dir if given); resume=False starts it over."""
+    checkpoint_dir = os.path.join(output_dir, checkpoints.CHECKPOINT_DIR) if output_dir else checkpoints.CHECKPOINT_DIR
+    checkpoint = checkpoints.RunCheckpoint(checkpoints.checkpoint_path(week, checkpoint_dir), week)
+    if not resume:
+        checkpoint.clear()
+        checkpoint = checkpoints.RunCheckpoint(checkpoint.path, week)
+    return checkpoint
+
+def open_published_checkpoint(output_dir=None):
+    """The most recently published week's checkpoint (under output_dir if given), or None."""
+    checkpoint_dir = os.path.join(output_dir, checkpoints.CHECKPOINT_DIR) if output_dir else checkpoints.CHECKPOINT_DIR
+    return checkpoints.load_published(checkpoint_dir)
+
+def training_days(weekly_plan_data):
+    """Day names in the plan that have exercises (skips coaching_notes, recovery_content)."""
+    return [day for day, exercises in weekly_plan_data.items()
+            if day != 'coaching_notes' and isinstance(exercises, list)]
+
+def run_weekly_pipeline(user_profile, profile_path=PROFILE_FILE, recipient=None, output_dir=None,
+                        api_slots=None, resume=True):
+    """
+    Runs the full weekly pipeline for one athlete: plan, email, calendar, sheet, dashboard.
+
+    Args:
+        user_profile: The loaded athlete profile
+        profile_path: Where the profile is saved back (new exercises, week increment)
+        recipient: Email address (defaults to profile/env/DEFAULT_RECIPIENT)
+        output_dir: Directory for local artifacts (fallback HTML, dashboard JSON, checkpoints,
+                    mesocycle block);
+                    repo root if None
+        api_slots: Optional {api_name: context manager} limiting concurrent calls per API
+                   ('gemini', 'email', 'calendar', 'sheets') when many athletes run at once
+        resume: Reuse this week's checkpoint so a rerun only repeats unfinished stages;
+                False discards it and starts over
+
+    Returns a dict with the outcome of each stage; stages that failed after
+    retries are listed under 'degraded' instead of being dropped silently.
+    The week is only incremented once every stage has completed.
+    """
+    api_slots = api_slots or {}
+    def slot(api):
+        return api_slots.get(api) or contextlib.nullcontext()
+
+    week = user_profile['current_week']
+    checkpoint = open_run_checkpoint(week, output_dir, resume)
+    historical_data = None
+    chart_png = None
+
+    result = {"week": week, "stages": {}, "resumed": checkpoint.completed_stages()}
+    if result["resumed"]:
+        print(f"Resuming Week {week}; already done: {', '.join(result['resumed'])}")
+    else:
+        print(f"Generating plan for Week {week}...")
+
+    # Emails earlier runs couldn't send go out first (and may complete this week's email stage)
+    recipient = recipient or user_profile.get('recipient_email') or os.environ.get('RECIPIENT_EMAIL', DEFAULT_RECIPIENT)
+    outbox_dir = os.path.join(output_dir, email_delivery.OUTBOX_DIR) if output_dir else email_delivery.OUTBOX_DIR
+    with slot('email'):
+        flush_email_outbox(checkpoint, week, recipient, outbox_dir)
+    
+    # Display cycle phase info
+    cycle_phase = cycle_engine.get_cycle_phase(user_profile)
+    if cycle_phase:
+        print(f"🔴 Cycle Phase: {cycle_phase['phase']} (Day {cycle_phase['day']})")
+        print(f"   Training Tip: {cycle_phase['training_tip']}")
+    
+    # 1. Select Exercises (AI decides everything!)
+    if checkpoint.is_done("plan"):
+        weekly_workout_data = checkpoint.output("plan")
+    else:
+        with slot('sheets'):
+            historical_data = sheet_manager.get_historical_data(user_profile.get('google_sheet_name', 'My Workout Plan'))
+        targets = plan_progression(user_profile, historical_data, profile_path)
+        with instrumentation.span("stage.plan"):
+            weekly_workout_data, readiness = release_block_week(user_profile, targets, output_dir)
+            if weekly_workout_data is None:
+                print("Consulting Gemini 3 Pro AI Coach...")
+                with slot('gemini'):
+                    template = select_exercises_for_week(user_profile, targets=targets)
+                if template:
+                    weekly_workout_data = start_block(user_profile, template, targets, readiness, output_dir)
+    
+        if not weekly_workout_data:
+            print("Failed to generate weekly plan data.")
+            result["stages"]["plan"] = False
+            result["degraded"] = ["plan"]
+            return result
+    
+        # 2. Update DB if new exercises found
+        update_database_with_new_exercises(user_profile, weekly_workout_data, profile_path)
+    
+        # Attach warm-ups/cool-downs locally (no AI call)
+        attach_recovery_content(user_profile, weekly_workout_data)
+        checkpoint.complete("plan", weekly_workout_data)
+    result["stages"]["plan"] = True
+    
+    # 3. Generate HTML + 4. Send Email
+    if not checkpoint.is_done("email"):
+        with slot('sheets'), instrumentation.span("stage.render"):
+            chart_png = build_email_chart(user_profile, historical_data)
+            email_html = generate_html_email(
+                user_profile, weekly_workout_data, f"cid:{EMAIL_CHART_CID}" if chart_png else None
+            )
+    
+        fallback_path = os.path.join(output_dir, 'weekly_plan.html') if output_dir else 'weekly_plan.html'
+        images = {EMAIL_CHART_CID: chart_png} if chart_png else None
+        with slot('email'), instrumentation.span("stage.email"):
+            if send_email(email_html, recipient, week, fallback_path, images, outbox_dir):
+                checkpoint.complete("email", {"sent": True})
+            elif not email_configured():
+                # The documented credential-less path: the saved HTML is the deliverable
+                checkpoint.complete("email", {"fallback": fallback_path})
+    result["stages"]["email"] = checkpoint.is_done("email")
+    
+    # 5. Push to Calendar (event ids are checkpointed per day, so a rerun only adds missing days)
+    plan_days = training_days(weekly_workout_data)
+    skip_unconfigured(checkpoint, "calendar", calendar_manager.is_configured())
+    if not checkpoint.is_done("calendar"):
+        print("Pushing workouts to Google Calendar...")
+        with instrumentation.span("stage.calendar"):
             cal_service = calendar_manager.get_calendar_service()
             if cal_service:
                 user_calendar_id = user_profile.get('calendar_id', recipient) 
-                
-                for day_name, exercises in weekly_workout_data.items():
-                    if day_name == 'coaching_notes' or not isinstance(exercises, list):
-                        continue
-                    # Create a summary of exercises for the description
-                    ex_list = "\n".join([f"- {ex.get('exercise', 'Exercise')} ({ex.get('sets', 3)}x{ex.get('reps', '10')})" for ex in exercises])
-                    calendar_manager.create_workout_event(cal_service, day_name, ex_list, user_calendar_id)
             
-            # 6. Log to Google Sheet (pass None for phase since AI decides per-exercise)
-            sheet_manager.log_week_to_sheet(
+                for day_name in plan_days:
+                    if day_name in checkpoint.output("calendar", {}):
+                        continue
+                    ex_list = build_calendar_description(weekly_workout_data, day_name)
+                    with slot('calendar'):
+                        event = calendar_manager.create_workout_event(cal_service, day_name, ex_list, user_calendar_id)
+                    if event:
+                        checkpoint.record("calendar", day_name, event.get('id'))
+            created = checkpoint.output("calendar", {})
+            if all(day in created for day in plan_days):
+                checkpoint.complete("calendar", created)
+    result["stages"]["calendar"] = stage_outcome(checkpoint, "calendar")
+    
+    # 6. Log to Google Sheet (pass None for phase since AI decides per-exercise)
+    skip_unconfigured(checkpoint, "sheet", sheet_manager.is_configured())
+    if not checkpoint.is_done("sheet"):
+        with slot('sheets'), instrumentation.span("stage.sheet"):
+            logged = sheet_manager.log_week_to_sheet(
                 user_profile.get('google_sheet_name', 'My Workout Plan'),
                 weekly_workout_data,
-                user_profile['current_week'],
+                week,
                 None,  # No fixed phase - AI decides per exercise
                 user_profile
             )
+            if logged:
+                checkpoint.complete("sheet", {"sheet": user_profile.get('google_sheet_name', 'My Workout Plan'), **logged})
+    result["stages"]["sheet"] = stage_outcome(checkpoint, "sheet")
+
+    # 7. Export Dashboard Data (JSON for web dashboard)
+    if not checkpoint.is_done("dashboard"):
+        print("Exporting dashboard data...")
+        dashboard_path = os.path.join(output_dir, 'dashboard_data.json') if output_dir else None
+        with instrumentation.span("stage.dashboard"):
+            exported = dashboard_exporter.export_dashboard_data(weekly_workout_data, user_profile, dashboard_path)
+        if exported:
+            checkpoint.complete("dashboard", exported)
+    result["stages"]["dashboard"] = checkpoint.output("dashboard", False)
+
+    # 8. Pre-render static week/day pages for the dashboard
+    if not checkpoint.is_done("site"):
+        site_dir = os.path.join(output_dir, 'site') if output_dir else static_site.SITE_DIR
+        with instrumentation.span("stage.site"):
+            try:
+                chart_png = chart_png or build_email_chart(user_profile, historical_data)
+                checkpoint.complete("site", static_site.export_week(user_profile, weekly_workout_data, week, chart_png, site_dir))
+            except OSError as e:
+                print(f"Error writing static pages: {e}")
+    result["stages"]["site"] = checkpoint.is_done("site")
+
+    # 9. Increment Week
+    return finish_week(result, checkpoint, user_profile, profile_path)
+
+def stage_outcome(checkpoint, stage):
+    """A stage's entry in result['stages']: 'skipped', the calendar's event count, or whether it's done."""
+    if checkpoint.skipped(stage):
+        return "skipped"
+    if stage == "calendar":
+        return len(checkpoint.output("calendar", {})) if checkpoint.is_done("calendar") else 0
+    return checkpoint.is_done(stage)
+
+def finish_week(result, checkpoint, user_profile, profile_path=PROFILE_FILE):
+    """
+    Increments the week only once every stage is done (so a rerun can finish this week)
+    and keeps the checkpoint as the published week (for republish_changes).
+    Fills in result['degraded'] and returns the result.
+    """
+    result["degraded"] = [stage for stage, outcome in result["stages"].items() if not outcome]
+    if result["degraded"]:
+        print(f"⚠️ Week {result['week']} not complete; rerun to retry: {', '.join(result['degraded'])}")
+    else:
+        update_week(user_profile, profile_path)
+        checkpoint.publish()
+        print("Week updated. Process complete.")
+    return result
+
+def republish_changes(user_profile, checkpoint, old_plan, new_plan, output_dir=None, recipient=None):
+    """
+    Publishes a mid-week re-plan by updating only what changed since old_plan in the
+    stages that already ran: calendar events of changed days are patched, added days
+    get events and removed days lose theirs; changed sheet rows, dashboard day sections
+    and static pages are rewritten in place. The email is not re-sent. The checkpoint's
+    plan becomes new_plan, so stages that haven't run yet publish the new plan as usual.
 
-            # 7. Export Dashboard Data (JSON for web dashboard)
-            print("Exporting dashboard data...")
-            dashboard_exporter.export_dashboard_data(weekly_workout_data, user_profile)
+    Returns {"diff", "summary", "stages": {stage: changes}}.
+    """
+    diff = plan_diff.diff_plans(old_plan, new_plan)
+    result = {"diff": diff, "summary": plan_diff.summarize(diff), "stages": {}}
+    checkpoint.complete("plan", new_plan)
+    if plan_diff.is_empty(diff):
+        return result
+
+    days = plan_diff.changed_days(diff)
+    events = dict(checkpoint.output("calendar", {}))
+    if (events or checkpoint.is_done("calendar")) and not checkpoint.skipped("calendar"):
+        with instrumentation.span("stage.calendar"):
+            cal_service = calendar_manager.get_calendar_service()
+            if cal_service:
+                recipient = recipient or user_profile.get('recipient_email') or os.environ.get('RECIPIENT_EMAIL', DEFAULT_RECIPIENT)
+                calendar_id = user_profile.get('calendar_id', recipient)
+                changes = 0
+                for day_name in days:
+                    status = diff["days"][day_name]["status"]
+                    if status == "removed" and day_name in events:
+                        if calendar_manager.delete_workout_event(cal_service, events[day_name], calendar_id):
+                            checkpoint.forget("calendar", day_name)
+                            del events[day_name]
+                            changes += 1
+                    elif day_name in events:
+                        description = build_calendar_description(new_plan, day_name)
+                        if calendar_manager.update_workout_event(cal_service, events[day_name], description, calendar_id):
+                            changes += 1
+                    elif status != "removed" and checkpoint.is_done("calendar"):
+                        description = build_calendar_description(new_plan, day_name)
+                        event = calendar_manager.create_workout_event(cal_service, day_name, description, calendar_id)
+                        if event:
+                            events[day_name] = event.get('id')
+                            changes += 1
+                if checkpoint.is_done("calendar"):
+                    checkpoint.complete("calendar", events)
+                result["stages"]["calendar"] = changes
+
+    if checkpoint.is_done("sheet") and not checkpoint.skipped("sheet"):
+        with instrumentation.span("stage.sheet"):
+            result["stages"]["sheet"] = sheet_manager.update_week_rows(
+                user_profile.get('google_sheet_name', 'My Workout Plan'),
+                old_plan, new_plan, checkpoint.data["week"], None, user_profile, checkpoint.output("sheet")
+            )
 
-            # 8. Increment Week
-            update_week(user_profile)
-            print("Week updated. Process complete.")
-        else:
-            print("Failed to generate weekly plan data.")
+    if checkpoint.is_done("dashboard"):
+        with instrumentation.span("stage.dashboard"):
+            updated = dashboard_exporter.update_dashboard_sections(
+                new_plan, user_profile, checkpoint.output("dashboard"), days, diff["notes_changed"]
+            )
+        result["stages"]["dashboard"] = len(days) if updated else None
+
+    if checkpoint.is_done("site"):
+        site_dir = os.path.join(output_dir, 'site') if output_dir else static_site.SITE_DIR
+        with instrumentation.span("stage.site"):
+            try:
+                checkpoint.complete("site", static_site.update_week_pages(
+                    user_profile, new_plan, checkpoint.data["week"], days, site_dir
+                ))
+                result["stages"]["site"] = len(days)
+            except OSError as e:
+                print(f"Error writing static pages: {e}")
+                result["stages"]["site"] = None
+    return result
 
+if __name__ == "__main__":
+    user_profile = load_profile()
+    if user_profile:
+        result = run_weekly_pipeline(user_profile)
+        instrumentation.write_run_report("weekly")
+        if result["degraded"]:
+            sys.exit(1)